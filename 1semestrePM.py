@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 
+from formatacao import formatar_estilo
+
 st.markdown("""
     <style>
     #MainMenu {visibility: hidden;}
@@ -53,13 +55,12 @@ elif refresh:
 else:
     filtered_df = df.copy()
 
-# Convert numeric columns to percentage format
+# Numeric columns stay numeric; percentage format is applied at render time
 numeric_cols = filtered_df.select_dtypes(include="number").columns
-filtered_df[numeric_cols] = filtered_df[numeric_cols].applymap(lambda x: f"{x:.2%}")
 
 # Display filtered table
 st.subheader("📈 Filtered Results")
-st.dataframe(filtered_df, use_container_width=True)
+st.dataframe(formatar_estilo(filtered_df, {col: "percentagem" for col in numeric_cols}), use_container_width=True)
 
 # Alert for clients missing purchases in any month
 if cliente:
@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 
+from antiguidade import ESCALOES, fatia_escalao, ordenar_por_escalao, resumo_escaloes
+from carteira import carteira_partilhada
+
 # 🚀 Page configuration
 st.set_page_config(page_title="Vendas Dashboard", layout="wide", page_icon="📊")
 
@@ -33,24 +36,17 @@ def login_page():
 def dashboard_page():
     st.title("📊 Alertas Vencimentos")
     st.write("📅 Last Update 19/09/2025")
-    # Load data
-    url = "https://github.com/paulom40/PFonseca.py/raw/refs/heads/main/V0808.xlsx"
+    # Load data (carteira V0808 partilhada, já com Dias numérico e escalão calculado)
     try:
-        df = pd.read_excel(url)
+        df = carteira_partilhada().df
     except Exception as e:
         st.error(f"❌ Error loading file: {e}")
         return
 
-    df['Dias'] = pd.to_numeric(df['Dias'], errors='coerce')
-    df.dropna(subset=['Dias'], inplace=True)
-
-    # Define ranges
+    # Define ranges (limites em antiguidade.ESCALOES; a posição é o código do escalão)
     ranges = [
-        (0, 15, "0 a 15 dias 🟦"),
-        (16, 30, "16 a 30 dias 🟫"),
-        (31, 60, "31 a 60 dias 🟧"),
-        (61, 90, "61 a 90 dias 🟨"),
-        (91, 365, "91 a 365 dias 🟥")
+        (codigo, f"{rotulo} {emoji}")
+        for codigo, ((_, _, rotulo), emoji) in enumerate(zip(ESCALOES, ["🟦", "🟫", "🟧", "🟨", "🟥"]))
     ]
 
     # 🎛️ Sidebar filters
@@ -67,30 +63,31 @@ def dashboard_page():
     )
     selected_ranges = st.sidebar.multiselect(
         "📅 Intervalos de Dias",
-        [r[2] for r in ranges],
-        default=[r[2] for r in ranges]
+        [r[1] for r in ranges],
+        default=[r[1] for r in ranges]
     )
 
     # Filter data
-    filtered_df = df[
+    filtered_df = ordenar_por_escalao(df[
         df['Comercial'].isin(selected_comercial) &
         df['Entidade'].isin(selected_entidade)
-    ]
+    ])
 
     # 🔄 Refresh
     if st.button("🔄 Atualizar Dados"):
+        carteira_partilhada.clear()
         st.rerun()
 
     # 📋 Summary
     st.subheader("📋 Resumo")
+    resumo = resumo_escaloes(filtered_df)
     summary = []
-    for low, high, label in ranges:
+    for codigo, label in ranges:
         if label in selected_ranges:
-            range_df = filtered_df[(filtered_df['Dias'] >= low) & (filtered_df['Dias'] <= high)]
             summary.append({
                 "Intervalo": label,
-                "Quantidade": len(range_df),
-                "Valor Pendente": range_df['Valor Pendente'].sum()
+                "Quantidade": int(resumo.at[codigo, "Quantidade"]),
+                "Valor Pendente": resumo.at[codigo, "Valor Pendente"]
             })
     if summary:
         st.dataframe(pd.DataFrame(summary))
@@ -98,10 +95,10 @@ def dashboard_page():
         st.warning("⚠️ Nenhum dado nos intervalos selecionados")
 
     # 📂 Detalhes
-    for low, high, label in ranges:
+    for codigo, label in ranges:
         if label in selected_ranges:
             st.subheader(label)
-            range_df = filtered_df[(filtered_df['Dias'] >= low) & (filtered_df['Dias'] <= high)]
+            range_df = fatia_escalao(filtered_df, codigo)
             if not range_df.empty:
                 st.dataframe(range_df)
             else:
@@ -2,12 +2,16 @@ import streamlit as st
 import pandas as pd
 import json
 from pathlib import Path
-import numpy as np
 import plotly.express as px
 from datetime import datetime
-from io import BytesIO
 import re
 
+from regras_alerta import classificar, atributos_por_rotulo
+from formatacao import formatar_numero_pt, formatar_estilo
+from estilos import estilizar, regra_linhas, to_excel_estilizado
+from dados_versao import marcar_derivado, marcar_versao
+from exportacoes import botao_exportacao_formatos
+
 # -------------------------------------------------
 # 1. CONFIGURAÇÃO DA PÁGINA
 # -------------------------------------------------
@@ -73,25 +77,13 @@ st.markdown(f"""
 # -------------------------------------------------
 # 3. FORMATAÇÃO PT-PT
 # -------------------------------------------------
-def formatar_numero_pt(valor, simbolo="", sinal_forcado=False):
-    if pd.isna(valor):
-        return "N/D"
-    valor = float(valor)
-    sinal = "+" if sinal_forcado and valor >= 0 else ("-" if valor < 0 else "")
-    valor_abs = abs(valor)
-    if valor_abs == int(valor_abs):
-        return f"{sinal}{simbolo}{valor_abs:,.0f}".replace(",", " ")
-    else:
-        return f"{sinal}{simbolo}{valor_abs:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+# formatar_numero_pt e formatos de exibição/Excel vêm de formatacao.py
 
 # -------------------------------------------------
 # 4. EXPORTAÇÃO PARA EXCEL
 # -------------------------------------------------
-def to_excel(df, sheet_name="Dados"):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-    return output.getvalue()
+def to_excel(df, sheet_name="Dados", formatos=None, regras=None):
+    return to_excel_estilizado(df, formatos, regras, sheet_name=sheet_name)
 
 # -------------------------------------------------
 # 5. CARREGAMENTO DOS DADOS
@@ -115,7 +107,7 @@ def load_all_data():
         for col in ['V_Liquido', 'Qtd', 'PM']:
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
-        return df
+        return marcar_versao(df)
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
         return pd.DataFrame()
@@ -321,45 +313,17 @@ def criar_tabela_geral_clientes(df):
         df_pivot['Variacao_%'] = ((df_pivot['Qtd_Atual'] - df_pivot['Qtd_Anterior']) / 
                                  df_pivot['Qtd_Anterior'].replace(0, 1)) * 100
         
-        # Classificar alertas
-        def classificar_alerta(variacao, qtd_anterior, qtd_atual):
-            if qtd_anterior == 0 and qtd_atual > 0:
-                return "🟢 Novo Cliente"
-            elif qtd_anterior > 0 and qtd_atual == 0:
-                return "🔴 Parou de Comprar"
-            elif variacao > 50:
-                return "🟢 Subida Forte"
-            elif variacao > 20:
-                return "🟡 Subida Moderada"
-            elif variacao < -50:
-                return "🔴 Descida Forte"
-            elif variacao < -20:
-                return "🟠 Descida Moderada"
-            elif variacao > 0:
-                return "🔵 Subida Leve"
-            elif variacao < 0:
-                return "⚫ Descida Leve"
-            else:
-                return "⚪ Estável"
-        
-        df_pivot['Alerta'] = df_pivot.apply(
-            lambda x: classificar_alerta(x['Variacao_%'], x['Qtd_Anterior'], x['Qtd_Atual']), 
-            axis=1
-        )
-        
-        # Formatar números para exibição
-        for col in df_pivot.columns:
-            if col not in ['Cliente', 'Alerta', 'Variacao_%'] and df_pivot[col].dtype in [np.int64, np.float64]:
-                df_pivot[col] = df_pivot[col].apply(lambda x: formatar_numero_pt(x) if pd.notna(x) else '0')
-        
-        # Formatar variação percentual
-        df_pivot['Variacao_Formatada'] = df_pivot['Variacao_%'].apply(
-            lambda x: f"{x:+.1f}%" if pd.notna(x) else "N/D"
+        # Classificar alertas (tabela de regras partilhada, avaliada por coluna)
+        df_pivot['Alerta'] = classificar(
+            df_pivot, "variacao_mensal",
+            {"variacao": "Variacao_%", "anterior": "Qtd_Anterior", "atual": "Qtd_Atual"},
+            com_icone=True
         )
         
         # Reordenar colunas para exibição
-        colunas_finais = ['Cliente', 'Alerta', 'Variacao_Formatada'] + colunas_ordenadas[1:]
-        df_final = df_pivot[colunas_finais].rename(columns={'Variacao_Formatada': 'Variação %'})
+        # Valores ficam numéricos; a formatação é aplicada só na exibição/exportação
+        colunas_finais = ['Cliente', 'Alerta', 'Variacao_%'] + colunas_ordenadas[1:]
+        df_final = df_pivot[colunas_finais].rename(columns={'Variacao_%': 'Variação %'})
         
         return df_final
     
@@ -444,16 +408,12 @@ else:
         
         # Aplicar ordenação
         if ordenacao == "Maior Subida":
-            # Extrair valor numérico da variação para ordenação
-            df_filtrado_tabela['Var_Num'] = df_filtrado_tabela['Variação %'].str.replace('%', '').str.replace('+', '').astype(float)
-            df_filtrado_tabela = df_filtrado_tabela.sort_values('Var_Num', ascending=False)
+            df_filtrado_tabela = df_filtrado_tabela.sort_values('Variação %', ascending=False)
         elif ordenacao == "Maior Descida":
-            df_filtrado_tabela['Var_Num'] = df_filtrado_tabela['Variação %'].str.replace('%', '').str.replace('+', '').astype(float)
-            df_filtrado_tabela = df_filtrado_tabela.sort_values('Var_Num', ascending=True)
+            df_filtrado_tabela = df_filtrado_tabela.sort_values('Variação %', ascending=True)
         elif ordenacao == "Maior Qtd Atual":
             if 'Qtd_Atual' in df_filtrado_tabela.columns:
-                df_filtrado_tabela['Qtd_Num'] = df_filtrado_tabela['Qtd_Atual'].str.replace(' ', '').astype(float)
-                df_filtrado_tabela = df_filtrado_tabela.sort_values('Qtd_Num', ascending=False)
+                df_filtrado_tabela = df_filtrado_tabela.sort_values('Qtd_Atual', ascending=False)
             else:
                 df_filtrado_tabela = df_filtrado_tabela.sort_values('Cliente')
         else:
@@ -462,22 +422,14 @@ else:
         # Exibir tabela
         st.subheader(f"Visão Detalhada dos Clientes ({len(df_filtrado_tabela)} clientes)")
         
-        # Função para colorir as células baseado no alerta
-        def colorir_linhas(row):
-            alerta = row['Alerta']
-            if '🔴' in alerta or 'Parou' in alerta:
-                return ['background-color: #ffe6e6'] * len(row)
-            elif '🟢' in alerta or 'Novo' in alerta:
-                return ['background-color: #e8f5e8'] * len(row)
-            elif '🟡' in alerta:
-                return ['background-color: #fff3e0'] * len(row)
-            elif '🟠' in alerta:
-                return ['background-color: #fbe9e7'] * len(row)
-            else:
-                return [''] * len(row)
+        # Linhas coloridas pelo alerta (matriz de estilos vetorizada; regras nativas no Excel)
+        cores_alerta = atributos_por_rotulo("variacao_mensal", "cor", com_icone=True)
+        regras_tabela = [regra_linhas('Alerta', {a: f'background-color: {cor}' for a, cor in cores_alerta.items() if cor})]
         
         # Aplicar estilo à tabela
-        styled_df = df_filtrado_tabela.style.apply(colorir_linhas, axis=1)
+        colunas_qtd = [c for c in df_filtrado_tabela.columns if c not in ['Cliente', 'Alerta', 'Variação %']]
+        formatos_tabela = {'Variação %': 'variacao', **{c: 'numero_pt' for c in colunas_qtd}}
+        styled_df = formatar_estilo(estilizar(df_filtrado_tabela, regras_tabela), formatos_tabela)
         
         st.dataframe(styled_df, width='stretch', height=600)
         
@@ -496,7 +448,7 @@ else:
             # Calcular variação média (excluindo novos clientes e inativos)
             variacoes_numericas = df_filtrado_tabela[
                 ~df_filtrado_tabela['Alerta'].isin(['🟢 Novo Cliente', '🔴 Parou de Comprar'])
-            ]['Variação %'].str.replace('%', '').str.replace('+', '').astype(float)
+            ]['Variação %']
             
             if not variacoes_numericas.empty:
                 media_variacao = variacoes_numericas.mean()
@@ -505,16 +457,17 @@ else:
         with col_stat3:
             # Clientes com maior crescimento
             st.write("**Maiores Crescimentos:**")
-            top_crescimentos = df_filtrado_tabela.nlargest(3, 'Var_Num') if 'Var_Num' in df_filtrado_tabela.columns else pd.DataFrame()
+            top_crescimentos = df_filtrado_tabela.nlargest(3, 'Variação %')
             for _, row in top_crescimentos.iterrows():
-                st.write(f"📈 {row['Cliente']}: {row['Variação %']}")
+                st.write(f"📈 {row['Cliente']}: {row['Variação %']:+.1f}%")
         
         # Botão de exportação
-        st.download_button(
-            "📥 Exportar Tabela Geral",
-            to_excel(df_filtrado_tabela),
-            "tabela_geral_clientes.xlsx",
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        marcar_derivado(df_filtrado_tabela, df, clientes=clientes, artigos=artigos, comerciais=comerciais, categorias=categorias, meses=meses, anos=anos,
+                        alertas=filtro_alerta, ordenacao=ordenacao)
+        botao_exportacao_formatos(
+            "📥 Exportar Tabela Geral", df_filtrado_tabela, "AlertasComercial.tabela_geral",
+            "tabela_geral_clientes",
+            gerar_xlsx=lambda: to_excel(df_filtrado_tabela, formatos=formatos_tabela, regras=regras_tabela)
         )
         
     else:
@@ -5,9 +5,14 @@ from pathlib import Path
 import numpy as np
 import plotly.express as px
 from datetime import datetime
-from io import BytesIO
 import re
 
+from regras_alerta import classificar, atributos_por_rotulo
+from formatacao import formatar_numero_pt, formatar_estilo
+from estilos import estilizar, regra_linhas, to_excel_estilizado
+from dados_versao import marcar_derivado, marcar_versao
+from exportacoes import botao_exportacao_formatos
+
 # Configuração da página
 st.set_page_config(
     page_title="Dashboard de Vendas - BI",
@@ -45,24 +50,9 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-# Formatação PT-PT
-def formatar_numero_pt(valor, simbolo="", sinal_forcado=False):
-    if pd.isna(valor):
-        return "N/D"
-    valor = float(valor)
-    sinal = "+" if sinal_forcado and valor >= 0 else ("-" if valor < 0 else "")
-    valor_abs = abs(valor)
-    if valor_abs == int(valor_abs):
-        return f"{sinal}{simbolo}{valor_abs:,.0f}".replace(",", " ")
-    else:
-        return f"{sinal}{simbolo}{valor_abs:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-# Exportação para Excel
-def to_excel(df, sheet_name="Dados"):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-    return output.getvalue()
+# Exportação para Excel (formatação PT-PT em formatacao.py)
+def to_excel(df, sheet_name="Dados", formatos=None, regras=None):
+    return to_excel_estilizado(df, formatos, regras, sheet_name=sheet_name)
 
 # Carregamento dos dados (aba "Dados" do GitHub)
 @st.cache_data
@@ -88,7 +78,7 @@ def load_all_data():
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         
-        return df
+        return marcar_versao(df)
     except Exception as e:
         st.error(f"Erro ao carregar a aba 'Dados': {e}")
         return pd.DataFrame()
@@ -221,26 +211,16 @@ def criar_tabela_geral_clientes(df):
     if variacao_cols:
         ultima_variacao = variacao_cols[-1]
         df_pivot['Variacao_%'] = df_pivot[ultima_variacao]
-        def classificar_alerta(v, ant, atu):
-            if ant == 0 and atu > 0: return "Novo Cliente"
-            elif ant > 0 and atu == 0: return "Parou de Comprar"
-            elif v > 50: return "Subida Forte"
-            elif v > 20: return "Subida Moderada"
-            elif v < -50: return "Descida Forte"
-            elif v < -20: return "Descida Moderada"
-            elif v > 0: return "Subida Leve"
-            elif v < 0: return "Descida Leve"
-            else: return "Estável"
-        df_pivot['Alerta'] = df_pivot.apply(lambda x: classificar_alerta(x['Variacao_%'], x[colunas_mes[-2]], x[colunas_mes[-1]]), axis=1)
+        df_pivot['Qtd_Anterior'] = df_pivot[colunas_mes[-2]]
+        df_pivot['Qtd_Atual'] = df_pivot[colunas_mes[-1]]
+        df_pivot['Alerta'] = classificar(
+            df_pivot, "variacao_mensal",
+            {"variacao": "Variacao_%", "anterior": "Qtd_Anterior", "atual": "Qtd_Atual"}
+        )
     else:
         df_pivot['Alerta'] = "Estável"
         df_pivot['Variacao_%'] = 0
 
-    for col in colunas_mes:
-        df_pivot[col] = df_pivot[col].apply(lambda x: formatar_numero_pt(x) if pd.notna(x) else '0')
-    for col in variacao_cols:
-        df_pivot[col] = df_pivot[col].apply(lambda x: f"{x:+.1f}%" if pd.notna(x) else "N/D")
-
     colunas_mes_rev = colunas_mes[::-1]
     variacao_rev = [f"Var.% {m}" for m in colunas_mes_rev]
     colunas_finais = ['Cliente', 'Alerta'] + [item for pair in zip(variacao_rev, colunas_mes_rev) for item in pair]
@@ -295,20 +275,19 @@ else:
 
         st.subheader("Filtros da Tabela")
         filtro_alerta = st.multiselect("Filtrar por Alerta:", options=sorted(df_tabela_geral['Alerta'].unique()), default=sorted(df_tabela_geral['Alerta'].unique()))
-        df_filtrado_tabela = df_tabela_geral[df_tabela_geral['Alerta'].isin(filtro_alerta)]
+        df_filtrado_tabela = marcar_derivado(df_tabela_geral[df_tabela_geral['Alerta'].isin(filtro_alerta)], df,
+                                             clientes=clientes, artigos=artigos, comerciais=comerciais, categorias=categorias, meses=meses, anos=anos, alertas=filtro_alerta)
 
-        def colorir_linhas(row):
-            alerta = row['Alerta']
-            if 'Parou' in alerta or 'Descida Forte' in alerta: return ['background-color: #ffe6e6'] * len(row)
-            elif 'Novo' in alerta or 'Subida Forte' in alerta: return ['background-color: #e8f5e8'] * len(row)
-            elif 'Subida Moderada' in alerta: return ['background-color: #fff3e0'] * len(row)
-            elif 'Descida Moderada' in alerta: return ['background-color: #fbe9e7'] * len(row)
-            else: return [''] * len(row)
+        cores_alerta = atributos_por_rotulo("variacao_mensal", "cor")
+        regras_tabela = [regra_linhas('Alerta', {a: f'background-color: {cor}' for a, cor in cores_alerta.items() if cor})]
 
-        styled_df = df_filtrado_tabela.style.apply(colorir_linhas, axis=1)
+        formatos_tabela = {c: ('variacao' if c.startswith('Var.% ') else 'numero_pt')
+                           for c in df_filtrado_tabela.columns if c not in ['Cliente', 'Alerta']}
+        styled_df = formatar_estilo(estilizar(df_filtrado_tabela, regras_tabela), formatos_tabela)
         st.dataframe(styled_df, width="stretch", height=600)
 
-        st.download_button("Exportar Tabela Geral", to_excel(df_filtrado_tabela), "tabela_geral_clientes.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        botao_exportacao_formatos("Exportar Tabela Geral", df_filtrado_tabela, "ArtCliente.tabela_geral", "tabela_geral_clientes",
+                                  gerar_xlsx=lambda: to_excel(df_filtrado_tabela, formatos=formatos_tabela, regras=regras_tabela))
     else:
         st.warning("Não foi possível gerar a tabela geral (poucos períodos).")
 
@@ -320,8 +299,10 @@ else:
         clientes_unicos = sorted(df_qtd_artigo['Cliente'].unique())
         cliente_selecionado = st.selectbox("Selecione o Cliente:", ["Todos"] + clientes_unicos, key="cliente_artigo")
         df_display = df_qtd_artigo if cliente_selecionado == "Todos" else df_qtd_artigo[df_qtd_artigo['Cliente'] == cliente_selecionado]
+        marcar_derivado(df_display, df, clientes=clientes, artigos=artigos, comerciais=comerciais, categorias=categorias, meses=meses, anos=anos, cliente=cliente_selecionado)
         st.dataframe(df_display, width="stretch", height=600)
-        st.download_button("Exportar Detalhes de Artigos", to_excel(df_display), "detalhes_artigos_clientes.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        botao_exportacao_formatos("Exportar Detalhes de Artigos", df_display, "ArtCliente.detalhes_artigos", "detalhes_artigos_clientes",
+                                  gerar_xlsx=lambda: to_excel(df_display))
 
         # Gráfico com rótulos
         st.markdown("<div class='section-header'>Tendência de Vendas por Artigo</div>", unsafe_allow_html=True)
@@ -1,8 +1,14 @@
 import streamlit as st
 import pandas as pd
 import io
+from functools import partial
+
 import altair as alt
 
+from dados_versao import chave_filtros, marcar_versao, versao_dados
+from exportacoes import botao_exportacao
+from rankings import rankings_em_cache
+
 st.markdown("""
     <style>
     #MainMenu {visibility: hidden;}
@@ -29,7 +35,7 @@ def load_data():
     df['ANO'] = pd.to_numeric(df['ANO'], errors='coerce').astype('Int64')
     df['KGS'] = pd.to_numeric(df['KGS'], errors='coerce')
     df['PM'] = pd.to_numeric(df['PM'], errors='coerce')
-    return df
+    return marcar_versao(df)
 
 # Load data
 df = load_data()
@@ -76,15 +82,41 @@ if not filtered_df.empty:
 else:
     st.warning("Nenhum dado encontrado com os filtros selecionados.")
 
+# Excel exports are only built when a download is requested (cached per data version + filters)
+def excel_filtrado(filtered_df):
+    excel_buffer = io.BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
+        filtered_df.to_excel(writer, index=False, sheet_name='Filtrado')
+    return excel_buffer.getvalue()
+
+
+def excel_ano(year, top_15, bottom_15, kgs_agg):
+    year_excel_buffer = io.BytesIO()
+    with pd.ExcelWriter(year_excel_buffer, engine='openpyxl') as writer:
+        # Create sheets for top and bottom data
+        top_15.to_excel(writer, sheet_name=f'Top15_{year}', index=False)
+        bottom_15.to_excel(writer, sheet_name=f'Bottom15_{year}', index=False)
+        kgs_agg.to_excel(writer, sheet_name=f'Todos_Artigos_{year}', index=False)
+    return year_excel_buffer.getvalue()
+
+
+def excel_resumo(summary_df, detalhes_por_ano):
+    summary_excel_buffer = io.BytesIO()
+    with pd.ExcelWriter(summary_excel_buffer, engine='openpyxl') as writer:
+        # Summary sheet with all columns
+        summary_df.to_excel(writer, sheet_name='Resumo_Geral', index=False)
+
+        # Also include detailed data for each year in separate sheets
+        for year, year_data in detalhes_por_ano.items():
+            year_data.to_excel(writer, sheet_name=f'Detalhes_{year}', index=False)
+    return summary_excel_buffer.getvalue()
+
+
 # Download filtered data as Excel
-excel_buffer = io.BytesIO()
-with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-    filtered_df.to_excel(writer, index=False, sheet_name='Filtrado')
-st.download_button(
-    label="📥 Baixar dados filtrados em Excel",
-    data=excel_buffer.getvalue(),
-    file_name="dados_filtrados.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+botao_exportacao(
+    "📥 Baixar dados filtrados em Excel", df, "ArtigosAnos.filtrado.xlsx",
+    partial(excel_filtrado, filtered_df), file_name="dados_filtrados.xlsx",
+    filtros=chave_filtros(produto=selected_produto, mes=selected_mes, ano=selected_ano)
 )
 
 # Line chart for KGS
@@ -128,93 +160,92 @@ st.write("### 📦 Top e Bottom 15 Artigos por Quantidade (KGS) - Relatórios An
 # Define the years we want to analyze
 target_years = [2023, 2024, 2025]
 
+# Rankings for every year in one grouped pass (partitioned by ANO), cached per data version + filters
+ranking_df = df[
+    (df['PRODUTO'].isin(selected_produto)) &
+    (df['MES'].isin(selected_mes)) &
+    (df['ANO'].isin(target_years)) &
+    (df['KGS'].notnull())
+]
+rankings = rankings_em_cache(
+    ranking_df, versao_dados(df), chave_filtros(produto=selected_produto, mes=selected_mes),
+    'PRODUTO', ('KGS',), particao='ANO', k=15, bottom=True
+)
+agregado_por_ano = dict(tuple(rankings['agregado'].groupby('ANO')))
+top_por_ano = dict(tuple(rankings['top']['KGS'].groupby('ANO')))
+bottom_por_ano = dict(tuple(rankings['bottom']['KGS'].groupby('ANO')))
+meses_por_ano = ranking_df.groupby('ANO')['MES'].nunique()
+
 for year in target_years:
-    # Filter data for the specific year, but keep product and month filters
-    year_filtered_df = df[
-        (df['PRODUTO'].isin(selected_produto)) &
-        (df['MES'].isin(selected_mes)) &
-        (df['ANO'] == year)
-    ].copy()
-    
-    if 'KGS' in year_filtered_df.columns and year_filtered_df['KGS'].notnull().any():
-        kgs_data = year_filtered_df[year_filtered_df['KGS'].notnull()].copy()
+    if year in agregado_por_ano:
+        # Total KGS per product for the year
+        kgs_agg = agregado_por_ano[year][['PRODUTO', 'KGS']]
         
-        if not kgs_data.empty:
-            # Group by product to get total KGS for the year
-            kgs_agg = kgs_data.groupby('PRODUTO')['KGS'].sum().reset_index()
+        # Calculate average KGS for the year
+        avg_kgs_year = kgs_agg['KGS'].mean()
+        
+        # Top 15 and bottom 15 articles for the year
+        top_15 = top_por_ano[year][['PRODUTO', 'KGS']].round(2)
+        bottom_15 = bottom_por_ano[year][['PRODUTO', 'KGS']].round(2)
+        
+        # Display year section in an expander
+        with st.expander(f"📊 Ano {year}", expanded=True):
+            st.metric(f"📦 Quantidade Média (KGS) {year}", f"{avg_kgs_year:,.2f}")
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.write(f"**Top 15 Artigos {year} (Maior KGS)**")
+                if not top_15.empty:
+                    st.dataframe(
+                        top_15.rename(columns={'PRODUTO': 'Artigo', 'KGS': 'Quantidade (KGS)'}),
+                        width='stretch'
+                    )
+                else:
+                    st.info("ℹ️ Não há dados suficientes para os top 15 artigos.")
             
-            # Calculate average KGS for the year
-            avg_kgs_year = kgs_agg['KGS'].mean()
+            with col2:
+                st.write(f"**Bottom 15 Artigos {year} (Menor KGS)**")
+                if not bottom_15.empty:
+                    st.dataframe(
+                        bottom_15.rename(columns={'PRODUTO': 'Artigo', 'KGS': 'Quantidade (KGS)'}),
+                        width='stretch'
+                    )
+                else:
+                    st.info("ℹ️ Não há dados suficientes para os bottom 15 artigos.")
             
-            # Get top 15 and bottom 15 articles for the year
-            top_15 = kgs_agg.nlargest(15, 'KGS')[['PRODUTO', 'KGS']].round(2)
-            bottom_15 = kgs_agg.nsmallest(15, 'KGS')[['PRODUTO', 'KGS']].round(2)
+            # Download button for this year (workbook built on click)
+            botao_exportacao(
+                f"📥 Baixar Relatório {year} em Excel", df, f"ArtigosAnos.ano_{year}.xlsx",
+                partial(excel_ano, year, top_15, bottom_15, kgs_agg),
+                file_name=f"relatorio_artigos_{year}.xlsx",
+                filtros=chave_filtros(produto=selected_produto, mes=selected_mes),
+                key=f"download_{year}"  # Unique key for each button
+            )
+            
+            # Show year summary
+            st.write("**Resumo do Ano:**")
+            st.write(f"- **Total de artigos únicos:** {len(kgs_agg)}")
+            st.write(f"- **Total KGS do ano:** {kgs_agg['KGS'].sum():,.2f}")
+            st.write(f"- **Meses com dados:** {meses_por_ano[year]}")
             
-            # Display year section in an expander
-            with st.expander(f"📊 Ano {year}", expanded=True):
-                st.metric(f"📦 Quantidade Média (KGS) {year}", f"{avg_kgs_year:,.2f}")
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.write(f"**Top 15 Artigos {year} (Maior KGS)**")
-                    if not top_15.empty:
-                        st.dataframe(
-                            top_15.rename(columns={'PRODUTO': 'Artigo', 'KGS': 'Quantidade (KGS)'}),
-                            width='stretch'
-                        )
-                    else:
-                        st.info("ℹ️ Não há dados suficientes para os top 15 artigos.")
-                
-                with col2:
-                    st.write(f"**Bottom 15 Artigos {year} (Menor KGS)**")
-                    if not bottom_15.empty:
-                        st.dataframe(
-                            bottom_15.rename(columns={'PRODUTO': 'Artigo', 'KGS': 'Quantidade (KGS)'}),
-                            width='stretch'
-                        )
-                    else:
-                        st.info("ℹ️ Não há dados suficientes para os bottom 15 artigos.")
-                
-                # Create Excel download for this year's data
-                year_excel_buffer = io.BytesIO()
-                with pd.ExcelWriter(year_excel_buffer, engine='openpyxl') as writer:
-                    # Create sheets for top and bottom data
-                    top_15.to_excel(writer, sheet_name=f'Top15_{year}', index=False)
-                    bottom_15.to_excel(writer, sheet_name=f'Bottom15_{year}', index=False)
-                    kgs_agg.to_excel(writer, sheet_name=f'Todos_Artigos_{year}', index=False)
-                
-                # Download button for this year
-                st.download_button(
-                    label=f"📥 Baixar Relatório {year} em Excel",
-                    data=year_excel_buffer.getvalue(),
-                    file_name=f"relatorio_artigos_{year}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    key=f"download_{year}"  # Unique key for each button
-                )
-                
-                # Show year summary
-                st.write("**Resumo do Ano:**")
-                st.write(f"- **Total de artigos únicos:** {len(kgs_agg)}")
-                st.write(f"- **Total KGS do ano:** {kgs_agg['KGS'].sum():,.2f}")
-                st.write(f"- **Meses com dados:** {len(kgs_data['MES'].unique())}")
-                
-        else:
-            st.info(f"ℹ️ Não há dados de KGS válidos para o ano {year} com os filtros aplicados.")
     else:
-        st.info(f"ℹ️ Não há dados de KGS válidos para o ano {year}.")
+        st.info(f"ℹ️ Não há dados de KGS válidos para o ano {year} com os filtros aplicados.")
 
 # Overall summary across all target years with download button
 st.write("### 📊 Resumo Geral dos Anos 2023-2025")
 
 # Create a summary dataframe for all target years with filter information
 summary_data = []
+detalhes_por_ano = {}
 for year in target_years:
     year_data = df[
         (df['PRODUTO'].isin(selected_produto)) &
         (df['MES'].isin(selected_mes)) &
         (df['ANO'] == year)
     ]
+    if not year_data.empty:
+        detalhes_por_ano[year] = year_data
     if not year_data.empty and 'KGS' in year_data.columns:
         total_kgs_year = year_data['KGS'].sum()
         unique_products = year_data['PRODUTO'].nunique()
@@ -246,26 +277,11 @@ if summary_data:
     st.dataframe(display_df, width='stretch')
     
     # Download button for overall summary
-    summary_excel_buffer = io.BytesIO()
-    with pd.ExcelWriter(summary_excel_buffer, engine='openpyxl') as writer:
-        # Summary sheet with all columns
-        summary_df.to_excel(writer, sheet_name='Resumo_Geral', index=False)
-        
-        # Also include detailed data for each year in separate sheets
-        for year in target_years:
-            year_data = df[
-                (df['PRODUTO'].isin(selected_produto)) &
-                (df['MES'].isin(selected_mes)) &
-                (df['ANO'] == year)
-            ]
-            if not year_data.empty:
-                year_data.to_excel(writer, sheet_name=f'Detalhes_{year}', index=False)
-    
-    st.download_button(
-        label="📥 Baixar Resumo Geral em Excel",
-        data=summary_excel_buffer.getvalue(),
+    botao_exportacao(
+        "📥 Baixar Resumo Geral em Excel", df, "ArtigosAnos.resumo.xlsx",
+        partial(excel_resumo, summary_df, detalhes_por_ano),
         file_name="resumo_geral_2023_2025.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        filtros=chave_filtros(produto=selected_produto, mes=selected_mes)
     )
 else:
     st.info("ℹ️ Não há dados para gerar o resumo geral.")
@@ -4,6 +4,13 @@ import numpy as np
 import io
 from datetime import datetime
 
+from dados_versao import chave_filtros, marcar_versao, versao_dados
+from estilos import aplicar_regras_excel, estilizar, regra_gradiente
+from tabelas import tabela_paginada
+from rankings import rankings_em_cache
+from seccoes import seccoes_lazy
+from regras_alerta import classificar, atributos_por_rotulo
+
 st.set_page_config(page_title="Bolama Dashboard", layout="wide", page_icon="📊")
 
 @st.cache_data
@@ -56,7 +63,7 @@ def load_data_from_github():
     st.sidebar.markdown("### 📅 Meses detectados")
     st.sidebar.write(sorted(df["Mês"].unique()))
 
-    return df
+    return marcar_versao(df)
 
 # Carregamento inicial
 if "df" not in st.session_state:
@@ -98,39 +105,17 @@ with col2:
     st.metric("Total Vendas Líquidas", f"€ {kpi_df['V Líquido'].sum():,.2f}")
 
 st.markdown("### 🏆 Top 10 Artigos por Mês")
-top_artigos = (
-    filtered_df.groupby(["Mês", "Artigo"])
-    .agg({"Quantidade": "sum", "V Líquido": "sum"})
-    .sort_values(by="V Líquido", ascending=False)
-    .groupby("Mês")
-    .head(10)
-    .reset_index()
-)
-
-st.markdown("### 📋 Resultados Filtrados")
-st.dataframe(
-    filtered_df.style.background_gradient(cmap="YlGnBu").format({
-        "Quantidade": "{:.2f}",
-        "V Líquido": "€ {:.2f}"
-    }),
-    use_container_width=True
-)
-
-st.markdown("### 📌 Top Artigos")
-st.dataframe(
-    top_artigos.style.background_gradient(cmap="OrRd").format({
-        "Quantidade": "{:.2f}",
-        "V Líquido": "€ {:.2f}"
-    }),
-    use_container_width=True
-)
-
-tab1, tab2 = st.tabs(["📊 Dashboard Principal", "📈 Crescimento por Artigo (2024 vs 2025)"])
-
-with tab2:
-    st.markdown("### 📈 Percentagem de Crescimento por Artigo entre 2024 e 2025")
+top_artigos = rankings_em_cache(
+    filtered_df, versao_dados(df), chave_filtros(artigo=selected_artigo, mes=selected_mes),
+    "Artigo", ("V Líquido", "Quantidade"), particao="Mês", k=10
+)["top"]["V Líquido"]
+
 
-    df_growth = df[df["Data"].dt.year.isin([2024, 2025])].copy()
+# ====================== SECÇÕES ======================
+@st.cache_data(max_entries=4, show_spinner=False)
+def calcular_crescimento(_df, versao):
+    """Crescimento por Artigo/Mês 2024 vs 2025 (não depende dos filtros)."""
+    df_growth = _df[_df["Data"].dt.year.isin([2024, 2025])].copy()
     df_growth["Ano"] = df_growth["Data"].dt.year
     df_growth["Mês"] = df_growth["Data"].dt.strftime("%m")
 
@@ -147,29 +132,49 @@ with tab2:
 
     crescimento_df = pd.merge(pivot_qtd, pivot_vl, on=["Artigo", "Mês"])
 
-    crescimento_df["Crescimento Qtd (%)"] = crescimento_df.apply(
-        lambda row: ((row["Qtd 2025"] - row["Qtd 2024"]) / row["Qtd 2024"] * 100)
-        if pd.notnull(row["Qtd 2024"]) and row["Qtd 2024"] != 0 else None,
-        axis=1
+    # Crescimento vetorizado: sem base em 2024 (NaN ou 0) fica sem valor
+    base_qtd = crescimento_df["Qtd 2024"].where(crescimento_df["Qtd 2024"] != 0)
+    base_vl = crescimento_df["Vendas 2024"].where(crescimento_df["Vendas 2024"] != 0)
+    crescimento_df["Crescimento Qtd (%)"] = ((crescimento_df["Qtd 2025"] - base_qtd) / base_qtd * 100).round(2)
+    crescimento_df["Crescimento Vendas (%)"] = ((crescimento_df["Vendas 2025"] - base_vl) / base_vl * 100).round(2)
+    return crescimento_df
+
+
+def seccao_dashboard():
+    st.markdown("### 📋 Resultados Filtrados")
+    # só a página visível é formatada/pintada e enviada ao browser
+    tabela_paginada(
+        filtered_df, "bolama_filtrados",
+        formatos={"Quantidade": "decimal", "V Líquido": "euro"},
+        regras=[regra_gradiente(cmap="YlGnBu")],
+        chave=(versao_dados(df), chave_filtros(artigo=selected_artigo, mes=selected_mes))
     )
-    crescimento_df["Crescimento Vendas (%)"] = crescimento_df.apply(
-        lambda row: ((row["Vendas 2025"] - row["Vendas 2024"]) / row["Vendas 2024"] * 100)
-        if pd.notnull(row["Vendas 2024"]) and row["Vendas 2024"] != 0 else None,
-        axis=1
+
+    st.markdown("### 📌 Top Artigos")
+    st.dataframe(
+        estilizar(top_artigos.style.format({
+            "Quantidade": "{:.2f}",
+            "V Líquido": "€ {:.2f}"
+        }), [regra_gradiente(cmap="OrRd")]),
+        use_container_width=True
     )
 
-    crescimento_df["Crescimento Qtd (%)"] = crescimento_df["Crescimento Qtd (%)"].round(2)
-    crescimento_df["Crescimento Vendas (%)"] = crescimento_df["Crescimento Vendas (%)"].round(2)
 
-    def highlight_growth(val):
-        if pd.isna(val):
-            return "background-color: #D9D9D9; color: #404040; font-style: italic"
-        elif val < 0:
-            return "background-color: #FFC7CE; color: #9C0006"
-        elif val == 0:
-            return "background-color: #FFEB9C; color: #9C6500"
-        else:
-            return "background-color: #C6EFCE; color: #006100"
+def seccao_crescimento():
+    st.markdown("### 📈 Percentagem de Crescimento por Artigo entre 2024 e 2025")
+
+    crescimento_df = calcular_crescimento(df, versao_dados(df))
+
+    cores_crescimento = atributos_por_rotulo("crescimento", "cor")
+    fontes_crescimento = atributos_por_rotulo("crescimento", "fonte")
+
+    def highlight_growth(bloco):
+        estilos = pd.DataFrame("", index=bloco.index, columns=bloco.columns)
+        for col in bloco.columns:
+            rotulos = classificar(bloco, "crescimento", {"variacao": col})
+            estilos[col] = "background-color: " + rotulos.map(cores_crescimento) + "; color: " + rotulos.map(fontes_crescimento)
+            estilos.loc[rotulos == "Sem dados", col] += "; font-style: italic"
+        return estilos
 
     styled_df = crescimento_df.style.format({
         "Qtd 2024": "{:.2f}",
@@ -178,7 +183,7 @@ with tab2:
         "Vendas 2025": "€ {:.2f}",
         "Crescimento Qtd (%)": "{:.2f}%",
         "Crescimento Vendas (%)": "{:.2f}%"
-    }).applymap(highlight_growth, subset=["Crescimento Qtd (%)", "Crescimento Vendas (%)"])
+    }).apply(highlight_growth, axis=None, subset=["Crescimento Qtd (%)", "Crescimento Vendas (%)"])
 
     st.dataframe(styled_df, use_container_width=True)
 
@@ -187,6 +192,9 @@ with tab2:
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         filtered_df.to_excel(writer, index=False, sheet_name='Dados Filtrados')
         top_artigos.to_excel(writer, index=False, sheet_name='Top Artigos')
+        # gradientes do ecrã como escalas de cor nativas
+        aplicar_regras_excel(writer, 'Dados Filtrados', filtered_df, [regra_gradiente(cmap="YlGnBu")])
+        aplicar_regras_excel(writer, 'Top Artigos', top_artigos, [regra_gradiente(cmap="OrRd")])
         crescimento_df.to_excel(writer, index=False, sheet_name='Crescimento')
 
         # Aba com meses ausentes
@@ -249,3 +257,10 @@ with tab2:
         file_name=nome_ficheiro,
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
+
+
+# Só a secção visível é calculada
+seccoes_lazy({
+    "📊 Dashboard Principal": seccao_dashboard,
+    "📈 Crescimento por Artigo (2024 vs 2025)": seccao_crescimento,
+}, key="seccao_bolama")
@@ -3,7 +3,10 @@ import pandas as pd
 import requests
 from io import BytesIO
 import numpy as np
-import re
+
+from dados_versao import marcar_versao, versao_dados
+from motor_alertas import motor_alertas
+from regras_alerta import classificar, atributos_por_rotulo
 
 st.markdown("""
     <style>
@@ -151,10 +154,32 @@ def load_data(url):
         if 'Categoria' in df.columns:
             df['Categoria'] = df['Categoria'].astype(str).replace('nan', '')
         
-        return df, faltando
+        return marcar_versao(df), faltando
     except Exception as e:
         return None, [f"Erro ao carregar dados: {str(e)}"]
 
+def avaliar_variacoes(linhas, periodos):
+    """Variações entre meses consecutivos (`periodos` = [(ano, mês)]) por Cliente/Artigo, classificadas."""
+    qtd = (
+        linhas.groupby(['Cliente', 'Artigo', 'Ano', 'Mês'])['Qtd.'].sum()
+        .unstack(['Ano', 'Mês'])
+        .reindex(columns=pd.MultiIndex.from_tuples(periodos))
+        .fillna(0)
+    )
+    valores = qtd.to_numpy(dtype=float)
+    anterior, atual = valores[:, :-1], valores[:, 1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variacao = np.nan_to_num(np.round((atual - anterior) / np.where(anterior == 0, np.nan, anterior) * 100, 2))
+    rotulos = [f"{meses_pt.get(int(mes), f'Mês {mes}')} {ano}" for ano, mes in periodos[1:]]
+    variacoes = pd.DataFrame({
+        'Cliente': np.repeat(qtd.index.get_level_values('Cliente'), len(rotulos)),
+        'Artigo': np.repeat(qtd.index.get_level_values('Artigo'), len(rotulos)),
+        'Variação (%)': variacao.ravel(),
+        'Período': np.tile(rotulos, len(qtd)),
+    })
+    variacoes['Tipo'] = classificar(variacoes, "variacao_significativa", {"variacao": "Variação (%)"})
+    return variacoes
+
 # Update Data button to refresh data
 if st.button("Update Data"):
     with st.spinner("Atualizando dados..."):
@@ -194,6 +219,7 @@ if not selected_meses:
 meses_nums = [obter_numero_mes(m) for m in selected_meses if obter_numero_mes(m) is not None]
 df_anos = df[df['Ano'].isin(anos_selecionados)]
 df_filtrado = df_anos[df_anos['Mês'].isin(meses_nums)] if meses_nums else pd.DataFrame()
+df_periodo = df_filtrado  # antes dos filtros opcionais: base do motor de alertas
 
 # Filtros opcionais
 st.subheader("Filtros Opcionais")
@@ -260,50 +286,52 @@ with st.spinner("Calculando..."):
 
 # Alertas de variações significativas
 st.subheader("🚨 Alertas de Variações")
+df_alertas = pd.DataFrame(columns=['Tipo', 'Cliente', 'Artigo', 'Variação (%)', 'Período'])
+alertas = []
 if len(month_cols) > 1 and not pivot.empty:
-    threshold_aumento = 50
-    threshold_reducao = -50
-    alertas = []
-    for i in range(1, len(month_cols)):
-        prev = month_cols[i-1]
-        curr = month_cols[i]
-        var_col = f"Variação {curr} vs {prev} (%)"
-        significant = pivot[(pivot[var_col].astype(float) > threshold_aumento) | (pivot[var_col].astype(float) < threshold_reducao)]
-        for _, row in significant.iterrows():
-            var = float(row[var_col])
-            if var > threshold_aumento:
-                alertas.append(f"<div class='alert-success'>↑ Aumento: {row['Cliente']} / {row['Artigo']} - {var:.1f}% em {curr}</div>")
-            elif var < threshold_reducao:
-                alertas.append(f"<div class='alert-error'>↓ Redução: {row['Cliente']} / {row['Artigo']} - {var:.1f}% em {curr}</div>")
-    
+    # Motor incremental: só os pares Cliente/Artigo com linhas alteradas são reavaliados
+    periodos = tuple(sorted({(int(a), int(m)) for a, m in zip(df_periodo['Ano'], df_periodo['Mês'])}))
+    # um motor por seleção de períodos: sessões com seleções diferentes não recomeçam o estado umas das outras
+    nome_periodos = "_".join(f"{a}-{m}" for a, m in periodos)
+    motor = motor_alertas(f"CliArtComp.variacoes.{nome_periodos}", ('Cliente', 'Artigo'), avaliar_variacoes,
+                          colunas=('Cliente', 'Artigo', 'Ano', 'Mês', 'Qtd.'), identidade=('Período', 'Tipo'))
+    resultado = motor.atualizar(df_periodo, periodos, versao_dados(df))
+    ativos = resultado["ativos"]
+    # os filtros opcionais só restringem o que é mostrado
+    visiveis = pd.MultiIndex.from_frame(pivot[['Cliente', 'Artigo']])
+    ativos = ativos[pd.MultiIndex.from_frame(ativos[['Cliente', 'Artigo']]).isin(visiveis)]
+    ordem_periodos = {p: i for i, p in enumerate(month_cols)}
+    df_alertas = (
+        ativos.assign(_ordem=ativos['Período'].map(ordem_periodos))
+        .sort_values(['_ordem', 'Cliente', 'Artigo'])[['Tipo', 'Cliente', 'Artigo', 'Variação (%)', 'Período']]
+    )
+    # novos/resolvidos face ao que esta sessão viu da última vez (o motor é partilhado entre sessões)
+    vistos = set(map(tuple, resultado["ativos"][['Cliente', 'Artigo', 'Período', 'Tipo']].astype(str).to_numpy()))
+    anteriores = st.session_state.get(f"cliartcomp_alertas_{nome_periodos}")
+    st.session_state[f"cliartcomp_alertas_{nome_periodos}"] = vistos
+    if anteriores is not None and (vistos - anteriores or anteriores - vistos):
+        st.caption(f"🆕 {len(vistos - anteriores)} novos · ✅ {len(anteriores - vistos)} resolvidos desde a última atualização")
+
+    if not df_alertas.empty:
+        classes = df_alertas['Tipo'].map(atributos_por_rotulo("variacao_significativa", "classe"))
+        icones = df_alertas['Tipo'].map(atributos_por_rotulo("variacao_significativa", "icone"))
+        alertas = (
+            "<div class='" + classes + "'>" + icones + " " + df_alertas['Tipo'] + ": "
+            + df_alertas['Cliente'].astype(str) + " / " + df_alertas['Artigo'].astype(str) + " - "
+            + df_alertas['Variação (%)'].map("{:.1f}".format) + "% em " + df_alertas['Período'] + "</div>"
+        ).tolist()
+
     if alertas:
-        for alerta in alertas:
-            st.markdown(alerta, unsafe_allow_html=True)
+        st.markdown("\n".join(alertas), unsafe_allow_html=True)
     else:
         st.info("Nenhuma variação significativa detectada.")
 else:
     st.info("Nenhuma variação significativa detectada (dados insuficientes ou menos de dois meses selecionados).")
 
 # Exportação de Alertas
-def export_alerts_to_excel(alertas):
-    if not alertas:
+def export_alerts_to_excel(df_alertas):
+    if df_alertas.empty:
         return None
-    # Parse alerts into a DataFrame
-    alert_data = []
-    for alerta in alertas:
-        # Extract information from the alert HTML string
-        match = re.search(r'(↑ Aumento|↓ Redução): (.*?) / (.*?) - ([\-\d\.]+)% em (.*?)<', alerta)
-        if match:
-            tipo, cliente, artigo, variacao, periodo = match.groups()
-            alert_data.append({
-                'Tipo': 'Aumento' if tipo == '↑ Aumento' else 'Redução',
-                'Cliente': cliente,
-                'Artigo': artigo,
-                'Variação (%)': float(variacao),
-                'Período': periodo
-            })
-    df_alertas = pd.DataFrame(alert_data)
-    
     # Export to Excel
     output = BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
@@ -316,10 +344,10 @@ def export_alerts_to_excel(alertas):
 
 # Add export button for alerts
 st.subheader("📥 Exportar Alertas")
-if 'alertas' in locals() and alertas:
+if not df_alertas.empty:
     if st.button("Gerar Excel com Alertas"):
         with st.spinner("Gerando relatório de alertas..."):
-            excel_alerts_data = export_alerts_to_excel(alertas)
+            excel_alerts_data = export_alerts_to_excel(df_alertas)
             if excel_alerts_data:
                 st.download_button(
                     label="Baixar Alertas em Excel",
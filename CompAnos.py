@@ -3,31 +3,44 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import io
 from datetime import datetime
-import xlsxwriter.utility
+
+from atividade import indice_atividade
+from dados_versao import chave_filtros, marcar_versao
+from estilos import aplicar_regras_excel, estilizar, regra_bandas
+from exportacoes import botao_exportacao
 
 st.set_page_config(page_title="Análise de Compras", layout="wide")
 st.title("📊 Análise de Compras por Cliente")
 
 # Fonte do Excel
 github_excel_url = "https://raw.githubusercontent.com/paulom40/PFonseca.py/main/Vendas2025.xlsx"
-df = pd.read_excel(github_excel_url)
 
-# Normaliza colunas
-df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
 
-# Limpa valores para garantir que os filtros funcionem
-df["nome_cliente"] = df["nome_cliente"].astype(str).str.strip()
-df["comercial"] = df["comercial"].astype(str).str.strip()
+@st.cache_data
+def carregar_dados():
+    df = pd.read_excel(github_excel_url)
+
+    # Normaliza colunas
+    df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
+
+    # Limpa valores para garantir que os filtros funcionem
+    df["nome_cliente"] = df["nome_cliente"].astype(str).str.strip()
+    df["comercial"] = df["comercial"].astype(str).str.strip()
 
-# Mapeia nomes de meses para números
-mes_map = {
-    "janeiro": 1, "fevereiro": 2, "março": 3, "abril": 4,
-    "maio": 5, "junho": 6, "julho": 7, "agosto": 8,
-    "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12
-}
-df["mês"] = df["mês"].astype(str).str.strip().str.lower().map(mes_map)
-df["ano"] = pd.to_numeric(df["ano"], errors="coerce").fillna(0).astype(int)
-df["trimestre"] = pd.to_datetime(dict(year=df["ano"], month=df["mês"], day=1)).dt.to_period("Q")
+    # Mapeia nomes de meses para números
+    mes_map = {
+        "janeiro": 1, "fevereiro": 2, "março": 3, "abril": 4,
+        "maio": 5, "junho": 6, "julho": 7, "agosto": 8,
+        "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12
+    }
+    df["mês"] = df["mês"].astype(str).str.strip().str.lower().map(mes_map)
+    df["ano"] = pd.to_numeric(df["ano"], errors="coerce").fillna(0).astype(int)
+    df["trimestre"] = pd.to_datetime(dict(year=df["ano"], month=df["mês"], day=1)).dt.to_period("Q")
+    df["data_compra"] = pd.to_datetime(dict(year=df["ano"], month=df["mês"], day=1))
+    return marcar_versao(df)
+
+
+df = carregar_dados()
 
 # Filtros na sidebar
 st.sidebar.header("🎚️ Filtros")
@@ -69,12 +82,11 @@ alertas = compras_mensais.sort_values(["nome_cliente", "ano", "mês"])
 alertas["queda"] = alertas.groupby(["nome_cliente", "ano"])["total_liquido"].diff()
 alertas_queda = alertas[alertas["queda"] < 0]
 
-df_filtrado["data_compra"] = pd.to_datetime(dict(year=df_filtrado["ano"], month=df_filtrado["mês"], day=1))
-ultimas_compras = df_filtrado.groupby("nome_cliente")["data_compra"].max().reset_index()
-ultimas_compras["dias_sem_compra"] = (datetime.today() - ultimas_compras["data_compra"]).dt.days
-alertas_inativos = ultimas_compras[ultimas_compras["dias_sem_compra"] > 60].copy()
+# Última compra por cliente: índice mantido incrementalmente entre reruns
+indice_compras = indice_atividade("CompAnos.nome_cliente", "nome_cliente", "data_compra").sincronizar(df)
+clientes_visiveis = df_filtrado["nome_cliente"].unique()
+alertas_inativos = indice_compras.banda(60, None, datetime.today(), clientes_visiveis).rename(columns={"dias": "dias_sem_compra"})
 alertas_inativos["status"] = "🔴 Inativo"
-alertas_inativos = alertas_inativos.sort_values("dias_sem_compra", ascending=False)
 
 # Resumo mensal
 resumo_mensal = df_filtrado.groupby(["ano", "mês"])["total_liquido"].sum().reset_index()
@@ -110,64 +122,50 @@ st.dataframe(alertas_queda[["nome_cliente", "ano", "mês", "total_liquido", "que
 }))
 
 st.subheader("🚨 Clientes sem compras há mais de 60 dias")
-def colorir_linha(row):
-    if row["dias_sem_compra"] > 120:
-        return ["background-color: #ffcccc"] * len(row)
-    elif row["dias_sem_compra"] > 90:
-        return ["background-color: #ffe5b4"] * len(row)
-    else:
-        return ["background-color: #ffffcc"] * len(row)
-st.dataframe(alertas_inativos.style.apply(colorir_linha, axis=1))
+# mesmas bandas no ecrã (matriz de estilos vetorizada) e no Excel (formatação condicional)
+regras_inativos = [regra_bandas("dias_sem_compra", [
+    ("gt", 120, "background-color: #ffcccc"),
+    ("gt", 90, "background-color: #ffe5b4"),
+    (None, None, "background-color: #ffffcc"),
+], linha_inteira=True)]
+st.dataframe(estilizar(alertas_inativos, regras_inativos))
 
 st.subheader("📅 Resumo Mensal de Compras por Ano")
 st.dataframe(resumo_mensal.style.format({"Total Compras": "€ {:,.2f}"}))
 # Exportação para Excel
 st.subheader("📤 Exportar Dados para Excel")
 
-output = io.BytesIO()
-with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-    compras_mensais.to_excel(writer, index=False, sheet_name="Compras Mensais")
-    compras_trimestrais.to_excel(writer, index=False, sheet_name="Compras Trimestrais")
-    ranking.to_excel(writer, index=False, sheet_name="Ranking Clientes")
-    ticket_medio.to_excel(writer, index=False, sheet_name="Ticket Médio Comercial")
-    ticket_cliente.to_excel(writer, index=False, sheet_name="Ticket Médio Cliente")
-    alertas_queda.to_excel(writer, index=False, sheet_name="Alertas de Queda")
-    crescimento_pct.reset_index().to_excel(writer, index=False, sheet_name="Crescimento %")
-    media_mensal.reset_index().to_excel(writer, index=False, sheet_name="Média Mensal")
-    sazonalidade.reset_index().to_excel(writer, index=False, sheet_name="Sazonalidade")
-    alertas_inativos.to_excel(writer, index=False, sheet_name="Clientes Inativos")
-    resumo_mensal.to_excel(writer, index=False, sheet_name="Resumo Mensal")
-
-    # Formatação condicional segura
-    if "Clientes Inativos" in writer.sheets and "dias_sem_compra" in alertas_inativos.columns:
-        worksheet = writer.sheets["Clientes Inativos"]
-        format_red = writer.book.add_format({"bg_color": "#FFCCCC"})
-        format_orange = writer.book.add_format({"bg_color": "#FFE5B4"})
-        format_yellow = writer.book.add_format({"bg_color": "#FFFFCC"})
-
-        col_index = alertas_inativos.columns.get_loc("dias_sem_compra")
-        col_letter = xlsxwriter.utility.xl_col_to_name(col_index)
-
-        worksheet.conditional_format(f"{col_letter}2:{col_letter}1000", {
-            "type": "cell", "criteria": ">", "value": 120, "format": format_red
-        })
-        worksheet.conditional_format(f"{col_letter}2:{col_letter}1000", {
-            "type": "cell", "criteria": "between", "minimum": 91, "maximum": 120, "format": format_orange
-        })
-        worksheet.conditional_format(f"{col_letter}2:{col_letter}1000", {
-            "type": "cell", "criteria": "between", "minimum": 61, "maximum": 90, "format": format_yellow
-        })
-
-    # Formatação geral para todas as abas
-    for sheet in writer.sheets:
-        ws = writer.sheets[sheet]
-        ws.autofilter(0, 0, ws.dim_rowmax, ws.dim_colmax)
-        ws.freeze_panes(1, 0)
-
-# Botão de download
-st.download_button(
-    label="📥 Baixar Excel Completo",
-    data=output.getvalue(),
-    file_name="analise_compras_completa.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def gerar_excel():
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        compras_mensais.to_excel(writer, index=False, sheet_name="Compras Mensais")
+        compras_trimestrais.to_excel(writer, index=False, sheet_name="Compras Trimestrais")
+        ranking.to_excel(writer, index=False, sheet_name="Ranking Clientes")
+        ticket_medio.to_excel(writer, index=False, sheet_name="Ticket Médio Comercial")
+        ticket_cliente.to_excel(writer, index=False, sheet_name="Ticket Médio Cliente")
+        alertas_queda.to_excel(writer, index=False, sheet_name="Alertas de Queda")
+        crescimento_pct.reset_index().to_excel(writer, index=False, sheet_name="Crescimento %")
+        media_mensal.reset_index().to_excel(writer, index=False, sheet_name="Média Mensal")
+        sazonalidade.reset_index().to_excel(writer, index=False, sheet_name="Sazonalidade")
+        alertas_inativos.to_excel(writer, index=False, sheet_name="Clientes Inativos")
+        resumo_mensal.to_excel(writer, index=False, sheet_name="Resumo Mensal")
+
+        # Formatação condicional nativa (as mesmas bandas da tabela no ecrã)
+        aplicar_regras_excel(writer, "Clientes Inativos", alertas_inativos, regras_inativos)
+
+        # Formatação geral para todas as abas
+        for sheet in writer.sheets:
+            ws = writer.sheets[sheet]
+            ws.autofilter(0, 0, ws.dim_rowmax, ws.dim_colmax)
+            ws.freeze_panes(1, 0)
+    return output.getvalue()
+
+
+# Botão de download: o workbook só é gerado ao clicar e fica em cache por (versão, filtros)
+filtros_export = chave_filtros(clientes=clientes, comerciais=comerciais, meses=meses, anos=anos,
+                               dia=datetime.today().date())
+botao_exportacao(
+    "📥 Baixar Excel Completo", df, "CompAnos.xlsx", gerar_excel,
+    file_name="analise_compras_completa.xlsx", filtros=filtros_export
 )
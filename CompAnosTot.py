@@ -3,7 +3,11 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import io
 from datetime import datetime
-import xlsxwriter.utility
+
+from atividade import indice_atividade
+from dados_versao import chave_filtros, marcar_versao
+from estilos import aplicar_regras_excel, estilizar, regra_bandas
+from exportacoes import botao_exportacao
 st.markdown("""
     <style>
     #MainMenu {visibility: hidden;}
@@ -32,7 +36,8 @@ def carregar_dados():
     df["mês"] = df["mês"].astype(str).str.strip().str.lower().map(mes_map)
     df["ano"] = pd.to_numeric(df["ano"], errors="coerce").fillna(0).astype(int)
     df["trimestre"] = pd.to_datetime(dict(year=df["ano"], month=df["mês"], day=1)).dt.to_period("Q")
-    return df
+    df["data_compra"] = pd.to_datetime(dict(year=df["ano"], month=df["mês"], day=1))
+    return marcar_versao(df)
 
 df = carregar_dados()
 
@@ -76,12 +81,11 @@ alertas = compras_mensais.sort_values(["nome_cliente", "ano", "mês"])
 alertas["queda"] = alertas.groupby(["nome_cliente", "ano"])["total_liquido"].diff()
 alertas_queda = alertas[alertas["queda"] < 0]
 
-df_filtrado["data_compra"] = pd.to_datetime(dict(year=df_filtrado["ano"], month=df_filtrado["mês"], day=1))
-ultimas_compras = df_filtrado.groupby("nome_cliente")["data_compra"].max().reset_index()
-ultimas_compras["dias_sem_compra"] = (datetime.today() - ultimas_compras["data_compra"]).dt.days
-alertas_inativos = ultimas_compras[ultimas_compras["dias_sem_compra"] > 60].copy()
+# Última compra por cliente: índice mantido incrementalmente entre reruns
+indice_compras = indice_atividade("CompAnosTot.nome_cliente", "nome_cliente", "data_compra").sincronizar(df)
+clientes_visiveis = df_filtrado["nome_cliente"].unique()
+alertas_inativos = indice_compras.banda(60, None, datetime.today(), clientes_visiveis).rename(columns={"dias": "dias_sem_compra"})
 alertas_inativos["status"] = "🔴 Inativo"
-alertas_inativos = alertas_inativos.sort_values("dias_sem_compra", ascending=False)
 # Resumo mensal por comercial
 resumo_comercial = df_filtrado.groupby(["ano", "mês", "comercial"])["total_liquido"].sum().reset_index()
 resumo_comercial["periodo"] = resumo_comercial["ano"].astype(str) + "-" + resumo_comercial["mês"].astype(str).str.zfill(2)
@@ -125,26 +129,49 @@ st.dataframe(alertas_queda[["nome_cliente", "ano", "mês", "total_liquido", "que
 }))
 
 st.markdown("### 🚨 Clientes sem compras há mais de 60 dias")
-def colorir_linha(row):
-    if row["dias_sem_compra"] > 120:
-        return ["background-color: #ffcccc"] * len(row)
-    elif row["dias_sem_compra"] > 90:
-        return ["background-color: #ffe5b4"] * len(row)
-    else:
-        return ["background-color: #ffffcc"] * len(row)
-st.dataframe(alertas_inativos.style.apply(colorir_linha, axis=1))
+# mesmas bandas no ecrã (matriz de estilos vetorizada) e no Excel (formatação condicional)
+regras_inativos = [regra_bandas("dias_sem_compra", [
+    ("gt", 120, "background-color: #ffcccc"),
+    ("gt", 90, "background-color: #ffe5b4"),
+    (None, None, "background-color: #ffffcc"),
+], linha_inteira=True)]
+st.dataframe(estilizar(alertas_inativos, regras_inativos))
 
 st.markdown("### 📅 Resumo Mensal por Comercial")
 st.dataframe(resumo_comercial.style.format({"Total Compras": "€ {:,.2f}"}))
 # Exportação para Excel
 st.markdown("### 📤 Exportar Dados")
-output = io.BytesIO()
-with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-    compras_mensais.to_excel(writer, index=False, sheet_name="Compras Mensais")
-    compras_trimestrais.to_excel(writer, index=False, sheet_name="Compras Trimestrais")
-    ranking.to_excel(writer, index=False, sheet_name="Ranking Clientes")
-    ticket_medio.to_excel(writer, index=False, sheet_name="Ticket Médio Comercial")
-    ticket_cliente.to_excel(writer, index=False, sheet_name="Ticket Médio Cliente")
-    alertas_queda.to_excel(writer, index=False, sheet_name="Alertas de Queda")
-    crescimento_pct.reset_index().to_excel(writer, index=False, sheet_name="Crescimento %")
-    media_mensal.reset_index().to_excel
+
+def gerar_excel():
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        compras_mensais.to_excel(writer, index=False, sheet_name="Compras Mensais")
+        compras_trimestrais.to_excel(writer, index=False, sheet_name="Compras Trimestrais")
+        ranking.to_excel(writer, index=False, sheet_name="Ranking Clientes")
+        ticket_medio.to_excel(writer, index=False, sheet_name="Ticket Médio Comercial")
+        ticket_cliente.to_excel(writer, index=False, sheet_name="Ticket Médio Cliente")
+        alertas_queda.to_excel(writer, index=False, sheet_name="Alertas de Queda")
+        crescimento_pct.reset_index().to_excel(writer, index=False, sheet_name="Crescimento %")
+        media_mensal.reset_index().to_excel(writer, index=False, sheet_name="Média Mensal")
+        sazonalidade.reset_index().to_excel(writer, index=False, sheet_name="Sazonalidade")
+        alertas_inativos.to_excel(writer, index=False, sheet_name="Clientes Inativos")
+        resumo_comercial.to_excel(writer, index=False, sheet_name="Resumo Comercial")
+
+        # Formatação condicional nativa (as mesmas bandas da tabela no ecrã)
+        aplicar_regras_excel(writer, "Clientes Inativos", alertas_inativos, regras_inativos)
+
+        # Formatação geral para todas as abas
+        for sheet in writer.sheets:
+            ws = writer.sheets[sheet]
+            ws.autofilter(0, 0, ws.dim_rowmax, ws.dim_colmax)
+            ws.freeze_panes(1, 0)
+    return output.getvalue()
+
+
+# Botão de download: o workbook só é gerado ao clicar e fica em cache por (versão, filtros)
+filtros_export = chave_filtros(clientes=clientes, comerciais=comerciais, meses=meses, anos=anos,
+                               dia=datetime.today().date())
+botao_exportacao(
+    "📥 Baixar Excel Completo", df, "CompAnosTot.xlsx", gerar_excel,
+    file_name="analise_compras_completa.xlsx", filtros=filtros_export
+)
@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
-import requests
-import io
 from datetime import datetime
-import numpy as np
+
+from contas_pagar import ROTULOS_ESCALOES, contas_pagar
+from formatacao import FORMATOS, config_colunas
 
 # Set page configuration
 st.set_page_config(page_title="Fornecedores Debt Viewer", layout="wide", page_icon="📊")
@@ -101,23 +101,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def download_excel_file(url):
-    """Download and read an Excel file from a URL."""
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        df = pd.read_excel(io.BytesIO(response.content))
-        if not pd.api.types.is_datetime64_any_dtype(df['Data Venc']):
-            if df['Data Venc'].dtype in [np.float64, np.int64]:
-                df['Data Venc'] = pd.to_datetime(df['Data Venc'].apply(lambda x: pd.Timestamp('1899-12-30') + pd.Timedelta(days=x)))
-            else:
-                df['Data Venc'] = pd.to_datetime(df['Data Venc'], errors='coerce')
-        return df
-    except Exception as e:
-        st.error(f"Failed to download or read Excel file: {e}")
-        return None
-
 def main():
     with st.sidebar:
         st.header("Login")
@@ -132,75 +115,74 @@ def main():
             else:
                 st.error("Invalid username or password")
 
-        if st.session_state.get("logged_in", False):
-            st.header("Filters")
-            url = "https://www.dropbox.com/scl/fi/378p5bzv5oejc9e2omvp5/Fornecedores_Deb.xlsx?rlkey=e27iy6mdtadqlxnrr2fn220r1&st=mplutmqb&dl=1"
-            df = download_excel_file(url)
-            if df is not None:
-                if "Entidade " in df.columns:
-                    entidades = ["All"] + sorted(df["Entidade "].dropna().unique().tolist())
-                    selected_entidade = st.selectbox("Select Entidade", entidades, index=0)
-                else:
-                    st.warning("Column 'Entidade ' not found in Excel file.")
-                    selected_entidade = "All"
-
-                st.subheader("Select Date Range")
-                min_date = df["Data Venc"].min().date() if not df["Data Venc"].empty else datetime(2023, 1, 1)
-                max_date = df["Data Venc"].max().date() if not df["Data Venc"].empty else datetime.today()
-                start_date = st.date_input("Start Date", value=min_date, min_value=min_date, max_value=max_date)
-                end_date = st.date_input("End Date", value=max_date, min_value=min_date, max_value=max_date)
-            else:
-                selected_entidade, start_date, end_date = "All", None, None
-
     st.title("Fornecedores Bracar")
 
-    if st.session_state.get("logged_in", False):
-        url = "https://www.dropbox.com/scl/fi/378p5bzv5oejc9e2omvp5/Fornecedores_Deb.xlsx?rlkey=e27iy6mdtadqlxnrr2fn220r1&st=mplutmqb&dl=1"
-        df = download_excel_file(url)
-        if df is not None:
-            filtered_df = df[["Entidade ", "Data Venc", "Dias", "Valor Pendente"]].copy()
-            if selected_entidade != "All" and "Entidade " in df.columns:
-                filtered_df = filtered_df[filtered_df["Entidade "] == selected_entidade]
-            if start_date and end_date:
-                try:
-                    filtered_df = filtered_df[
-                        (filtered_df["Data Venc"] >= pd.to_datetime(start_date)) &
-                        (filtered_df["Data Venc"] <= pd.to_datetime(end_date))
-                    ]
-                except Exception as e:
-                    st.error(f"Error filtering by date: {e}")
-
-            st.subheader("Dados Filtrados")
-            filtered_df["Data Venc"] = filtered_df["Data Venc"].dt.strftime("%Y-%m-%d")
-            filtered_df["Valor Pendente"] = filtered_df["Valor Pendente"].apply(lambda x: f"€{x:,.2f}")
-            st.dataframe(
-                filtered_df,
-                use_container_width=True,
-                column_config={
-                    "Entidade ": st.column_config.TextColumn("Entidade", width="large"),
-                    "Data Venc": st.column_config.TextColumn("Due Date", width="medium"),
-                    "Dias": st.column_config.NumberColumn("Days", width="small", format="%d"),
-                    "Valor Pendente": st.column_config.TextColumn("Pending Value", width="medium")
-                }
-            )
-
-            if not filtered_df.empty:
-                total_valor_pendente = filtered_df["Valor Pendente"].str.replace("€", "").str.replace(",", "").astype(float).sum()
-                num_records = len(filtered_df)
-                st.markdown("### Sumario")
-                st.markdown(
-                    f"""
-                    <div class="summary-box">
-                        <p><strong>Total Valor Pendente:</strong> €{total_valor_pendente:,.2f}</p>
-                        <p><strong>Number of Records:</strong> {num_records}</p>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            else:
-                st.warning("No data available for the selected filters.")
-    else:
+    if not st.session_state.get("logged_in", False):
         st.info("Please log in to view the supplier debt data.")
+        return
+
+    # um só carregamento (partilhado e com cache) para a sidebar e para o corpo
+    try:
+        contas = contas_pagar()
+    except Exception as e:
+        st.error(f"Failed to download or read Excel file: {e}")
+        return
+
+    with st.sidebar:
+        st.header("Filters")
+        entidades = ["All"] + contas.entidades()
+        selected_entidade = st.selectbox("Select Entidade", entidades, index=0)
+        entidade = None if selected_entidade == "All" else selected_entidade
+
+        st.subheader("Select Date Range")
+        primeira, ultima = contas.limites_datas()
+        min_date = primeira.date() if pd.notna(primeira) else datetime(2023, 1, 1).date()
+        max_date = ultima.date() if pd.notna(ultima) else datetime.today().date()
+        start_date = st.date_input("Start Date", value=min_date, min_value=min_date, max_value=max_date)
+        end_date = st.date_input("End Date", value=max_date, min_value=min_date, max_value=max_date)
+
+    filtered_df = contas.filtrar(entidade, start_date, end_date)[["Entidade", "Data Venc", "Dias", "Valor Pendente"]]
+
+    st.subheader("Dados Filtrados")
+    st.dataframe(
+        filtered_df,
+        use_container_width=True,
+        column_config={
+            "Entidade": st.column_config.TextColumn("Entidade", width="large"),
+            "Data Venc": st.column_config.DateColumn("Due Date", width="medium", format="YYYY-MM-DD"),
+            "Dias": st.column_config.NumberColumn("Days", width="small", format="%d"),
+            "Valor Pendente": st.column_config.NumberColumn("Pending Value", width="medium", format=FORMATOS["euro"]["coluna"])
+        }
+    )
+
+    if not filtered_df.empty:
+        total_valor_pendente = filtered_df["Valor Pendente"].sum()
+        num_records = len(filtered_df)
+        st.markdown("### Sumario")
+        st.markdown(
+            f"""
+            <div class="summary-box">
+                <p><strong>Total Valor Pendente:</strong> €{total_valor_pendente:,.2f}</p>
+                <p><strong>Number of Records:</strong> {num_records}</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+    else:
+        st.warning("No data available for the selected filters.")
+
+    # resumo por Entidade calculado no carregamento (não depende do intervalo de datas)
+    st.markdown("### Antiguidade por Entidade")
+    st.dataframe(
+        contas.resumo_entidade(entidade),
+        use_container_width=True,
+        hide_index=True,
+        column_config=config_colunas(
+            {coluna: "euro" for coluna in ["Valor Pendente", "Vencido", "Por Vencer", *ROTULOS_ESCALOES]}
+            | {"Dias Médios": "decimal", "Maior Atraso": "inteiro", "Documentos": "inteiro"},
+            **{"Próximo Vencimento": st.column_config.DateColumn("Próximo Vencimento", format="YYYY-MM-DD")},
+        ),
+    )
 
 if __name__ == "__main__":
     if "logged_in" not in st.session_state:
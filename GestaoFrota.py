@@ -4,6 +4,11 @@ import altair as alt
 from io import BytesIO
 import numpy as np
 
+from dados_versao import chave_filtros, marcar_versao, versao_dados
+from exportacoes import botao_exportacao_formatos
+from frota import METRICAS, cubo_frota
+from seccoes import seccoes_lazy
+
 # 🎨 Configuração visual
 st.set_page_config(
     layout="wide",
@@ -14,11 +19,18 @@ st.set_page_config(
 
 # 📂 Carregar dados
 url = "https://github.com/paulom40/PFonseca.py/raw/main/frota.xlsx"
-try:
+
+# Ordem dos meses
+ordem_meses = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+               "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+
+
+@st.cache_data(show_spinner=False)
+def carregar_frota():
     # Carregar ambas as abas
     df_dados = pd.read_excel(url, sheet_name="Dados")
     df_sheet1 = pd.read_excel(url, sheet_name="Sheet1")
-    
+
     # Usar a aba Dados como principal
     df = df_dados.copy()
     df.columns = df.columns.str.strip()
@@ -38,46 +50,39 @@ try:
         # Garantir que não há valores negativos
         df['Kms_Perc'] = df['Kms_Perc'].clip(lower=0)
 
-    # Ordem dos meses
-    ordem_meses = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
-                   "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
     df["Mês"] = pd.Categorical(df["Mês"], categories=ordem_meses, ordered=True)
+    return marcar_versao(df)
 
+
+try:
+    df = carregar_frota()
     st.success("✅ Dados da frota carregados com sucesso!")
 except Exception as e:
     st.error(f"❌ Erro ao carregar os dados: {e}")
     st.stop()
 
-# 🔧 Função para exportar para Excel
-def export_to_excel(df, filename="relatorio_frota.xlsx"):
+# 🔧 Função para exportar para Excel (resumos lidos do cubo da frota)
+UNIDADES_RESUMO = {
+    'Combustivel': ('Resumo Combustível', '€'),
+    'Portagem': ('Resumo Portagem', '€'),
+    'Manutenção': ('Resumo Manutenção', '€'),
+    'Consumo': ('Resumo Consumo', 'L'),
+    'Kms_Perc': ('Resumo Quilometragem', 'km'),
+}
+
+def export_to_excel(df, cubo, filename="relatorio_frota.xlsx"):
     output = BytesIO()
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
         df.to_excel(writer, sheet_name='Dados Filtrados', index=False)
         
         # Adicionar resumos por categoria
-        resumo_combustivel = df.groupby('Matricula')['Combustivel'].agg(['sum', 'mean', 'count']).round(2)
-        resumo_combustivel.columns = ['Total (€)', 'Média (€)', 'Registros']
-        resumo_combustivel.to_excel(writer, sheet_name='Resumo Combustível')
-        
-        resumo_portagem = df.groupby('Matricula')['Portagem'].agg(['sum', 'mean', 'count']).round(2)
-        resumo_portagem.columns = ['Total (€)', 'Média (€)', 'Registros']
-        resumo_portagem.to_excel(writer, sheet_name='Resumo Portagem')
-        
-        resumo_manutencao = df.groupby('Matricula')['Manutenção'].agg(['sum', 'mean', 'count']).round(2)
-        resumo_manutencao.columns = ['Total (€)', 'Média (€)', 'Registros']
-        resumo_manutencao.to_excel(writer, sheet_name='Resumo Manutenção')
-        
-        resumo_consumo = df.groupby('Matricula')['Consumo'].agg(['sum', 'mean', 'count']).round(2)
-        resumo_consumo.columns = ['Total (L)', 'Média (L)', 'Registros']
-        resumo_consumo.to_excel(writer, sheet_name='Resumo Consumo')
-        
-        # Resumo de quilometragem
-        resumo_kms = df.groupby('Matricula')['Kms_Perc'].agg(['sum', 'mean', 'count']).round(2)
-        resumo_kms.columns = ['Total (km)', 'Média (km)', 'Registros']
-        resumo_kms.to_excel(writer, sheet_name='Resumo Quilometragem')
+        for coluna, (folha, unidade) in UNIDADES_RESUMO.items():
+            resumo = cubo.resumo(coluna).round(2)
+            resumo.columns = [f'Total ({unidade})', f'Média ({unidade})', 'Registros']
+            resumo.to_excel(writer, sheet_name=folha)
         
         # Resumo mensal
-        resumo_mensal = df.groupby('Mês')[['Combustivel', 'Portagem', 'Manutenção', 'Consumo', 'Kms_Perc']].sum().round(2)
+        resumo_mensal = cubo.agregar(["Mês"]).estatisticas["soma"][METRICAS].round(2)
         resumo_mensal.to_excel(writer, sheet_name='Resumo Mensal')
     
     output.seek(0)
@@ -106,6 +111,28 @@ def mostrar_kpi_viatura(label, df_viatura, coluna, unidade=""):
         delta=f"Média mensal: {media_mensal:.2f} {unidade}"
     )
 
+# 🔧 Agregações dos gráficos de uma métrica (lidas do cubo), memorizadas por (versão dos dados, filtros)
+@st.cache_data(max_entries=64, show_spinner=False)
+def agregados_metrica(_cubo, versao, filtros, coluna):
+    return {
+        "mes_matricula": _cubo.totais(["Mês", "Matricula"], coluna).reset_index(),
+        "mes": _cubo.totais(["Mês"], coluna).reindex(ordem_meses, fill_value=0).rename_axis("Mês").reset_index(),
+        "por_viatura": _cubo.totais(["Matricula"], coluna).sort_values(ascending=False),
+        "por_marca": _cubo.totais(["Marca"], coluna).sort_values(ascending=False),
+    }
+
+# 🔧 KPIs de todas as viaturas filtradas: {métrica: tabela por Matricula}
+@st.cache_data(max_entries=16, show_spinner=False)
+def kpis_frota(_cubo, versao, filtros):
+    return _cubo.kpis_viaturas()
+
+def kpis_viatura(kpis, matricula):
+    """KPIs de uma viatura ({métrica: Series}), ou None se não tiver registos no filtro."""
+    if matricula not in kpis[METRICAS[0]].index:
+        return None
+    # astype(object): a linha mantém os inteiros (contagens de meses) como inteiros
+    return {coluna: tabela.astype(object).loc[matricula] for coluna, tabela in kpis.items()}
+
 # 🎛️ Filtros
 st.sidebar.header("🔍 Filtros")
 marcas = sorted(df['Marca'].dropna().unique())
@@ -132,30 +159,31 @@ if selected_mes != "Todos":
     df_filtrado = df_filtrado[df_filtrado['Mês'] == selected_mes]
 
 df_filtrado["Mês"] = pd.Categorical(df_filtrado["Mês"], categories=ordem_meses, ordered=True)
+chave_frota = (versao_dados(df), chave_filtros(
+    marca=selected_marca, matriculas=selected_matriculas, ano=selected_ano, mes=selected_mes
+))
+# Cubo Matricula x Mês (materializado uma vez por carregamento) restrito aos filtros
+cubo = cubo_frota(df, versao_dados(df)).filtrar(
+    marca=None if selected_marca == "Todas" else selected_marca,
+    matriculas=selected_matriculas,
+    ano=None if selected_ano == "Todos" else int(selected_ano),
+    mes=None if selected_mes == "Todos" else selected_mes,
+)
 
 # 📊 Link de Exportação para Excel
 st.sidebar.markdown("---")
 st.sidebar.header("📤 Exportar Dados")
 
 # Nome personalizado para o arquivo
-nome_arquivo = st.sidebar.text_input("Nome do arquivo Excel", "relatorio_frota")
+nome_arquivo = st.sidebar.text_input("Nome do arquivo", "relatorio_frota")
 
-# Botão para exportar
-if st.sidebar.button("📥 Exportar para Excel"):
-    try:
-        excel_data = export_to_excel(df_filtrado, f"{nome_arquivo}.xlsx")
-        
-        st.sidebar.success("✅ Relatório gerado com sucesso!")
-        
-        # Download button
-        st.sidebar.download_button(
-            label="⬇️ Baixar Arquivo Excel",
-            data=excel_data,
-            file_name=f"{nome_arquivo}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-    except Exception as e:
-        st.sidebar.error(f"❌ Erro ao exportar: {e}")
+# O relatório só é gerado ao clicar; xlsx inclui os resumos, os restantes formatos só os dados
+with st.sidebar:
+    botao_exportacao_formatos(
+        "⬇️ Baixar Relatório", df_filtrado, "GestaoFrota.relatorio", nome_arquivo,
+        gerar_xlsx=lambda: export_to_excel(df_filtrado, cubo, f"{nome_arquivo}.xlsx").getvalue(),
+        filtros=chave_frota[1]
+    )
 
 # Informações sobre o relatório
 st.sidebar.markdown("""
@@ -169,30 +197,30 @@ st.sidebar.markdown("""
 - Resumo Mensal
 """)
 
-# 🧭 Abas temáticas - ADICIONADA aba KMs Percorridos
-aba_combustivel, aba_portagem, aba_manutencao, aba_consumo, aba_kms = st.tabs([
-    "⛽ Combustível", "🚧 Portagem", "🛠️ Manutenção", "📊 Consumo", "🛣️ KMs Percorridos"
-])
+# 🧭 Secções temáticas (só a secção visível é calculada)
 
 # ⛽ Combustível
-with aba_combustivel:
+def seccao_combustivel():
+    agregados = agregados_metrica(cubo, *chave_frota, "Combustivel")
+
     st.header("⛽ Indicadores de Combustível")
     
     # KPIs por viatura selecionada
     if selected_matriculas:
+        kpis = kpis_frota(cubo, *chave_frota)
         st.subheader(f"🚗 KPIs por Viatura - Combustível")
         
         for matricula in selected_matriculas:
-            df_viatura = df_filtrado[df_filtrado['Matricula'] == matricula]
+            kpi = kpis_viatura(kpis, matricula)
             
-            if not df_viatura.empty:
+            if kpi is not None:
                 st.markdown(f"### 📋 Viatura: {matricula}")
                 
                 col1, col2, col3, col4, col5 = st.columns(5)
                 
                 with col1:
-                    total_combustivel = df_viatura['Combustivel'].sum()
-                    media_mensal = df_viatura.groupby("Mês")['Combustivel'].sum().mean()
+                    total_combustivel = kpi['Combustivel']['total']
+                    media_mensal = kpi['Combustivel']['media_mensal']
                     st.metric(
                         label="Total Gasto em Combustível",
                         value=f"€ {total_combustivel:.2f}",
@@ -200,7 +228,7 @@ with aba_combustivel:
                     )
                 
                 with col2:
-                    custo_medio_abastecimento = df_viatura[df_viatura['Combustivel'] > 0]['Combustivel'].mean()
+                    custo_medio_abastecimento = kpi['Combustivel']['media_positivos']
                     if pd.isna(custo_medio_abastecimento):
                         st.metric("Custo Médio por Abastecimento", "—")
                     else:
@@ -210,14 +238,14 @@ with aba_combustivel:
                         )
                 
                 with col3:
-                    meses_com_abastecimento = df_viatura[df_viatura['Combustivel'] > 0]['Mês'].nunique()
+                    meses_com_abastecimento = kpi['Combustivel']['meses_positivos']
                     st.metric(
                         label="Meses com Abastecimento",
                         value=meses_com_abastecimento
                     )
                 
                 with col4:
-                    consumo_total = df_viatura['Consumo'].sum()
+                    consumo_total = kpi['Consumo']['total']
                     st.metric(
                         label="Consumo Total (L)",
                         value=f"{consumo_total:.1f} L"
@@ -225,7 +253,7 @@ with aba_combustivel:
                 
                 with col5:
                     # ADICIONADO: KMs Percorridos
-                    kms_total = df_viatura['Kms_Perc'].sum()
+                    kms_total = kpi['Kms_Perc']['total']
                     st.metric(
                         label="KMs Percorridos",
                         value=f"{kms_total:.0f} km"
@@ -236,7 +264,7 @@ with aba_combustivel:
     # Gráficos
     if selected_matriculas and len(selected_matriculas) > 1:
         # Gráfico de linhas comparando múltiplas viaturas
-        combustivel_mes_matricula = df_filtrado.groupby(["Mês", "Matricula"])["Combustivel"].sum().reset_index()
+        combustivel_mes_matricula = agregados["mes_matricula"]
         
         line_chart = alt.Chart(combustivel_mes_matricula).mark_line(point=True, strokeWidth=3).encode(
             x=alt.X("Mês", sort=ordem_meses, title="Mês"),
@@ -262,7 +290,7 @@ with aba_combustivel:
         st.altair_chart(chart, use_container_width=True)
     else:
         # Gráfico para uma única viatura
-        combustivel_mes = df_filtrado.groupby("Mês")["Combustivel"].sum().reindex(ordem_meses, fill_value=0).reset_index()
+        combustivel_mes = agregados["mes"]
         
         line_chart = alt.Chart(combustivel_mes).mark_line(point=True, color="#59a14f", strokeWidth=3).encode(
             x=alt.X("Mês", sort=ordem_meses, title="Mês"), 
@@ -287,24 +315,27 @@ with aba_combustivel:
         st.altair_chart(chart, use_container_width=True)
 
 # 🚧 Portagem
-with aba_portagem:
+def seccao_portagem():
+    agregados = agregados_metrica(cubo, *chave_frota, "Portagem")
+
     st.header("🚧 Indicadores de Portagem")
     
     # KPIs por viatura selecionada
     if selected_matriculas:
+        kpis = kpis_frota(cubo, *chave_frota)
         st.subheader(f"🚗 KPIs por Viatura - Portagem")
         
         for matricula in selected_matriculas:
-            df_viatura = df_filtrado[df_filtrado['Matricula'] == matricula]
+            kpi = kpis_viatura(kpis, matricula)
             
-            if not df_viatura.empty:
+            if kpi is not None:
                 st.markdown(f"### 📋 Viatura: {matricula}")
                 
                 col1, col2, col3, col4, col5 = st.columns(5)
                 
                 with col1:
-                    total_portagem = df_viatura['Portagem'].sum()
-                    media_mensal = df_viatura.groupby("Mês")['Portagem'].sum().mean()
+                    total_portagem = kpi['Portagem']['total']
+                    media_mensal = kpi['Portagem']['media_mensal']
                     st.metric(
                         label="Total Gasto em Portagem",
                         value=f"€ {total_portagem:.2f}",
@@ -312,21 +343,21 @@ with aba_portagem:
                     )
                 
                 with col2:
-                    meses_com_portagem = df_viatura[df_viatura['Portagem'] > 0]['Mês'].nunique()
+                    meses_com_portagem = kpi['Portagem']['meses_positivos']
                     st.metric(
                         label="Meses com Portagem",
                         value=meses_com_portagem
                     )
                 
                 with col3:
-                    max_portagem_mes = df_viatura.groupby("Mês")['Portagem'].sum().max()
+                    max_portagem_mes = kpi['Portagem']['maximo_mensal']
                     st.metric(
                         label="Máximo num Mês",
                         value=f"€ {max_portagem_mes:.2f}"
                     )
                 
                 with col4:
-                    consumo_total = df_viatura['Consumo'].sum()
+                    consumo_total = kpi['Consumo']['total']
                     st.metric(
                         label="Consumo Total (L)",
                         value=f"{consumo_total:.1f} L"
@@ -334,7 +365,7 @@ with aba_portagem:
                 
                 with col5:
                     # ADICIONADO: KMs Percorridos
-                    kms_total = df_viatura['Kms_Perc'].sum()
+                    kms_total = kpi['Kms_Perc']['total']
                     st.metric(
                         label="KMs Percorridos",
                         value=f"{kms_total:.0f} km"
@@ -344,7 +375,7 @@ with aba_portagem:
     
     # Gráficos
     if selected_matriculas and len(selected_matriculas) > 1:
-        portagem_mes_matricula = df_filtrado.groupby(["Mês", "Matricula"])["Portagem"].sum().reset_index()
+        portagem_mes_matricula = agregados["mes_matricula"]
         
         line_chart = alt.Chart(portagem_mes_matricula).mark_line(point=True, strokeWidth=3).encode(
             x=alt.X("Mês", sort=ordem_meses, title="Mês"),
@@ -369,7 +400,7 @@ with aba_portagem:
         chart = line_chart + labels
         st.altair_chart(chart, use_container_width=True)
     else:
-        portagem_mes = df_filtrado.groupby("Mês")["Portagem"].sum().reindex(ordem_meses, fill_value=0).reset_index()
+        portagem_mes = agregados["mes"]
         
         line_chart = alt.Chart(portagem_mes).mark_line(point=True, color="#f28e2b", strokeWidth=3).encode(
             x=alt.X("Mês", sort=ordem_meses, title="Mês"), 
@@ -394,24 +425,27 @@ with aba_portagem:
         st.altair_chart(chart, use_container_width=True)
 
 # 🛠️ Manutenção
-with aba_manutencao:
+def seccao_manutencao():
+    agregados = agregados_metrica(cubo, *chave_frota, "Manutenção")
+
     st.header("🛠️ Indicadores de Manutenção")
     
     # KPIs por viatura selecionada
     if selected_matriculas:
+        kpis = kpis_frota(cubo, *chave_frota)
         st.subheader(f"🚗 KPIs por Viatura - Manutenção")
         
         for matricula in selected_matriculas:
-            df_viatura = df_filtrado[df_filtrado['Matricula'] == matricula]
+            kpi = kpis_viatura(kpis, matricula)
             
-            if not df_viatura.empty:
+            if kpi is not None:
                 st.markdown(f"### 📋 Viatura: {matricula}")
                 
                 col1, col2, col3, col4, col5 = st.columns(5)
                 
                 with col1:
-                    total_manutencao = df_viatura['Manutenção'].sum()
-                    media_mensal = df_viatura.groupby("Mês")['Manutenção'].sum().mean()
+                    total_manutencao = kpi['Manutenção']['total']
+                    media_mensal = kpi['Manutenção']['media_mensal']
                     st.metric(
                         label="Total Gasto em Manutenção",
                         value=f"€ {total_manutencao:.2f}",
@@ -419,14 +453,14 @@ with aba_manutencao:
                     )
                 
                 with col2:
-                    meses_com_manutencao = df_viatura[df_viatura['Manutenção'] > 0]['Mês'].nunique()
+                    meses_com_manutencao = kpi['Manutenção']['meses_positivos']
                     st.metric(
                         label="Meses com Manutenção",
                         value=meses_com_manutencao
                     )
                 
                 with col3:
-                    custo_medio_intervencao = df_viatura[df_viatura['Manutenção'] > 0]['Manutenção'].mean()
+                    custo_medio_intervencao = kpi['Manutenção']['media_positivos']
                     if pd.isna(custo_medio_intervencao):
                         st.metric("Custo Médio por Intervenção", "—")
                     else:
@@ -436,7 +470,7 @@ with aba_manutencao:
                         )
                 
                 with col4:
-                    consumo_total = df_viatura['Consumo'].sum()
+                    consumo_total = kpi['Consumo']['total']
                     st.metric(
                         label="Consumo Total (L)",
                         value=f"{consumo_total:.1f} L"
@@ -444,7 +478,7 @@ with aba_manutencao:
                 
                 with col5:
                     # ADICIONADO: KMs Percorridos
-                    kms_total = df_viatura['Kms_Perc'].sum()
+                    kms_total = kpi['Kms_Perc']['total']
                     st.metric(
                         label="KMs Percorridos",
                         value=f"{kms_total:.0f} km"
@@ -454,7 +488,7 @@ with aba_manutencao:
     
     # Gráficos
     if selected_matriculas and len(selected_matriculas) > 1:
-        manutencao_mes_matricula = df_filtrado.groupby(["Mês", "Matricula"])["Manutenção"].sum().reset_index()
+        manutencao_mes_matricula = agregados["mes_matricula"]
         
         line_chart = alt.Chart(manutencao_mes_matricula).mark_line(point=True, strokeWidth=3).encode(
             x=alt.X("Mês", sort=ordem_meses, title="Mês"),
@@ -479,7 +513,7 @@ with aba_manutencao:
         chart = line_chart + labels
         st.altair_chart(chart, use_container_width=True)
     else:
-        manutencao_mes = df_filtrado.groupby("Mês")["Manutenção"].sum().reindex(ordem_meses, fill_value=0).reset_index()
+        manutencao_mes = agregados["mes"]
         
         line_chart = alt.Chart(manutencao_mes).mark_line(point=True, color="#e15759", strokeWidth=3).encode(
             x=alt.X("Mês", sort=ordem_meses, title="Mês"), 
@@ -504,30 +538,33 @@ with aba_manutencao:
         st.altair_chart(chart, use_container_width=True)
 
 # 📊 Consumo
-with aba_consumo:
+def seccao_consumo():
+    agregados = agregados_metrica(cubo, *chave_frota, "Consumo")
+
     st.header("📊 Indicadores de Consumo")
     
     # KPIs por viatura selecionada
     if selected_matriculas:
+        kpis = kpis_frota(cubo, *chave_frota)
         st.subheader(f"🚗 KPIs por Viatura - Consumo")
         
         for matricula in selected_matriculas:
-            df_viatura = df_filtrado[df_filtrado['Matricula'] == matricula]
+            kpi = kpis_viatura(kpis, matricula)
             
-            if not df_viatura.empty:
+            if kpi is not None:
                 st.markdown(f"### 📋 Viatura: {matricula}")
                 
                 col1, col2, col3, col4, col5 = st.columns(5)
                 
                 with col1:
-                    consumo_total = df_viatura['Consumo'].sum()
+                    consumo_total = kpi['Consumo']['total']
                     st.metric(
                         label="Consumo Total",
                         value=f"{consumo_total:.1f} L"
                     )
                 
                 with col2:
-                    consumo_medio = df_viatura['Consumo'].mean()
+                    consumo_medio = kpi['Consumo']['media']
                     if pd.isna(consumo_medio):
                         st.metric("Consumo Médio", "—")
                     else:
@@ -537,7 +574,7 @@ with aba_consumo:
                         )
                 
                 with col3:
-                    max_consumo = df_viatura['Consumo'].max()
+                    max_consumo = kpi['Consumo']['maximo']
                     if pd.isna(max_consumo) or max_consumo == 0:
                         st.metric("Máximo Consumo", "—")
                     else:
@@ -547,7 +584,7 @@ with aba_consumo:
                         )
                 
                 with col4:
-                    meses_com_consumo = df_viatura[df_viatura['Consumo'] > 0]['Mês'].nunique()
+                    meses_com_consumo = kpi['Consumo']['meses_positivos']
                     st.metric(
                         label="Meses com Consumo",
                         value=meses_com_consumo
@@ -555,7 +592,7 @@ with aba_consumo:
                 
                 with col5:
                     # ADICIONADO: KMs Percorridos
-                    kms_total = df_viatura['Kms_Perc'].sum()
+                    kms_total = kpi['Kms_Perc']['total']
                     st.metric(
                         label="KMs Percorridos",
                         value=f"{kms_total:.0f} km"
@@ -566,7 +603,7 @@ with aba_consumo:
     # Gráficos
     if selected_matriculas and len(selected_matriculas) > 1:
         # Gráfico de linhas comparando múltiplas viaturas
-        consumo_mes_matricula = df_filtrado.groupby(["Mês", "Matricula"])["Consumo"].sum().reset_index()
+        consumo_mes_matricula = agregados["mes_matricula"]
         
         line_chart = alt.Chart(consumo_mes_matricula).mark_line(point=True, strokeWidth=3).encode(
             x=alt.X("Mês", sort=ordem_meses, title="Mês"),
@@ -592,7 +629,7 @@ with aba_consumo:
         st.altair_chart(chart, use_container_width=True)
     else:
         # Gráfico para uma única viatura
-        consumo_mes = df_filtrado.groupby("Mês")["Consumo"].sum().reindex(ordem_meses, fill_value=0).reset_index()
+        consumo_mes = agregados["mes"]
         
         line_chart = alt.Chart(consumo_mes).mark_line(point=True, color="#4E79A7", strokeWidth=3).encode(
             x=alt.X("Mês", sort=ordem_meses, title="Mês"), 
@@ -623,7 +660,7 @@ with aba_consumo:
     
     with col_analise1:
         # Top 5 viaturas com maior consumo
-        consumo_por_viatura = df_filtrado.groupby('Matricula')['Consumo'].sum().sort_values(ascending=False).head(5)
+        consumo_por_viatura = agregados["por_viatura"].head(5)
         if not consumo_por_viatura.empty:
             st.markdown("**🏆 Top 5 Viaturas com Maior Consumo**")
             for i, (matricula, consumo) in enumerate(consumo_por_viatura.items(), 1):
@@ -631,51 +668,54 @@ with aba_consumo:
     
     with col_analise2:
         # Consumo por marca
-        consumo_por_marca = df_filtrado.groupby('Marca')['Consumo'].sum().sort_values(ascending=False)
+        consumo_por_marca = agregados["por_marca"]
         if not consumo_por_marca.empty:
             st.markdown("**🏭 Consumo por Marca**")
             for marca, consumo in consumo_por_marca.items():
                 st.write(f"{marca}: {consumo:.1f} L")
 
 # 🛣️ NOVA ABA: KMs Percorridos
-with aba_kms:
+def seccao_kms():
+    agregados = agregados_metrica(cubo, *chave_frota, "Kms_Perc")
+
     st.header("🛣️ Indicadores de Quilometragem")
     
     # KPIs por viatura selecionada
     if selected_matriculas:
+        kpis = kpis_frota(cubo, *chave_frota)
         st.subheader(f"🚗 KPIs por Viatura - Quilometragem")
         
         for matricula in selected_matriculas:
-            df_viatura = df_filtrado[df_filtrado['Matricula'] == matricula]
+            kpi = kpis_viatura(kpis, matricula)
             
-            if not df_viatura.empty:
+            if kpi is not None:
                 st.markdown(f"### 📋 Viatura: {matricula}")
                 
                 col1, col2, col3, col4, col5 = st.columns(5)
                 
                 with col1:
-                    kms_total = df_viatura['Kms_Perc'].sum()
+                    kms_total = kpi['Kms_Perc']['total']
                     st.metric(
                         label="Total KMs Percorridos",
                         value=f"{kms_total:.0f} km"
                     )
                 
                 with col2:
-                    kms_medio_mensal = df_viatura.groupby("Mês")['Kms_Perc'].sum().mean()
+                    kms_medio_mensal = kpi['Kms_Perc']['media_mensal']
                     st.metric(
                         label="Média Mensal de KMs",
                         value=f"{kms_medio_mensal:.0f} km"
                     )
                 
                 with col3:
-                    max_kms_mes = df_viatura.groupby("Mês")['Kms_Perc'].sum().max()
+                    max_kms_mes = kpi['Kms_Perc']['maximo_mensal']
                     st.metric(
                         label="Máximo num Mês",
                         value=f"{max_kms_mes:.0f} km"
                     )
                 
                 with col4:
-                    meses_com_kms = df_viatura[df_viatura['Kms_Perc'] > 0]['Mês'].nunique()
+                    meses_com_kms = kpi['Kms_Perc']['meses_positivos']
                     st.metric(
                         label="Meses com Quilometragem",
                         value=meses_com_kms
@@ -683,7 +723,7 @@ with aba_kms:
                 
                 with col5:
                     # Eficiência (km por litro)
-                    consumo_total = df_viatura['Consumo'].sum()
+                    consumo_total = kpi['Consumo']['total']
                     if consumo_total > 0:
                         eficiencia = kms_total / consumo_total
                         st.metric(
@@ -698,7 +738,7 @@ with aba_kms:
     # Gráficos
     if selected_matriculas and len(selected_matriculas) > 1:
         # Gráfico de linhas comparando múltiplas viaturas
-        kms_mes_matricula = df_filtrado.groupby(["Mês", "Matricula"])["Kms_Perc"].sum().reset_index()
+        kms_mes_matricula = agregados["mes_matricula"]
         
         line_chart = alt.Chart(kms_mes_matricula).mark_line(point=True, strokeWidth=3).encode(
             x=alt.X("Mês", sort=ordem_meses, title="Mês"),
@@ -724,7 +764,7 @@ with aba_kms:
         st.altair_chart(chart, use_container_width=True)
     else:
         # Gráfico para uma única viatura
-        kms_mes = df_filtrado.groupby("Mês")["Kms_Perc"].sum().reindex(ordem_meses, fill_value=0).reset_index()
+        kms_mes = agregados["mes"]
         
         line_chart = alt.Chart(kms_mes).mark_line(point=True, color="#EDC949", strokeWidth=3).encode(
             x=alt.X("Mês", sort=ordem_meses, title="Mês"), 
@@ -755,7 +795,7 @@ with aba_kms:
     
     with col_analise1:
         # Top 5 viaturas com maior quilometragem
-        kms_por_viatura = df_filtrado.groupby('Matricula')['Kms_Perc'].sum().sort_values(ascending=False).head(5)
+        kms_por_viatura = agregados["por_viatura"].head(5)
         if not kms_por_viatura.empty:
             st.markdown("**🏆 Top 5 Viaturas com Maior Quilometragem**")
             for i, (matricula, kms) in enumerate(kms_por_viatura.items(), 1):
@@ -763,15 +803,15 @@ with aba_kms:
     
     with col_analise2:
         # Quilometragem por marca
-        kms_por_marca = df_filtrado.groupby('Marca')['Kms_Perc'].sum().sort_values(ascending=False)
+        kms_por_marca = agregados["por_marca"]
         if not kms_por_marca.empty:
             st.markdown("**🏭 Quilometragem por Marca**")
             for marca, kms in kms_por_marca.items():
                 st.write(f"{marca}: {kms:.0f} km")
         
         # Eficiência média da frota
-        consumo_total_frota = df_filtrado['Consumo'].sum()
-        kms_total_frota = df_filtrado['Kms_Perc'].sum()
+        consumo_total_frota = cubo.estatisticas["soma"]['Consumo'].sum()
+        kms_total_frota = cubo.estatisticas["soma"]['Kms_Perc'].sum()
         if consumo_total_frota > 0:
             eficiencia_frota = kms_total_frota / consumo_total_frota
             st.metric(
@@ -779,6 +819,14 @@ with aba_kms:
                 value=f"{eficiencia_frota:.1f} km/L"
             )
 
+seccoes_lazy({
+    "⛽ Combustível": seccao_combustivel,
+    "🚧 Portagem": seccao_portagem,
+    "🛠️ Manutenção": seccao_manutencao,
+    "📊 Consumo": seccao_consumo,
+    "🛣️ KMs Percorridos": seccao_kms,
+}, key="seccao_frota")
+
 # 📋 Visualização dos dados
 st.sidebar.header("📋 Dados Filtrados")
 if st.sidebar.checkbox("Mostrar dados filtrados"):
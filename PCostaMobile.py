@@ -3,6 +3,9 @@ import requests
 from io import BytesIO
 import streamlit as st
 
+from dados_versao import marcar_versao, versao_dados
+from hierarquia import indice_hierarquico
+
 st.markdown("""
     <style>
     #MainMenu {visibility: hidden;}
@@ -17,6 +20,22 @@ st.markdown("""
 # -------------------------------
 url = "https://github.com/paulom40/PFonseca.py/raw/main/PCosta.xlsx"
 
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def carregar_vencimentos(url: str) -> pd.DataFrame:
+    response = requests.get(url)
+    response.raise_for_status()
+    df = pd.read_excel(BytesIO(response.content), sheet_name="PCosta")
+    df["Data Venc."] = pd.to_datetime(df["Data Venc."], errors="coerce").dt.date
+    df.columns = df.columns.str.strip()
+    df["Entidade"] = df["Entidade"].astype(str).str.strip()
+    df["Dias"] = pd.to_numeric(df["Dias"], errors="coerce")
+    df = df.dropna(subset=["Dias"])
+    df["Dias"] = df["Dias"].astype(int)
+    df["Valor Pendente"] = pd.to_numeric(df["Valor Pendente"], errors="coerce")
+    return marcar_versao(df)
+
+
 st.set_page_config(page_title="Vencimentos Paulo Costa", layout="centered")
 
 st.title("📊 Vencimentos Paulo Costa")
@@ -24,31 +43,21 @@ st.caption("📅 Última atualização: 29/08/2025")
 
 with st.spinner("Carregando dados..."):
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        df = pd.read_excel(BytesIO(response.content), sheet_name="PCosta")
-        df["Data Venc."] = pd.to_datetime(df["Data Venc."], errors="coerce").dt.date
+        df = carregar_vencimentos(url)
         st.success("📥 Dados carregados com sucesso!")
     except Exception as e:
         st.error(f"Erro ao carregar os dados: {e}")
         st.stop()
 
-# -------------------------------
-# 🧹 Clean and prepare data
-# -------------------------------
-df.columns = df.columns.str.strip()
-df["Entidade"] = df["Entidade"].astype(str).str.strip()
-df["Dias"] = pd.to_numeric(df["Dias"], errors="coerce")
-df = df.dropna(subset=["Dias"])
-df["Dias"] = df["Dias"].astype(int)
-df["Valor Pendente"] = pd.to_numeric(df["Valor Pendente"], errors="coerce")
+# Linhas por Entidade, ordenadas por Dias: construído uma vez por versão dos dados
+indice = indice_hierarquico(df, versao_dados(df), ("Entidade",), "Dias")
 
 # -------------------------------
 # 🎛️ Sidebar: Filters
 # -------------------------------
 st.sidebar.header("🔎 Filtros")
 
-entidades = sorted(df["Entidade"].dropna().unique())
+entidades = indice.opcoes()
 cliente = st.sidebar.selectbox("Cliente:", entidades)
 
 dias_min, dias_max = st.sidebar.slider(
@@ -62,9 +71,8 @@ dias_min, dias_max = st.sidebar.slider(
 # -------------------------------
 # 🔍 Apply filters
 # -------------------------------
-df_cliente = df[df["Entidade"] == cliente]
-df_filtrado = df_cliente[(df_cliente["Dias"] >= dias_min) & (df_cliente["Dias"] <= dias_max)]
-df_a_vencer = df_cliente[(df_cliente["Dias"] >= -20) & (df_cliente["Dias"] <= -1)]
+df_filtrado = indice.filtrar(cliente, minimo=dias_min, maximo=dias_max)
+df_a_vencer = indice.filtrar(cliente, minimo=-20, maximo=-1)
 
 cols_exibir = ["Entidade", "Documento", "Data Venc.", "Dias", "Valor Pendente"]
 
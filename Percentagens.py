@@ -1,9 +1,12 @@
 import streamlit as st
 import pandas as pd
-from io import BytesIO
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from dados_versao import chave_filtros, marcar_versao
+from formatacao import formatar_estilo, to_excel_formatado
+from exportacoes import botao_exportacao_formatos
+
 st.markdown("""
     <style>
     #MainMenu {visibility: hidden;}
@@ -47,7 +50,7 @@ url = "https://github.com/paulom40/PFonseca.py/raw/main/Perc2025_Com.xlsx"
 
 @st.cache_data
 def load_data():
-    return pd.read_excel(url)
+    return marcar_versao(pd.read_excel(url))
 
 # --- Refresh Button ---
 if st.sidebar.button("🔄 Refresh"):
@@ -111,15 +114,13 @@ for col in filter_columns:
     if col in numeric_df.columns:
         numeric_df[col] = pd.to_numeric(numeric_df[col], errors='coerce')
 
-# --- Format Percentages for Display ---
-for col in filtered_df.select_dtypes(include='number').columns:
-    if col != "Ano":
-        filtered_df[col] = filtered_df[col].apply(lambda x: f"{x:.2%}")
+# --- Percentage Formats (applied at render/export time) ---
+formatos_percentagem = {col: "percentagem" for col in filtered_df.select_dtypes(include='number').columns if col != "Ano"}
 
 # --- Display Data ---
 st.title("📈 2025 Percentagem Dashboard")
 st.write(f"Bem-vindo, **{st.session_state['username']}**!")
-st.dataframe(filtered_df, use_container_width=True)
+st.dataframe(formatar_estilo(filtered_df, formatos_percentagem), use_container_width=True)
 
 # --- Heatmap Chart: Sorted from High to Low (Top to Bottom) ---
 st.subheader("🔥 Percentagens por Comercial")
@@ -144,15 +145,10 @@ if "Comercial" in numeric_df.columns:
 
 # --- Download Button ---
 def to_excel(df):
-    output = BytesIO()
-    df.to_excel(output, index=False, engine='openpyxl')
-    return output.getvalue()
-
-excel_data = to_excel(filtered_df)
+    return to_excel_formatado(df, formatos_percentagem, sheet_name="Sheet1", engine='openpyxl')
 
-st.download_button(
-    label="📥 Download filtered data as Excel",
-    data=excel_data,
-    file_name="filtered_data.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+botao_exportacao_formatos(
+    "📥 Download filtered data", filtered_df, "Percentagens.filtrados", "filtered_data",
+    gerar_xlsx=lambda: to_excel(filtered_df),
+    filtros=chave_filtros(comercial=selected_comercial, mes=selected_mes, **filters)
 )
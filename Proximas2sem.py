@@ -3,7 +3,13 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import io
-import base64
+from functools import partial
+
+from dados_versao import chave_filtros, marcar_versao, versao_dados
+from estilos import aplicar_regras_excel, estilizar, regra_bandas
+from exportacoes import botao_exportacao
+from seccoes import seccoes_lazy
+from vencimentos import IndiceVencimentos
 
 # Configuração da página
 st.set_page_config(layout="wide")
@@ -11,8 +17,19 @@ st.title("📊 Painel de Vencimentos")
 
 # Carregar dados
 url = "https://github.com/paulom40/PFonseca.py/raw/main/V0808.xlsx"
-df = pd.read_excel(url)
-df.rename(columns=lambda x: x.strip(), inplace=True)
+
+
+@st.cache_data(show_spinner=False)
+def carregar_dados():
+    df = pd.read_excel(url)
+    df.rename(columns=lambda x: x.strip(), inplace=True)
+    venc = next((col for col in df.columns if 'venc' in col.lower()), None)
+    if venc is not None:
+        df[venc] = pd.to_datetime(df[venc], errors='coerce')
+    return marcar_versao(df)
+
+
+df = carregar_dados()
 
 # Detectar colunas principais
 venc_col = next((col for col in df.columns if 'venc' in col.lower()), None)
@@ -23,26 +40,66 @@ entidade_col = next((col for col in df.columns if 'entidade' in col.lower()), No
 if venc_col is None:
     st.error("❌ Coluna de vencimento não encontrada.")
     st.stop()
-df[venc_col] = pd.to_datetime(df[venc_col], errors='coerce')
-
-# Criar separadores
-tab1, tab2, tab3, tab4 = st.tabs([
-    "📅 Dashboard Semanal",
-    "📆 Relatório semanal 2025",
-    "🗓 Relatório Mensal 2025",
-    "📈 Comparativo Mensal"
-])
-with tab1:
-    st.sidebar.header("🔍 Filtro por Comercial")
-    comerciais = df['Comercial'].dropna().unique() if 'Comercial' in df.columns else []
-    comercial_selecionado = st.sidebar.selectbox("Selecione o comercial", ["Todos"] + list(comerciais))
-
-    if comercial_selecionado != "Todos":
-        df = df[df['Comercial'] == comercial_selecionado]
-
-    hoje = datetime.today()
-    semana_base = max(1, hoje.isocalendar().week - 2)
-    ano_base = hoje.year
+
+# Filtro por comercial (aplica-se a todas as secções)
+st.sidebar.header("🔍 Filtro por Comercial")
+comerciais = df['Comercial'].dropna().unique() if 'Comercial' in df.columns else []
+comercial_selecionado = st.sidebar.selectbox("Selecione o comercial", ["Todos"] + list(comerciais))
+
+versao = versao_dados(df)
+if comercial_selecionado != "Todos":
+    df = df[df['Comercial'] == comercial_selecionado]
+
+
+# ====================== CÁLCULOS EM CACHE ======================
+# Cada secção só chama as suas funções; o resultado fica memorizado por
+# (versão dos dados, comercial selecionado) e só é recalculado quando mudam.
+
+def excel_bytes(folhas: dict, index: bool = False, regras: dict = None) -> bytes:
+    """Uma folha por tabela; `regras` {folha: regras} viram formatação condicional nativa."""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        for nome, tabela in folhas.items():
+            tabela.to_excel(writer, sheet_name=nome, index=index)
+            if regras and nome in regras:
+                aplicar_regras_excel(writer, nome, tabela, regras[nome])
+    return output.getvalue()
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def indice_vencimentos(_df, versao, comercial):
+    """Linhas ordenadas por vencimento: cada janela de datas é um searchsorted + slice."""
+    return IndiceVencimentos(_df, venc_col, valor_pendente_col)
+
+
+def tabela_semana(df_semana, hoje):
+    df_temp = df_semana[[entidade_col, venc_col, valor_pendente_col, 'Comercial']].copy()
+    df_temp["Dias"] = (df_temp[venc_col] - pd.Timestamp(hoje)).dt.days
+    df_temp = df_temp.rename(columns={
+        entidade_col: "Entidade",
+        venc_col: "Data de Vencimento",
+        valor_pendente_col: "Valor Pendente",
+        "Comercial": "Comercial"
+    })
+    return df_temp[["Entidade", "Data de Vencimento", "Dias", "Valor Pendente", "Comercial"]]
+
+
+def preparar_df_export(df_temp):
+    totais = df_temp.groupby("Entidade")["Valor Pendente"].sum().reset_index()
+    totais["Data de Vencimento"] = ""
+    totais["Dias"] = ""
+    totais["Comercial"] = "—"
+    totais = totais[["Entidade", "Data de Vencimento", "Dias", "Valor Pendente", "Comercial"]]
+    totais["Entidade"] = totais["Entidade"] + " (Total)"
+
+    return pd.concat([df_temp, totais], ignore_index=True)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def dashboard_semanal(_df, versao, comercial, dia):
+    """Semanas 0/1/2 (tabelas e totais) para o dia `dia`."""
+    semana_base = max(1, dia.isocalendar().week - 2)
+    ano_base = dia.year
     data_base = datetime.strptime(f'{ano_base}-W{semana_base}-1', "%Y-W%W-%w").date()
 
     week1_start = data_base
@@ -52,204 +109,199 @@ with tab1:
     week0_end = week1_start - timedelta(days=1)
     week0_start = week0_end - timedelta(days=6)
 
-    df_week0 = df[(df[venc_col].dt.date >= week0_start) & (df[venc_col].dt.date <= week0_end)]
-    df_week1 = df[(df[venc_col].dt.date >= week1_start) & (df[venc_col].dt.date <= week1_end)]
-    df_week2 = df[(df[venc_col].dt.date >= week2_start) & (df[venc_col].dt.date <= week2_end)]
-
-    def estilo_dias(val):
-        if isinstance(val, int):
-            if val < 0:
-                return "color: red; font-weight: bold"
-            elif val == 0:
-                return "background-color: #fff3cd"
-            else:
-                return "background-color: #d4edda"
-        return ""
-
-    def tabela_por_entidade(df_semana, titulo):
-        st.subheader(titulo)
-        df_temp = df_semana[[entidade_col, venc_col, valor_pendente_col, 'Comercial']].copy()
-        df_temp["Dias"] = (df_temp[venc_col] - pd.Timestamp(datetime.today())).dt.days
-        df_temp = df_temp.rename(columns={
-            entidade_col: "Entidade",
-            venc_col: "Data de Vencimento",
-            valor_pendente_col: "Valor Pendente",
-            "Comercial": "Comercial"
-        })
-        df_temp = df_temp[["Entidade", "Data de Vencimento", "Dias", "Valor Pendente", "Comercial"]]
+    indice = indice_vencimentos(_df, versao, comercial)
+    semanas = [
+        indice.janela(week0_start, week0_end),
+        indice.janela(week1_start, week1_end),
+        indice.janela(week2_start, week2_end),
+    ]
+
+    # os dias inteiros até ao vencimento não mudam ao longo do mesmo `dia`
+    tabelas = [tabela_semana(s, datetime.today()) for s in semanas]
+    resumos = [
+        s.groupby([entidade_col, 'Comercial'])[valor_pendente_col]
+        .sum()
+        .reset_index()
+        .sort_values(by=valor_pendente_col, ascending=False)
+        for s in semanas
+    ]
+    return tabelas, resumos
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def relatorio_semanal(_df, versao, comercial, semana_limite):
+    df_2025 = indice_vencimentos(_df, versao, comercial).janela("2025-01-01", "2025-12-31").copy()
+    df_2025["Semana"] = df_2025[venc_col].dt.isocalendar().week
+
+    # Agrupar por semana, entidade e comercial
+    df_detalhado = (
+        df_2025[df_2025["Semana"] <= semana_limite]
+        .groupby(["Semana", entidade_col, "Comercial"])[valor_pendente_col]
+        .sum()
+        .reset_index()
+        .sort_values(by=["Semana", valor_pendente_col], ascending=[True, False])
+    )
+    df_total_semana = df_detalhado.groupby("Semana")[valor_pendente_col].sum().reset_index()
+    return df_detalhado, df_total_semana
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def mensal_2025(_df, versao, comercial):
+    """Soma mensal por comercial em 2025 (partilhada pelo relatório mensal e pelo comparativo)."""
+    df_2025 = indice_vencimentos(_df, versao, comercial).janela("2025-01-01", "2025-12-31").copy()
+    df_2025["Mês"] = df_2025[venc_col].dt.month
+
+    return (
+        df_2025.groupby(["Mês", "Comercial"])[valor_pendente_col]
+        .sum()
+        .reset_index()
+        .sort_values(by=["Mês", valor_pendente_col], ascending=[True, False])
+    )
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def relatorio_mensal(_df, versao, comercial):
+    df_mensal = mensal_2025(_df, versao, comercial)
+    df_total_mes = df_mensal.groupby("Mês")[valor_pendente_col].sum().reset_index()
+    return df_mensal, df_total_mes
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def comparativo_mensal(_df, versao, comercial):
+    df_comparativo = mensal_2025(_df, versao, comercial)
+    df_pivot = df_comparativo.pivot(index="Mês", columns="Comercial", values=valor_pendente_col).fillna(0)
+    return df_comparativo, df_pivot
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def projecao_semanas(_df, versao, comercial, inicio, semanas):
+    """Valor a vencer nas próximas `semanas` semanas (total e por comercial)."""
+    indice = indice_vencimentos(_df, versao, comercial)
+    return indice.projecao_semanal(inicio, semanas), indice.projecao_semanal(inicio, semanas, por="Comercial")
+
+
+def excel_semanal(tabelas):
+    folhas = {f'Semana {i}': preparar_df_export(t) for i, t in enumerate(tabelas)}
+    return excel_bytes(folhas, regras={nome: REGRAS_DIAS for nome in folhas})
+
+
+def excel_comparativo(df_comparativo, df_pivot):
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df_comparativo.to_excel(writer, sheet_name='Comparativo Mensal', index=False)
+        df_pivot.to_excel(writer, sheet_name='Gráfico por Comercial')
+    return output.getvalue()
+
+
+def botao_excel(tipo, gerar, nome_ficheiro):
+    """Download gerado só ao clicar, memorizado por (versão, comercial, dia, tipo)."""
+    filtros = chave_filtros(comercial=comercial_selecionado, dia=datetime.today().date())
+    botao_exportacao("📥 Baixar Excel", df, f"Proximas2sem.{tipo}", gerar, nome_ficheiro, filtros=filtros)
+
+
+# ====================== SECÇÕES ======================
+# Estilos condicionais: matriz vetorizada no ecrã e as mesmas regras nativas no Excel
+REGRAS_DIAS = [regra_bandas("Dias", [
+    ("lt", 0, "color: red; font-weight: bold"),
+    ("eq", 0, "background-color: #fff3cd"),
+    ("gt", 0, "background-color: #d4edda"),
+])]
+
+
+def regras_acima_media(media, css):
+    return [regra_bandas(valor_pendente_col, [("gt", media, css)])]
+
+
+def seccao_semanal():
+    tabelas, resumos = dashboard_semanal(df, versao, comercial_selecionado, datetime.today().date())
+
+    for i, df_temp in enumerate(tabelas):
+        st.subheader(f"📋 Semana {i}")
         st.dataframe(
-            df_temp.style
-            .format({"Valor Pendente": "€ {:,.2f}", "Dias": "{:+d}"})
-            .applymap(estilo_dias, subset=["Dias"]),
+            estilizar(df_temp.style.format({"Valor Pendente": "€ {:,.2f}", "Dias": "{:+d}"}), REGRAS_DIAS),
             use_container_width=True
         )
 
-    def resumo_por_semana(df_semana, titulo):
-        st.subheader(titulo)
-        resumo = (
-            df_semana.groupby([entidade_col, 'Comercial'])[valor_pendente_col]
-            .sum()
-            .reset_index()
-            .sort_values(by=valor_pendente_col, ascending=False)
-        )
+    for i, resumo in enumerate(resumos):
+        st.subheader(f"📊 Totais — Semana {i}")
         st.dataframe(
             resumo.style.format({valor_pendente_col: "€ {:,.2f}"}),
             use_container_width=True
         )
 
-    tabela_por_entidade(df_week0, "📋 Semana 0")
-    tabela_por_entidade(df_week1, "📋 Semana 1")
-    tabela_por_entidade(df_week2, "📋 Semana 2")
-
-    resumo_por_semana(df_week0, "📊 Totais — Semana 0")
-    resumo_por_semana(df_week1, "📊 Totais — Semana 1")
-    resumo_por_semana(df_week2, "📊 Totais — Semana 2")
-
     st.subheader("📤 Exportar dados detalhados para Excel")
+    botao_excel("semanal", partial(excel_semanal, tabelas), "Dashboard_Semanal.xlsx")
+
+    st.subheader("🔭 Projeção de Vencimentos")
+    horizonte = st.slider("Semanas a projetar", min_value=1, max_value=52, value=8, key="horizonte_semanas")
+    hoje = datetime.today().date()
+    inicio = hoje - timedelta(days=hoje.weekday())
+    projecao, projecao_comercial = projecao_semanas(df, versao, comercial_selecionado, inicio, horizonte)
+    st.bar_chart(projecao.set_index("Início")[valor_pendente_col])
+    st.dataframe(
+        projecao.style.format({valor_pendente_col: "€ {:,.2f}", "Início": "{:%d/%m/%Y}", "Fim": "{:%d/%m/%Y}"}),
+        use_container_width=True
+    )
+    if not projecao_comercial.empty:
+        st.dataframe(
+            projecao_comercial.pivot(index="Início", columns="Comercial", values=valor_pendente_col)
+            .fillna(0).style.format("€ {:,.2f}"),
+            use_container_width=True
+        )
 
-    def preparar_df_export(df_semana):
-        df_temp = df_semana[[entidade_col, venc_col, valor_pendente_col, 'Comercial']].copy()
-        df_temp["Dias"] = (df_temp[venc_col] - pd.Timestamp(datetime.today())).dt.days
-        df_temp = df_temp.rename(columns={
-            entidade_col: "Entidade",
-            venc_col: "Data de Vencimento",
-            valor_pendente_col: "Valor Pendente",
-            "Comercial": "Comercial"
-        })
-        df_temp = df_temp[["Entidade", "Data de Vencimento", "Dias", "Valor Pendente", "Comercial"]]
-
-        totais = df_temp.groupby("Entidade")["Valor Pendente"].sum().reset_index()
-        totais["Data de Vencimento"] = ""
-        totais["Dias"] = ""
-        totais["Comercial"] = "—"
-        totais = totais[["Entidade", "Data de Vencimento", "Dias", "Valor Pendente", "Comercial"]]
-        totais["Entidade"] = totais["Entidade"] + " (Total)"
-
-        return pd.concat([df_temp, totais], ignore_index=True)
-
-    df_export0 = preparar_df_export(df_week0)
-    df_export1 = preparar_df_export(df_week1)
-    df_export2 = preparar_df_export(df_week2)
 
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df_export0.to_excel(writer, sheet_name='Semana 0', index=False)
-        df_export1.to_excel(writer, sheet_name='Semana 1', index=False)
-        df_export2.to_excel(writer, sheet_name='Semana 2', index=False)
-    output.seek(0)
-
-    b64 = base64.b64encode(output.read()).decode()
-    href = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="Dashboard_Semanal.xlsx">📥 Baixar Excel</a>'
-    st.markdown(href, unsafe_allow_html=True)
-with tab2:
+def seccao_relatorio_semanal():
     st.header("📆 Relatório semanal 2025 — Evolução Semanal por Entidade e Comercial")
 
-    # Filtrar dados do ano de 2025
-    df_2025 = df[df[venc_col].dt.year == 2025].copy()
-    df_2025["Semana"] = df_2025[venc_col].dt.isocalendar().week
-
     # Calcular semana limite: atual menos duas
     semana_limite = max(1, datetime.today().isocalendar().week - 2)
-
-    # Agrupar por semana, entidade e comercial
-    df_detalhado = (
-        df_2025[df_2025["Semana"] <= semana_limite]
-        .groupby(["Semana", entidade_col, "Comercial"])[valor_pendente_col]
-        .sum()
-        .reset_index()
-        .sort_values(by=["Semana", valor_pendente_col], ascending=[True, False])
-    )
+    df_detalhado, df_total_semana = relatorio_semanal(df, versao, comercial_selecionado, semana_limite)
 
     # Estilo condicional: destaque para valores acima da média
-    media = df_detalhado[valor_pendente_col].mean()
-    def destaque_maior(val):
-        if isinstance(val, (int, float)) and val > media:
-            return "background-color: #f8d7da; font-weight: bold"
-        return ""
+    destaque = regras_acima_media(df_detalhado[valor_pendente_col].mean(), "background-color: #f8d7da; font-weight: bold")
 
     st.dataframe(
-        df_detalhado.style
-        .format({valor_pendente_col: "€ {:,.2f}"})
-        .applymap(destaque_maior, subset=[valor_pendente_col]),
+        estilizar(df_detalhado.style.format({valor_pendente_col: "€ {:,.2f}"}), destaque),
         use_container_width=True
     )
 
     # Gráfico de barras por semana (total geral)
     st.subheader("📊 Evolução Semanal do Valor Pendente (Total)")
-    df_total_semana = df_detalhado.groupby("Semana")[valor_pendente_col].sum().reset_index()
     st.bar_chart(df_total_semana.set_index("Semana"))
 
-    # Exportar para Excel com duas abas
-    output_detalhado = io.BytesIO()
-    with pd.ExcelWriter(output_detalhado, engine='xlsxwriter') as writer:
-        df_detalhado.to_excel(writer, sheet_name='Evolução Semanal Detalhada', index=False)
-        df_total_semana.to_excel(writer, sheet_name='Resumo Semanal Total', index=False)
-    output_detalhado.seek(0)
-
-    b64_detalhado = base64.b64encode(output_detalhado.read()).decode()
-    href_detalhado = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64_detalhado}" download="Relatorio_Anual_2025.xlsx">📥 Baixar Excel</a>'
-    st.markdown(href_detalhado, unsafe_allow_html=True)
-with tab3:
-    st.header("🗓 Relatório Mensal 2025 — Soma por Comercial")
+    botao_excel("anual", partial(excel_bytes, {
+        'Evolução Semanal Detalhada': df_detalhado,
+        'Resumo Semanal Total': df_total_semana,
+    }, regras={'Evolução Semanal Detalhada': destaque}), "Relatorio_Anual_2025.xlsx")
 
-    # Filtrar dados do ano de 2025
-    df_2025 = df[df[venc_col].dt.year == 2025].copy()
-    df_2025["Mês"] = df_2025[venc_col].dt.month
 
-    # Agrupar por mês e comercial
-    df_mensal = (
-        df_2025.groupby(["Mês", "Comercial"])[valor_pendente_col]
-        .sum()
-        .reset_index()
-        .sort_values(by=["Mês", valor_pendente_col], ascending=[True, False])
-    )
+def seccao_relatorio_mensal():
+    st.header("🗓 Relatório Mensal 2025 — Soma por Comercial")
+
+    df_mensal, df_total_mes = relatorio_mensal(df, versao, comercial_selecionado)
 
     # Estilo condicional: destaque para valores acima da média
-    media_mensal = df_mensal[valor_pendente_col].mean()
-    def destaque_mensal(val):
-        if isinstance(val, (int, float)) and val > media_mensal:
-            return "background-color: #d1ecf1; font-weight: bold"
-        return ""
+    destaque = regras_acima_media(df_mensal[valor_pendente_col].mean(), "background-color: #d1ecf1; font-weight: bold")
 
     st.dataframe(
-        df_mensal.style
-        .format({valor_pendente_col: "€ {:,.2f}"})
-        .applymap(destaque_mensal, subset=[valor_pendente_col]),
+        estilizar(df_mensal.style.format({valor_pendente_col: "€ {:,.2f}"}), destaque),
         use_container_width=True
     )
 
     # Gráfico de barras por mês (total geral)
     st.subheader("📊 Evolução Mensal do Valor Pendente (Total)")
-    df_total_mes = df_mensal.groupby("Mês")[valor_pendente_col].sum().reset_index()
     st.bar_chart(df_total_mes.set_index("Mês"))
 
-    # Exportar para Excel
-    output_mensal = io.BytesIO()
-    with pd.ExcelWriter(output_mensal, engine='xlsxwriter') as writer:
-        df_mensal.to_excel(writer, sheet_name='Resumo Mensal 2025', index=False)
-        df_total_mes.to_excel(writer, sheet_name='Totais por Mês', index=False)
-    output_mensal.seek(0)
-
-    b64_mensal = base64.b64encode(output_mensal.read()).decode()
-    href_mensal = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64_mensal}" download="Relatorio_Mensal_2025.xlsx">📥 Baixar Excel</a>'
-    st.markdown(href_mensal, unsafe_allow_html=True)
-with tab4:
-    st.header("📈 Comparativo Mensal — Totais por Comercial")
+    botao_excel("mensal", partial(excel_bytes, {
+        'Resumo Mensal 2025': df_mensal,
+        'Totais por Mês': df_total_mes,
+    }, regras={'Resumo Mensal 2025': destaque}), "Relatorio_Mensal_2025.xlsx")
 
-    # Filtrar dados do ano de 2025
-    df_2025 = df[df[venc_col].dt.year == 2025].copy()
-    df_2025["Mês"] = df_2025[venc_col].dt.month
 
-    # Agrupar por mês e comercial
-    df_comparativo = (
-        df_2025.groupby(["Mês", "Comercial"])[valor_pendente_col]
-        .sum()
-        .reset_index()
-        .sort_values(by=["Mês", valor_pendente_col], ascending=[True, False])
-    )
+def seccao_comparativo():
+    st.header("📈 Comparativo Mensal — Totais por Comercial")
 
-    # Pivot para gráfico comparativo
-    df_pivot = df_comparativo.pivot(index="Mês", columns="Comercial", values=valor_pendente_col).fillna(0)
+    df_comparativo, df_pivot = comparativo_mensal(df, versao, comercial_selecionado)
 
     st.subheader("📊 Evolução Mensal por Comercial")
     st.line_chart(df_pivot)
@@ -260,13 +312,13 @@ with tab4:
         use_container_width=True
     )
 
-    # Exportar para Excel
-    output_comp = io.BytesIO()
-    with pd.ExcelWriter(output_comp, engine='xlsxwriter') as writer:
-        df_comparativo.to_excel(writer, sheet_name='Comparativo Mensal', index=False)
-        df_pivot.to_excel(writer, sheet_name='Gráfico por Comercial')
-    output_comp.seek(0)
+    botao_excel("comparativo", partial(excel_comparativo, df_comparativo, df_pivot), "Comparativo_Mensal_2025.xlsx")
+
 
-    b64_comp = base64.b64encode(output_comp.read()).decode()
-    href_comp = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64_comp}" download="Comparativo_Mensal_2025.xlsx">📥 Baixar Excel</a>'
-    st.markdown(href_comp, unsafe_allow_html=True)
+# Só a secção visível é calculada
+seccoes_lazy({
+    "📅 Dashboard Semanal": seccao_semanal,
+    "📆 Relatório semanal 2025": seccao_relatorio_semanal,
+    "🗓 Relatório Mensal 2025": seccao_relatorio_mensal,
+    "📈 Comparativo Mensal": seccao_comparativo,
+}, key="seccao_proximas2sem")
@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 
+from estilos import estilizar, regra_gradiente
+
 # 🚀 Page configuration
 st.set_page_config(page_title="Reis & Pacheco Dashboard", layout="wide", page_icon="📊")
 
@@ -81,18 +83,18 @@ else:
     # --- Styled Table ---
     st.markdown("### 📋 Resultados Filtrados")
     st.dataframe(
-        filtered_df.style.background_gradient(cmap="YlGnBu").format({
+        estilizar(filtered_df.style.format({
             "Quantidade": "{:.2f}",
             "V Líquido": "€ {:.2f}"
-        }),
+        }), [regra_gradiente(cmap="YlGnBu")]),
         use_container_width=True
     )
 
     st.markdown("### 📌 Top Artigos")
     st.dataframe(
-        top_artigos.style.background_gradient(cmap="OrRd").format({
+        estilizar(top_artigos.style.format({
             "Quantidade": "{:.2f}",
             "V Líquido": "€ {:.2f}"
-        }),
+        }), [regra_gradiente(cmap="OrRd")]),
         use_container_width=True
     )
@@ -3,6 +3,9 @@ import requests
 from io import BytesIO
 import streamlit as st
 
+from dados_versao import marcar_versao, versao_dados
+from hierarquia import indice_hierarquico
+
 st.markdown("""
     <style>
     #MainMenu {visibility: hidden;}
@@ -17,11 +20,24 @@ st.markdown("""
 # -------------------------------
 url = "https://github.com/paulom40/PFonseca.py/raw/main/RSilva.xlsx"
 
-try:
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def carregar_vencimentos(url: str) -> pd.DataFrame:
     response = requests.get(url)
     response.raise_for_status()
     df = pd.read_excel(BytesIO(response.content), sheet_name="RSilva")
     df["Data Venc."] = pd.to_datetime(df["Data Venc."], errors="coerce").dt.date
+    df.columns = df.columns.str.strip()
+    df["Entidade"] = df["Entidade"].astype(str).str.strip()
+    df["Dias"] = pd.to_numeric(df["Dias"], errors="coerce")
+    df = df.dropna(subset=["Dias"])
+    df["Dias"] = df["Dias"].astype(int)
+    df["Valor Pendente"] = pd.to_numeric(df["Valor Pendente"], errors="coerce")
+    return marcar_versao(df)
+
+
+try:
+    df = carregar_vencimentos(url)
     st.success("📥 Dados carregados com sucesso!")
 except Exception as e:
     st.error(f"Erro ao carregar os dados: {e}")
@@ -29,22 +45,15 @@ except Exception as e:
 
 st.write("📅 Last Update 29/08/2025")
 
-# -------------------------------
-# 🧹 Clean and prepare data
-# -------------------------------
-df.columns = df.columns.str.strip()
-df["Entidade"] = df["Entidade"].astype(str).str.strip()
-df["Dias"] = pd.to_numeric(df["Dias"], errors="coerce")
-df = df.dropna(subset=["Dias"])
-df["Dias"] = df["Dias"].astype(int)
-df["Valor Pendente"] = pd.to_numeric(df["Valor Pendente"], errors="coerce")
+# Linhas por Entidade, ordenadas por Dias: construído uma vez por versão dos dados
+indice = indice_hierarquico(df, versao_dados(df), ("Entidade",), "Dias")
 
 # -------------------------------
 # 🎛️ Sidebar: Filters
 # -------------------------------
 st.sidebar.header("🔎 Filtros")
 
-entidades_unicas = sorted(df["Entidade"].dropna().unique())
+entidades_unicas = indice.opcoes()
 entidade_selecionada = st.sidebar.selectbox("Selecione o Cliente:", entidades_unicas)
 
 st.sidebar.markdown("### ⏳ Filtro por Dias até Vencimento")
@@ -59,8 +68,7 @@ dias_min, dias_max = st.sidebar.slider(
 # -------------------------------
 # 🔍 Apply filters
 # -------------------------------
-df_cliente = df[df["Entidade"] == entidade_selecionada]
-df_filtrado = df_cliente[(df_cliente["Dias"] >= dias_min) & (df_cliente["Dias"] <= dias_max)]
+df_filtrado = indice.filtrar(entidade_selecionada, minimo=dias_min, maximo=dias_max)
 
 # Columns to display
 cols_exibir = ["Entidade", "Documento", "Data Venc.", "Dias", "Valor Pendente"]
@@ -82,7 +90,7 @@ col3.metric("💰 Valor Pendente Total", f"€ {df_filtrado['Valor Pendente'].su
 # 📉 Overdue Table (-20 a -1 Dias)
 # -------------------------------
 st.subheader("📉 Registros Por Vencer nos proximos 20 Dias")
-df_a_vencer = df_cliente[(df_cliente["Dias"] >= -20) & (df_cliente["Dias"] <= -1)]
+df_a_vencer = indice.filtrar(entidade_selecionada, minimo=-20, maximo=-1)
 st.dataframe(df_a_vencer[cols_exibir], use_container_width=True)
 
 # 📈 Overdue summary metrics
@@ -6,9 +6,17 @@ from io import BytesIO
 import uuid
 import altair as alt
 from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+
+from alertas_email import AgendadorAlertas
+from antiguidade import ESCALOES_TODOS, categorias_escalao
+from atividade import indice_atividade
+from carteira import carregar_v0808
+from dados_versao import chave_filtros, marcar_versao, versao_dados
+from exportacoes import botao_exportacao_formatos
+from fluxo_caixa import PrevisaoRecebimentos
+from formatacao import aplicar_formatos_excel, config_colunas
+from indicadores_cobranca import JANELAS, IndicadoresCobranca
+from tabelas import tabela_paginada
 
 st.markdown("""
     <style>
@@ -54,47 +62,41 @@ def load_data(_cache_buster):
         response.raise_for_status()
         df = pd.read_excel(BytesIO(response.content), sheet_name='Sheet1')
         df['Dias'] = pd.to_numeric(df['Dias'], errors='coerce').fillna(0)
-        df['Overdue Category'] = pd.cut(
-            df['Dias'],
-            bins=[-float('inf'), 10, 30, 60, 90, float('inf')],
-            labels=['<=10 days', '11-30 days', '31-60 days', '61-90 days', '90+ days'],
-            include_lowest=True
-        )
+        # mesmos escalões dos dashboards de vencimentos (antiguidade.ESCALOES), mais os extremos
+        df['Overdue Category'] = categorias_escalao(df['Dias'], ESCALOES_TODOS)
         for col in ['Data Venc.', 'Data Doc.', 'Data Receb.']:
             if col in df.columns:
                 df[col] = pd.to_datetime(df[col], errors='coerce')
-        return df
+        return marcar_versao(df)
     except requests.RequestException as e:
         st.error(f"❌ Failed to load V0808.xlsx from GitHub: {str(e)}")
         return pd.DataFrame()
 
-# Function to send email alert
-def send_email_alert(entidades, smtp_server, smtp_port, sender_email, sender_password, recipient_email):
+# Alertas por email: avaliados numa thread de fundo depois de cada atualização
+# (e de hora a hora sem visitas), com registo de envios e uma ligação SMTP reutilizada
+@st.cache_resource
+def agendador_alertas():
     try:
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = recipient_email
-        msg['Subject'] = "⚠️ Alert: Entidades com Último Documento entre 30 e 60 Dias"
-
-        body = "As seguintes entidades têm o último documento entre 30 e 60 dias:\n\n"
-        for _, row in entidades.iterrows():
-            body += f"Entidade: {row['Entidade']}, Dias desde último documento: {row['Days Since Last Doc']}\n"
-        msg.attach(MIMEText(body, 'plain'))
-
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.send_message(msg)
-        return True
-    except smtplib.SMTPAuthenticationError:
-        st.error("❌ Gmail authentication failed. Check your email and App Password in secrets.toml.")
-        return False
-    except smtplib.SMTPException as e:
-        st.warning(f"⚠️ Failed to send email alert: SMTP error - {str(e)}")
-        return False
-    except Exception as e:
-        st.warning(f"⚠️ Failed to send email alert: {str(e)}")
-        return False
+        config = dict(st.secrets["email"])
+    except (KeyError, FileNotFoundError):
+        return None
+    return AgendadorAlertas(config, carregar=carregar_v0808, intervalo=3600)
+
+# Previsão de recebimentos: atrasos históricos aprendidos uma vez por versão dos dados (e por dia)
+@st.cache_resource(max_entries=4, show_spinner=False)
+def previsao_recebimentos(_df, versao, hoje):
+    return PrevisaoRecebimentos(_df, hoje)
+
+# DSO / atraso ponderado / pontualidade: eventos acumulados uma vez por versão dos dados (e por dia)
+@st.cache_resource(max_entries=4, show_spinner=False)
+def indicadores_carteira(_df, versao, hoje):
+    return IndicadoresCobranca(_df, hoje)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def tabela_indicadores(_df, versao, hoje, por):
+    tabela = indicadores_carteira(_df, versao, hoje).metricas(por)
+    tabela.attrs["versao"] = versao
+    return tabela
 
 st.markdown("<h1 style='color:#4B8BBE;'>📊 Relatório Recebimentos </h1>", unsafe_allow_html=True)
 st.markdown(f"**Atualizado em {datetime.now().strftime('%d/%m/%Y')}**")
@@ -102,7 +104,6 @@ st.markdown(f"**Atualizado em {datetime.now().strftime('%d/%m/%Y')}**")
 if st.button("🔄 Update Data"):
     st.cache_data.clear()
     st.session_state["cache_buster"] = str(uuid.uuid4())
-    st.session_state.pop("email_sent", None)  # Reset email sent flag on data update
 
 if "cache_buster" not in st.session_state:
     st.session_state["cache_buster"] = str(uuid.uuid4())
@@ -188,8 +189,9 @@ if filtered_df.empty:
     st.warning("⚠️ No data matches the selected filters.")
 else:
     filtered_df_display = filtered_df.copy()
+    filtros_relatorio = chave_filtros(comercial=selected_comercial, entidade=selected_entidade, dias=dias_range,
+                                      coluna_data=date_column, datas=(start_date, end_date))
     filtered_df_display['Dias'] = filtered_df_display['Dias'].round(0).astype(int)
-    filtered_df_display['Valor Pendente'] = filtered_df_display['Valor Pendente'].apply(lambda x: f"€{x:,.2f}")
 
     st.markdown(f"<h4 style='color:#4B8BBE;'>📅 Análise desde os dias <b>{min_dias}</b> a <b>{max_dias}</b></h4>", unsafe_allow_html=True)
     st.markdown(
@@ -200,7 +202,8 @@ else:
     st.markdown("### 📋 Tabela de dados:")
     st.dataframe(
         filtered_df_display[['Comercial', 'Entidade', 'Data Venc.', 'Dias', 'Valor Pendente', 'Documento', 'N.º Doc.', 'Overdue Category']],
-        use_container_width=True
+        use_container_width=True,
+        column_config=config_colunas({'Valor Pendente': 'euro'})
     )
 
     st.markdown("### 🧮 Relatório por Comercial")
@@ -211,9 +214,8 @@ else:
     ).reset_index()
     summary_comercial['Total_Pending'] = summary_comercial['Total_Pending'].round(2)
     summary_comercial['Avg_Dias'] = summary_comercial['Avg_Dias'].round(0).astype(int)
-    summary_comercial_display = summary_comercial.copy()
-    summary_comercial_display['Total_Pending'] = summary_comercial_display['Total_Pending'].apply(lambda x: f"€{x:,.2f}")
-    st.table(summary_comercial_display)
+    tabela_paginada(summary_comercial, "resumo_comercial", formatos={'Total_Pending': 'euro'},
+                    chave=(versao_dados(df), filtros_relatorio))
 
     st.markdown("### 🧾 Relatório por Entidade")
     summary_entidade = filtered_df.groupby('Entidade').agg(
@@ -223,48 +225,103 @@ else:
     ).reset_index()
     summary_entidade['Total_Pending'] = summary_entidade['Total_Pending'].round(2)
     summary_entidade['Max_Dias'] = summary_entidade['Max_Dias'].round(0).astype(int)
-    summary_entidade_display = summary_entidade.copy()
-    summary_entidade_display['Total_Pending'] = summary_entidade_display['Total_Pending'].apply(lambda x: f"€{x:,.2f}")
-    st.table(summary_entidade_display)
+    tabela_paginada(summary_entidade, "resumo_entidade", formatos={'Total_Pending': 'euro'},
+                    chave=(versao_dados(df), filtros_relatorio))
+
+    st.markdown("### 💶 Previsão de Recebimentos")
+    if 'Data Receb.' in df.columns:
+        previsao = previsao_recebimentos(df, versao_dados(df), pd.Timestamp.today().normalize())
+        semanas_previsao = st.slider("Semanas a projetar", min_value=1, max_value=26, value=12, key="semanas_previsao")
+        filtro_previsao = {'Comercial': selected_comercial, 'Entidade': selected_entidade}
+        projecao_df = previsao.projecao(semanas_previsao, filtro=filtro_previsao)
+        fora_horizonte = previsao.fora_do_horizonte(semanas_previsao, filtro=filtro_previsao)
+
+        col1, col2 = st.columns(2)
+        col1.metric("💶 Recebimento esperado", f"€ {projecao_df['Recebimento Esperado'].sum():,.2f}")
+        col2.metric("⏭️ Para além do horizonte", f"€ {fora_horizonte:,.2f}")
+        chart_previsao = alt.Chart(projecao_df).mark_bar().encode(
+            x=alt.X('Início:T', title='Semana'),
+            y=alt.Y('Recebimento Esperado:Q', title='€'),
+            tooltip=['Semana', 'Início', 'Fim', alt.Tooltip('Recebimento Esperado:Q', format=',.2f')]
+        ).properties(height=300)
+        st.altair_chart(chart_previsao, use_container_width=True)
+        st.dataframe(
+            projecao_df, use_container_width=True, hide_index=True,
+            column_config=config_colunas({'Recebimento Esperado': 'euro', 'Acumulado': 'euro'})
+        )
+        with st.expander("📐 Atrasos históricos por Entidade"):
+            perfis_df = previsao.perfis()
+            if selected_entidade:
+                perfis_df = perfis_df[perfis_df['Entidade'].isin(selected_entidade)]
+            st.dataframe(perfis_df, use_container_width=True, hide_index=True,
+                         column_config=config_colunas({'Atraso Médio': 'decimal'}))
+    else:
+        projecao_df = pd.DataFrame()
+        st.info("ℹ️ Sem coluna 'Data Receb.' para aprender os atrasos de pagamento.")
+
+    st.markdown("### 📏 Indicadores de Cobrança")
+    if {'Data Doc.', 'Data Receb.'} <= set(df.columns):
+        hoje_indicadores = pd.Timestamp.today().normalize()
+        col1, col2 = st.columns(2)
+        por_indicadores = col1.selectbox("Agrupar por", ["Entidade", "Comercial"], key="indicadores_por")
+        janela_indicadores = col2.selectbox(
+            "Janela móvel (dias)", JANELAS, index=JANELAS.index(90), key="indicadores_janela"
+        )
+        indicadores_df = tabela_indicadores(df, versao_dados(df), hoje_indicadores, por_indicadores)
+        selecionados = selected_entidade if por_indicadores == 'Entidade' else selected_comercial
+        indicadores_janela = indicadores_df[indicadores_df['Janela (dias)'] == janela_indicadores]
+        if selecionados:
+            indicadores_janela = indicadores_janela[indicadores_janela[por_indicadores].isin(selecionados)]
+
+        total = indicadores_carteira(df, versao_dados(df), hoje_indicadores).serie(None, janela_indicadores, 12)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("📆 DSO (carteira)", f"{total['DSO'].iloc[-1]:.0f} dias" if pd.notna(total['DSO'].iloc[-1]) else "N/D")
+        col2.metric("⏱️ Atraso médio ponderado", f"{total['Atraso Médio Ponderado'].iloc[-1]:.1f} dias"
+                    if pd.notna(total['Atraso Médio Ponderado'].iloc[-1]) else "N/D")
+        col3.metric("✅ Pagos a tempo", f"{total['Taxa Pontualidade'].iloc[-1]:.0%}"
+                    if pd.notna(total['Taxa Pontualidade'].iloc[-1]) else "N/D")
+        chart_dso = alt.Chart(total).mark_line(point=True).encode(
+            x=alt.X('Data:T', title='Fim da janela'),
+            y=alt.Y('DSO:Q', title='DSO (dias)'),
+            tooltip=['Data', alt.Tooltip('DSO:Q', format='.0f'), alt.Tooltip('Atraso Médio Ponderado:Q', format='.1f'),
+                     alt.Tooltip('Taxa Pontualidade:Q', format='.0%')]
+        ).properties(height=250)
+        st.altair_chart(chart_dso, use_container_width=True)
+
+        tabela_paginada(
+            indicadores_janela.drop(columns='Janela (dias)'), "indicadores_cobranca",
+            formatos={'Faturado': 'euro', 'Em Aberto': 'euro', 'Valor Liquidado': 'euro', 'DSO': 'decimal',
+                      'Atraso Médio Ponderado': 'decimal', 'Taxa Pontualidade': 'percentagem'},
+            chave=(versao_dados(df), chave_filtros(por=por_indicadores, janela=janela_indicadores, grupos=selecionados,
+                                                      hoje=hoje_indicadores.date()))
+        )
+        # todas as janelas do agrupamento escolhido
+        botao_exportacao_formatos(
+            "📥 Exportar indicadores", indicadores_df, "Reports.indicadores", f"indicadores_cobranca_{por_indicadores.lower()}",
+            filtros=chave_filtros(por=por_indicadores, hoje=hoje_indicadores.date()),
+        )
+    else:
+        st.info("ℹ️ Sem colunas 'Data Doc.' / 'Data Receb.' para calcular os indicadores de cobrança.")
 
     # 🕒 Entidades with last Data Doc > 30 and > 90 days
+    # Last-document index per Entidade, maintained incrementally across reruns
     today = pd.Timestamp.today()
-    entidade_last_doc = (
-        df.groupby('Entidade')['Data Doc.']
-        .max()
-        .reset_index()
-        .rename(columns={'Data Doc.': 'Last Data Doc'})
-    )
-    entidade_last_doc['Days Since Last Doc'] = (today - entidade_last_doc['Last Data Doc']).dt.days
+    indice_docs = indice_atividade("Reports.Entidade", 'Entidade', 'Data Doc.').sincronizar(df)
+    colunas_last_doc = {'Data Doc.': 'Last Data Doc', 'dias': 'Days Since Last Doc'}
 
     # Filter for 30-60 days
-    entidade_doc_30_60 = entidade_last_doc[
-        (entidade_last_doc['Days Since Last Doc'] > 30) & 
-        (entidade_last_doc['Days Since Last Doc'] <= 60)
-    ].copy()
-    entidade_doc_30_60.sort_values(by='Days Since Last Doc', ascending=False, inplace=True)
-
-    # Send email alert if there are entities between 30 and 60 days and email hasn't been sent in this session
-    if not entidade_doc_30_60.empty and "email_sent" not in st.session_state:
-        try:
-            smtp_server = st.secrets["email"]["smtp_server"]
-            smtp_port = st.secrets["email"]["smtp_port"]
-            sender_email = st.secrets["email"]["sender_email"]
-            sender_password = st.secrets["email"]["sender_password"]
-            recipient_email = st.secrets["email"]["recipient_email"]
-            
-            if send_email_alert(
-                entidade_doc_30_60,
-                smtp_server,
-                smtp_port,
-                sender_email,
-                sender_password,
-                recipient_email
-            ):
-                st.success("📧 Email alert sent for entities with last document between 30 and 60 days.")
-                st.session_state["email_sent"] = True  # Prevent sending multiple emails in the same session
-        except KeyError:
-            st.error("❌ Email configuration not found in Streamlit secrets. Please configure email settings in secrets.toml.")
+    entidade_doc_30_60 = indice_docs.banda(30, 60, today).rename(columns=colunas_last_doc)
+
+    # Email alert: handed to the background scheduler, never sent while the page renders
+    agendador = agendador_alertas()
+    if agendador is None:
+        st.error("❌ Email configuration not found in Streamlit secrets. Please configure email settings in secrets.toml.")
+    else:
+        agendador.notificar(df, versao_dados(df))
+        if isinstance(agendador.ultimo_resultado, Exception):
+            st.warning(f"⚠️ Failed to send email alert: {agendador.ultimo_resultado}")
+        elif agendador.ultimo_resultado:
+            st.caption(f"📧 Last email alert covered {agendador.ultimo_resultado} new entities.")
 
     st.markdown("### ⏳ Entidades com último documento entre 30 e 60 dias")
     if not entidade_doc_30_60.empty:
@@ -280,8 +337,7 @@ else:
         st.info("ℹ️ No entities with last document between 30 and 60 days.")
 
     st.markdown("### ⏳ Entidades com último documento há mais de 30 dias")
-    entidade_doc_30 = entidade_last_doc[entidade_last_doc['Days Since Last Doc'] > 30].copy()
-    entidade_doc_30.sort_values(by='Days Since Last Doc', ascending=False, inplace=True)
+    entidade_doc_30 = indice_docs.banda(30, None, today).rename(columns=colunas_last_doc)
     if not entidade_doc_30.empty:
         st.dataframe(entidade_doc_30, use_container_width=True)
         st.markdown("### 📊 Dias desde último documento por Entidade (>30 dias)")
@@ -295,8 +351,7 @@ else:
         st.info("ℹ️ No entities with last document older than 30 days.")
 
     st.markdown("### 🔴 Entidades com último documento há mais de 90 dias")
-    entidade_doc_90 = entidade_last_doc[entidade_last_doc['Days Since Last Doc'] > 90].copy()
-    entidade_doc_90.sort_values(by='Days Since Last Doc', ascending=False, inplace=True)
+    entidade_doc_90 = indice_docs.banda(90, None, today).rename(columns=colunas_last_doc)
     if not entidade_doc_90.empty:
         st.dataframe(entidade_doc_90, use_container_width=True)
         st.markdown("### 📊 Dias desde último documento por Entidade (>90 dias)")
@@ -312,12 +367,19 @@ else:
     # ------------------ 📥 EXPORT TO EXCEL ------------------
     st.markdown("### 📤 Exportar dados filtrados para Excel")
 
-    def to_excel_bytes(df1, df2, df3):
+    def to_excel_bytes(df1, df2, df3, df4):
         output = BytesIO()
         with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
             df1.to_excel(writer, sheet_name='Dados Filtrados', index=False)
             df2.to_excel(writer, sheet_name='Resumo Comercial', index=False)
             df3.to_excel(writer, sheet_name='Resumo Entidade', index=False)
+            aplicar_formatos_excel(writer, 'Dados Filtrados', df1, {'Valor Pendente': 'euro'})
+            aplicar_formatos_excel(writer, 'Resumo Comercial', df2, {'Total_Pending': 'euro'}, largura=15)
+            aplicar_formatos_excel(writer, 'Resumo Entidade', df3, {'Total_Pending': 'euro'}, largura=15)
+            if not df4.empty:
+                df4.to_excel(writer, sheet_name='Previsão Recebimentos', index=False)
+                aplicar_formatos_excel(writer, 'Previsão Recebimentos', df4,
+                                       {'Recebimento Esperado': 'euro', 'Acumulado': 'euro'}, largura=15)
 
             if 'Dias' in df1.columns:
                 workbook = writer.book
@@ -334,7 +396,7 @@ else:
         output.seek(0)
         return output
 
-    excel_data = to_excel_bytes(filtered_df, summary_comercial, summary_entidade)
+    excel_data = to_excel_bytes(filtered_df, summary_comercial, summary_entidade, projecao_df)
     st.download_button(
         label="📥 Download Excel",
         data=excel_data,
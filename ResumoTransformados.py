@@ -5,9 +5,12 @@ import plotly.express as px
 from datetime import datetime
 import io
 
-import matplotlib.pyplot as plt
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as XLImage
+import xlsxwriter
+
+from dados_versao import filtros_dados, marcar_filtros, marcar_versao, versao_dados
+from graficos_excel import adicionar_grafico
+from rankings import rankings_em_cache
+from seccoes import seccoes_lazy
 
 # ====================== CONFIG STREAMLIT ======================
 st.set_page_config(
@@ -102,7 +105,7 @@ def load_data(path_or_file="ResumoTR.xlsx") -> pd.DataFrame:
 
     df["AnoMes"] = df["Data"].dt.strftime("%Y-%m")
 
-    return df
+    return marcar_versao(df)
 # ====================== FILTROS ======================
 def aplicar_filtros(df: pd.DataFrame) -> pd.DataFrame:
     st.sidebar.header("Filtros")
@@ -148,7 +151,7 @@ def aplicar_filtros(df: pd.DataFrame) -> pd.DataFrame:
     if sel_nome:
         df_filt = df_filt[df_filt["Nome"].isin(sel_nome)]
 
-    return df_filt
+    return marcar_filtros(df_filt, periodo=(data_inicio, data_fim), comercial=sel_com, artigo=sel_art, nome=sel_nome)
 # ====================== KPIs ======================
 def calcular_kpis(df: pd.DataFrame) -> dict:
     if df.empty:
@@ -226,6 +229,12 @@ def calcular_ticket_medio_por_comercial(df: pd.DataFrame) -> pd.DataFrame:
     grp["Valor_Medio_Unidade"] = grp["Total_Vendas"] / grp["Quantidade"]
 
     return grp.sort_values("Total_Vendas", ascending=False)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def kpis_em_cache(_df: pd.DataFrame, versao: str, filtros: tuple):
+    """KPIs e ticket médio por comercial memorizados por (versão dos dados, filtros)."""
+    return calcular_kpis(_df), calcular_ticket_medio_por_comercial(_df)
 # ====================== VISUALIZAÇÕES PRINCIPAIS ======================
 def desenhar_kpis(kpis: dict, df_ticket_com: pd.DataFrame):
     st.subheader("KPIs em Tempo Real")
@@ -281,6 +290,12 @@ def grafico_evolucao(df: pd.DataFrame):
 
 
 def graficos_top10(df: pd.DataFrame):
+    # Um único groupby por entidade calcula € e Quantidade; top-10 por seleção parcial
+    if not df.empty:
+        chave = (versao_dados(df), filtros_dados(df))
+        rank_prod = rankings_em_cache(df, *chave, "Artigo", ("V Líquido", "Quantidade"), k=10)["top"]
+        rank_cli = rankings_em_cache(df, *chave, "Nome", ("V Líquido", "Quantidade"), k=10)["top"]
+
     col1, col2 = st.columns(2)
 
     # Top 10 Produtos (€)
@@ -289,7 +304,7 @@ def graficos_top10(df: pd.DataFrame):
         if df.empty:
             st.warning("Sem dados.")
         else:
-            topp = df.groupby("Artigo")["V Líquido"].sum().nlargest(10)
+            topp = rank_prod["V Líquido"].set_index("Artigo")["V Líquido"]
             figp = px.bar(
                 x=topp.values, y=topp.index, orientation="h",
                 color=topp.values, color_continuous_scale="Plasma"
@@ -303,7 +318,7 @@ def graficos_top10(df: pd.DataFrame):
         if df.empty:
             st.warning("Sem dados.")
         else:
-            topc = df.groupby("Nome")["V Líquido"].sum().nlargest(10)
+            topc = rank_cli["V Líquido"].set_index("Nome")["V Líquido"]
             figc = px.bar(
                 x=topc.values, y=topc.index, orientation="h",
                 color=topc.values, color_continuous_scale="Viridis"
@@ -321,7 +336,7 @@ def graficos_top10(df: pd.DataFrame):
         if df.empty:
             st.warning("Sem dados.")
         else:
-            topp_q = df.groupby("Artigo")["Quantidade"].sum().nlargest(10)
+            topp_q = rank_prod["Quantidade"].set_index("Artigo")["Quantidade"]
             figpq = px.bar(
                 x=topp_q.values, y=topp_q.index, orientation="h",
                 color=topp_q.values, color_continuous_scale="Blues"
@@ -335,7 +350,7 @@ def graficos_top10(df: pd.DataFrame):
         if df.empty:
             st.warning("Sem dados.")
         else:
-            topc_q = df.groupby("Nome")["Quantidade"].sum().nlargest(10)
+            topc_q = rank_cli["Quantidade"].set_index("Nome")["Quantidade"]
             figcq = px.bar(
                 x=topc_q.values, y=topc_q.index, orientation="h",
                 color=topc_q.values, color_continuous_scale="Greens"
@@ -519,8 +534,35 @@ def criar_sheet(wb, name: str, existing_names: set):
     Cria uma folha com nome validado e único.
     """
     name_real = sanitize_sheet_name(name, existing_names)
+    if hasattr(wb, "add_worksheet"):
+        return wb.add_worksheet(name_real)
     ws = wb.create_sheet(title=name_real)
     return ws
+
+
+def novo_workbook_streaming(buffer: io.BytesIO):
+    """
+    Workbook xlsxwriter em modo constant_memory: cada linha é enviada para
+    disco assim que a seguinte começa, e o ficheiro final vai direto para `buffer`.
+    """
+    return xlsxwriter.Workbook(buffer, {
+        "constant_memory": True,
+        "default_date_format": "dd/mm/yyyy",
+        "nan_inf_to_errors": True,
+    })
+
+
+def escrever_dados_streaming(ws, df: pd.DataFrame, bloco: int = 5000):
+    """
+    Escreve df na folha por blocos de linhas (write_row), sem percorrer célula a célula.
+    Cada bloco é convertido de uma só vez para valores Python (NaN/NaT -> célula vazia).
+    """
+    ws.write_row(0, 0, list(df.columns))
+    for inicio in range(0, len(df), bloco):
+        parte = df.iloc[inicio:inicio + bloco]
+        linhas = parte.astype(object).where(parte.notna(), None).to_numpy().tolist()
+        for row_num, linha in enumerate(linhas, inicio + 1):
+            ws.write_row(row_num, 0, linha)
 # ====================== EXPORTAÇÃO EXCEL — RELATÓRIO COMPLETO ======================
 def tabela_dados_export(df: pd.DataFrame, kpis: dict):
     st.subheader("📄 Exportação — Relatório Completo")
@@ -529,102 +571,67 @@ def tabela_dados_export(df: pd.DataFrame, kpis: dict):
         st.warning("Sem dados para exportar.")
         return
 
-    # Criar workbook
-    wb = Workbook()
-    ws0 = wb.active
-    ws0.title = "Resumo"
-    existing_names = {ws0.title}
-
-    # ====================== Função interna para adicionar gráficos ======================
-    def add_plot_to_sheet(sheet_name, fig, anchor="H2"):
-        img_buffer = io.BytesIO()
-        fig.savefig(img_buffer, format="png", dpi=150, bbox_inches="tight")
-        img_buffer.seek(0)
-
-        ws = wb[sheet_name]
-        img = XLImage(img_buffer)
-        img.anchor = anchor
-        ws.add_image(img)
+    # Criar workbook (escrita em streaming diretamente para o buffer)
+    buffer = io.BytesIO()
+    wb = novo_workbook_streaming(buffer)
+    existing_names = set()
+    ws0 = criar_sheet(wb, "Resumo", existing_names)
 
     # ====================== Folha Resumo ======================
-    ws0["A1"] = "Resumo Geral"
-    ws0["A3"] = "Total Vendas (€)"
-    ws0["B3"] = kpis["total_vendas"]
-    ws0["A4"] = "Quantidade Total"
-    ws0["B4"] = kpis["qtd"]
-    ws0["A5"] = "Clientes Únicos"
-    ws0["B5"] = kpis["clientes"]
-    ws0["A6"] = "Produtos Vendidos"
-    ws0["B6"] = kpis["produtos"]
-    ws0["A7"] = "Transações"
-    ws0["B7"] = kpis["trans"]
-    ws0["A8"] = "Ticket Médio Comercial (€)"
-    ws0["B8"] = kpis["ticket"]
-    ws0["A9"] = "Ticket Médio Cliente (€)"
-    ws0["B9"] = kpis["ticket_cliente"]
-    ws0["A10"] = "Venda Média por Dia (€)"
-    ws0["B10"] = kpis["venda_dia"]
-    ws0["A11"] = "Valor Médio por Unidade (€)"
-    ws0["B11"] = kpis["valor_unidade"]
+    ws0.write("A1", "Resumo Geral")
+    linhas_resumo = [
+        ("Total Vendas (€)", kpis["total_vendas"]),
+        ("Quantidade Total", kpis["qtd"]),
+        ("Clientes Únicos", kpis["clientes"]),
+        ("Produtos Vendidos", kpis["produtos"]),
+        ("Transações", kpis["trans"]),
+        ("Ticket Médio Comercial (€)", kpis["ticket"]),
+        ("Ticket Médio Cliente (€)", kpis["ticket_cliente"]),
+        ("Venda Média por Dia (€)", kpis["venda_dia"]),
+        ("Valor Médio por Unidade (€)", kpis["valor_unidade"]),
+    ]
+    for row_num, linha in enumerate(linhas_resumo, 2):
+        ws0.write_row(row_num, 0, linha)
 
     # ====================== Folha Dados ======================
     ws_dados = criar_sheet(wb, "Dados", existing_names)
-    for col_num, col_name in enumerate(df.columns, 1):
-        ws_dados.cell(row=1, column=col_num, value=col_name)
-
-    for row_num, row in enumerate(df.itertuples(index=False), 2):
-        for col_num, value in enumerate(row, 1):
-            ws_dados.cell(row=row_num, column=col_num, value=value)
+    escrever_dados_streaming(ws_dados, df)
 
     # ====================== Folha Evolução Mensal ======================
+    # Cada folha de gráfico guarda os dados agregados e um gráfico nativo ligado a eles
     ws_hist = criar_sheet(wb, "Historico_Mensal", existing_names)
 
     mensal = df.groupby("AnoMes")["V Líquido"].sum().reset_index()
-    fig = px.line(mensal, x="AnoMes", y="V Líquido", markers=True)
-    fig.add_bar(x=mensal["AnoMes"], y=mensal["V Líquido"])
-    fig.update_layout(height=500)
-
-    add_plot_to_sheet("Historico_Mensal", fig)
+    escrever_dados_streaming(ws_hist, mensal)
+    adicionar_grafico(wb, ws_hist, mensal, "AnoMes", ["V Líquido"], tipo="column", combinar="line",
+                      titulo="Evolução Mensal de Vendas (€)", anchor="D2")
 
     # ====================== Folha Ranking Comerciais ======================
     ws_rank = criar_sheet(wb, "Ranking_Comerciais", existing_names)
 
-    rank = df.groupby("Comercial")["V Líquido"].sum().sort_values(ascending=False)
-    fig = px.bar(
-        x=rank.values, y=rank.index, orientation="h",
-        color=rank.values, color_continuous_scale="Blues"
-    )
-    fig.update_layout(height=500)
-
-    add_plot_to_sheet("Ranking_Comerciais", fig)
+    rank = df.groupby("Comercial")["V Líquido"].sum().sort_values(ascending=False).reset_index()
+    escrever_dados_streaming(ws_rank, rank)
+    adicionar_grafico(wb, ws_rank, rank, "Comercial", ["V Líquido"], tipo="bar",
+                      titulo="Ranking de Comerciais (€)", anchor="D2")
 
     # ====================== Folha Produtos ======================
     ws_prod = criar_sheet(wb, "Produtos", existing_names)
 
-    top_prod = df.groupby("Artigo")["V Líquido"].sum().nlargest(10)
-    fig = px.bar(
-        x=top_prod.values, y=top_prod.index, orientation="h",
-        color=top_prod.values, color_continuous_scale="Plasma"
-    )
-    fig.update_layout(height=500)
-
-    add_plot_to_sheet("Produtos", fig)
+    top_prod = df.groupby("Artigo")["V Líquido"].sum().nlargest(10).reset_index()
+    escrever_dados_streaming(ws_prod, top_prod)
+    adicionar_grafico(wb, ws_prod, top_prod, "Artigo", ["V Líquido"], tipo="bar",
+                      titulo="Top 10 Produtos (€)", anchor="D2")
 
     # ====================== Folha Clientes ======================
     ws_cli = criar_sheet(wb, "Clientes", existing_names)
 
-    top_cli = df.groupby("Nome")["V Líquido"].sum().nlargest(10)
-    fig = px.bar(
-        x=top_cli.values, y=top_cli.index, orientation="h",
-        color=top_cli.values, color_continuous_scale="Viridis"
-    )
-    fig.update_layout(height=500)
-
-    add_plot_to_sheet("Clientes", fig)
+    top_cli = df.groupby("Nome")["V Líquido"].sum().nlargest(10).reset_index()
+    escrever_dados_streaming(ws_cli, top_cli)
+    adicionar_grafico(wb, ws_cli, top_cli, "Nome", ["V Líquido"], tipo="bar",
+                      titulo="Top 10 Clientes (€)", anchor="D2")
 
     # ====================== Exportação ======================
-    buffer = io.BytesIO()
-    wb.save(buffer)
+    wb.close()
     buffer.seek(0)
 
     st.download_button(
@@ -649,54 +656,32 @@ def gerar_excel_completo(df: pd.DataFrame):
         st.warning("Sem dados para este mês.")
         return
 
-    wb = Workbook()
-    ws0 = wb.active
-    ws0.title = "Resumo"
-    existing_names = {ws0.title}
-
-    # ====================== Função interna para adicionar gráficos ======================
-    def add_plot_to_sheet(sheet_name, fig, anchor="H2"):
-        img_buffer = io.BytesIO()
-        fig.savefig(img_buffer, format="png", dpi=150, bbox_inches="tight")
-        img_buffer.seek(0)
-
-        ws = wb[sheet_name]
-        img = XLImage(img_buffer)
-        img.anchor = anchor
-        ws.add_image(img)
+    buffer = io.BytesIO()
+    wb = novo_workbook_streaming(buffer)
+    existing_names = set()
+    ws0 = criar_sheet(wb, "Resumo", existing_names)
 
     # ====================== Resumo ======================
-    ws0["A1"] = f"Resumo — {mes_sel}"
-    ws0["A3"] = "Total Vendas (€)"
-    ws0["B3"] = df_mes["V Líquido"].sum()
-    ws0["A4"] = "Quantidade Total"
-    ws0["B4"] = df_mes["Quantidade"].sum()
-    ws0["A5"] = "Clientes Únicos"
-    ws0["B5"] = df_mes["Nome"].nunique()
-    ws0["A6"] = "Produtos Vendidos"
-    ws0["B6"] = df_mes["Artigo"].nunique()
+    ws0.write("A1", f"Resumo — {mes_sel}")
+    ws0.write_row(2, 0, ("Total Vendas (€)", df_mes["V Líquido"].sum()))
+    ws0.write_row(3, 0, ("Quantidade Total", df_mes["Quantidade"].sum()))
+    ws0.write_row(4, 0, ("Clientes Únicos", df_mes["Nome"].nunique()))
+    ws0.write_row(5, 0, ("Produtos Vendidos", df_mes["Artigo"].nunique()))
 
     # ====================== Dados ======================
     ws_dados = criar_sheet(wb, "Dados", existing_names)
-    for col_num, col_name in enumerate(df_mes.columns, 1):
-        ws_dados.cell(row=1, column=col_num, value=col_name)
-
-    for row_num, row in enumerate(df_mes.itertuples(index=False), 2):
-        for col_num, value in enumerate(row, 1):
-            ws_dados.cell(row=row_num, column=col_num, value=value)
+    escrever_dados_streaming(ws_dados, df_mes)
 
     # ====================== Gráfico Mensal ======================
     ws_hist = criar_sheet(wb, "Historico", existing_names)
 
     diario = df_mes.groupby(df_mes["Data"].dt.strftime("%d"))["V Líquido"].sum().reset_index()
-    fig = px.line(diario, x="Data", y="V Líquido", markers=True)
-    fig.update_layout(height=500)
-
-    add_plot_to_sheet("Historico", fig)
+    escrever_dados_streaming(ws_hist, diario)
+    adicionar_grafico(wb, ws_hist, diario, "Data", ["V Líquido"], tipo="line",
+                      titulo=f"Vendas Diárias — {mes_sel} (€)", eixo_x="Dia", anchor="D2")
 
     # ====================== Exportação ======================
-    buffer = io.BytesIO()
-    wb.save(buffer)
+    wb.close()
     buffer.seek(0)
 
     st.download_button(
@@ -721,16 +706,11 @@ def tabelas_export_interface(df: pd.DataFrame, kpis: dict):
 def aba_comparacao_ano_ano(df: pd.DataFrame):
     st.header("📆 Comparação Ano-a-Ano")
 
-    tab1, tab2 = st.tabs([
-        "📆 Global",
-        "👥 Clientes"
-    ])
-
-    with tab1:
-        comparacao_ano_a_ano(df)
-
-    with tab2:
-        comparacao_ano_a_ano_clientes(df)
+    # secção aninhada: corre dentro do fragmento da secção principal
+    seccoes_lazy({
+        "📆 Global": lambda: comparacao_ano_a_ano(df),
+        "👥 Clientes": lambda: comparacao_ano_a_ano_clientes(df),
+    }, key="seccao_ano_ano", fragmento=False)
 # ====================== ABA PRINCIPAL — DASHBOARD COMPLETO ======================
 def aba_dashboard(df: pd.DataFrame):
     st.header("📊 Dashboard Geral")
@@ -740,8 +720,7 @@ def aba_dashboard(df: pd.DataFrame):
         return
 
     # ====================== KPIs ======================
-    kpis = calcular_kpis(df)
-    df_ticket_com = calcular_ticket_medio_por_comercial(df)
+    kpis, df_ticket_com = kpis_em_cache(df, versao_dados(df), filtros_dados(df))
 
     desenhar_kpis(kpis, df_ticket_com)
 
@@ -781,17 +760,11 @@ def main():
     # Aplicar filtros
     df_filt = aplicar_filtros(df)
 
-    # Tabs principais
-    tab_dashboard, tab_ano = st.tabs([
-        "📊 Dashboard Geral",
-        "📆 Comparação Ano-a-Ano"
-    ])
-
-    with tab_dashboard:
-        aba_dashboard(df_filt)
-
-    with tab_ano:
-        aba_comparacao_ano_ano(df_filt)
+    # Secções principais (só a secção visível é calculada)
+    seccoes_lazy({
+        "📊 Dashboard Geral": lambda: aba_dashboard(df_filt),
+        "📆 Comparação Ano-a-Ano": lambda: aba_comparacao_ano_ano(df_filt),
+    }, key="seccao_principal")
 
 
 # Execução
@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 
+from antiguidade import ESCALOES, fatia_escalao, resumo_escaloes
+from carteira import carteira_partilhada
+
 # CSS personalizado com gradientes e estilo moderno
 st.markdown("""
 <style>
@@ -219,25 +222,28 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# 📥 Load data
-url = "https://raw.githubusercontent.com/paulom40/PFonseca.py/main/VSilva.xlsx"
+# 📥 Load data: partição do comercial na carteira V0808 partilhada (já com Dias numérico)
+COMERCIAL = "Vânia Silva"
 try:
-    df = pd.read_excel(url)
+    df = carteira_partilhada().particao(COMERCIAL)
 except Exception as e:
     st.error(f"❌ Erro ao carregar o ficheiro: {e}")
     st.stop()
+if df.empty:
+    st.warning(f"⚠️ Sem documentos pendentes para {COMERCIAL} no V0808.")
+    st.stop()
 
-# 🧼 Clean data
-df['Dias'] = pd.to_numeric(df['Dias'], errors='coerce')
-df.dropna(subset=['Dias'], inplace=True)
-
-# 📅 Define ranges with colors
+# 📅 Define ranges with colors (limites em antiguidade.ESCALOES; a posição é o código do escalão)
+CORES_ESCALOES = [
+    ("🟦", "metric-card-blue"),
+    ("🟫", "metric-card"),
+    ("🟧", "metric-card-orange"),
+    ("🟨", "metric-card-orange"),
+    ("🟥", "metric-card-red")
+]
 ranges = [
-    (0, 15, "0 a 15 dias 🟦", "metric-card-blue"),
-    (16, 30, "16 a 30 dias 🟫", "metric-card"),
-    (31, 60, "31 a 60 dias 🟧", "metric-card-orange"),
-    (61, 90, "61 a 90 dias 🟨", "metric-card-orange"),
-    (91, 365, "91 a 365 dias 🟥", "metric-card-red")
+    (codigo, f"{rotulo} {emoji}", card_class)
+    for codigo, ((_, _, rotulo), (emoji, card_class)) in enumerate(zip(ESCALOES, CORES_ESCALOES))
 ]
 
 # 🎛️ Sidebar filters with modern design
@@ -258,8 +264,8 @@ with st.sidebar:
     
     selected_ranges = st.multiselect(
         "📅 Intervalos de Dias",
-        [r[2] for r in ranges],
-        default=[r[2] for r in ranges]
+        [r[1] for r in ranges],
+        default=[r[1] for r in ranges]
     )
     
     # Estatísticas rápidas na sidebar
@@ -274,6 +280,7 @@ with st.container():
     
     with col1:
         if st.button("🔄 Atualizar Dados", use_container_width=True):
+            carteira_partilhada.clear()
             st.rerun()
     
     with col2:
@@ -293,17 +300,15 @@ filtered_df = df[
 # 📋 Summary com cards coloridos - CORREÇÃO: Criar a lista summary_data primeiro
 st.subheader("📋 Resumo por Intervalos")
 
-# Criar lista de dados para o resumo
+# Criar lista de dados para o resumo (todos os escalões numa só passagem)
+resumo_escaloes_df = resumo_escaloes(filtered_df)
 summary_data = []
-for low, high, label, card_class in ranges:
+for codigo, label, card_class in ranges:
     if label in selected_ranges:
-        range_df = filtered_df[(filtered_df['Dias'] >= low) & (filtered_df['Dias'] <= high)]
-        count = len(range_df)
-        total_value = range_df['Valor Pendente'].sum() if 'Valor Pendente' in range_df.columns else 0
         summary_data.append({
             "Intervalo": label,
-            "Quantidade": count,
-            "Valor Pendente": total_value,
+            "Quantidade": int(resumo_escaloes_df.at[codigo, "Quantidade"]),
+            "Valor Pendente": resumo_escaloes_df.at[codigo, "Valor Pendente"],
             "card_class": card_class
         })
 
@@ -336,20 +341,21 @@ else:
 # 📂 Detalhes por intervalo com expansores
 st.subheader("📊 Detalhes por Intervalo")
 
-for low, high, label, card_class in ranges:
+for codigo, label, card_class in ranges:
     if label in selected_ranges:
         with st.expander(f"{label} - Ver Detalhes", expanded=False):
-            range_df = filtered_df[(filtered_df['Dias'] >= low) & (filtered_df['Dias'] <= high)]
+            # as partições da carteira vêm ordenadas por escalão: o detalhe é um slice
+            range_df = fatia_escalao(filtered_df, codigo)
             if not range_df.empty:
                 # Métricas do intervalo
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     st.metric("Total de Registros", len(range_df))
                 with col2:
-                    valor_total = range_df['Valor Pendente'].sum() if 'Valor Pendente' in range_df.columns else 0
+                    valor_total = resumo_escaloes_df.at[codigo, "Valor Pendente"]
                     st.metric("Valor Total", f"€{valor_total:,.2f}")
                 with col3:
-                    st.metric("Dias Médios", f"{range_df['Dias'].mean():.1f}")
+                    st.metric("Dias Médios", f"{resumo_escaloes_df.at[codigo, 'Dias Médios']:.1f}")
                 
                 # Tabela de dados
                 st.dataframe(range_df, use_container_width=True)
@@ -3,6 +3,11 @@ import requests
 from io import BytesIO
 import streamlit as st
 
+from dados_versao import chave_filtros, marcar_versao, versao_dados
+from exportacoes import botao_exportacao_formatos
+from hierarquia import indice_hierarquico
+from tabelas import tabela_paginada
+
 st.markdown("""
     <style>
     #MainMenu {visibility: hidden;}
@@ -19,7 +24,9 @@ st.set_page_config(layout="wide")
 # -------------------------------
 url = "https://github.com/paulom40/PFonseca.py/raw/main//VVencidos.xlsx"
 
-try:
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def carregar_vencidos(url: str) -> pd.DataFrame:
     response = requests.get(url)
     response.raise_for_status()
 
@@ -28,6 +35,23 @@ try:
     # ✅ Parse dates correctly (dd/mm/yyyy format)
     df["Data Venc."] = pd.to_datetime(df["Data Venc."], format="%d/%m/%Y", errors="coerce")
 
+    # 🧹 Clean and prepare data
+    df.columns = df.columns.str.strip()
+    df["Entidade"] = df["Entidade"].astype(str).str.strip()
+    df["Categoria"] = df["Categoria"].astype(str).str.strip()
+    df["Comercial"] = df["Comercial"].astype(str).str.strip()
+    df["Dias"] = pd.to_numeric(df["Dias"], errors="coerce")
+    df = df.dropna(subset=["Dias"])
+    df["Dias"] = df["Dias"].astype(int)
+    df["Valor Pendente"] = pd.to_numeric(df["Valor Pendente"], errors="coerce")
+
+    # 🆕 Add column: Dias até vencimento (optional)
+    df["Dias até Vencimento"] = (df["Data Venc."] - pd.Timestamp.today()).dt.days
+    return marcar_versao(df)
+
+
+try:
+    df = carregar_vencidos(url)
     st.success("📥 Dados carregados com sucesso!")
 
 except Exception as e:
@@ -36,20 +60,8 @@ except Exception as e:
 
 st.write("📅 Última atualização: 19/09/2025")
 
-# -------------------------------
-# 🧹 Clean and prepare data
-# -------------------------------
-df.columns = df.columns.str.strip()
-df["Entidade"] = df["Entidade"].astype(str).str.strip()
-df["Categoria"] = df["Categoria"].astype(str).str.strip()
-df["Comercial"] = df["Comercial"].astype(str).str.strip()
-df["Dias"] = pd.to_numeric(df["Dias"], errors="coerce")
-df = df.dropna(subset=["Dias"])
-df["Dias"] = df["Dias"].astype(int)
-df["Valor Pendente"] = pd.to_numeric(df["Valor Pendente"], errors="coerce")
-
-# 🆕 Add column: Dias até vencimento (optional)
-df["Dias até Vencimento"] = (df["Data Venc."] - pd.Timestamp.today()).dt.days
+# Comercial → Categoria → Entidade, ordenado por Dias: construído uma vez por versão dos dados
+indice = indice_hierarquico(df, versao_dados(df), ("Comercial", "Categoria", "Entidade"), "Dias")
 
 # -------------------------------
 # 🎛️ Sidebar: Hierarchical Filters
@@ -57,12 +69,11 @@ df["Dias até Vencimento"] = (df["Data Venc."] - pd.Timestamp.today()).dt.days
 st.sidebar.header("🔎 Filtros")
 
 # Step 1: Comercial
-comercial_unicos = sorted(df["Comercial"].dropna().unique())
+comercial_unicos = indice.opcoes()
 comercial_selecionado = st.sidebar.selectbox("Selecione o Comercial:", comercial_unicos)
-df_comercial = df[df["Comercial"] == comercial_selecionado]
 
 # Step 2: Categoria
-categorias_unicas = sorted(df_comercial["Categoria"].dropna().unique())
+categorias_unicas = indice.opcoes(comercial_selecionado)
 selecionar_todas_categorias = st.sidebar.checkbox("Selecionar todas as Categorias", value=True)
 
 if selecionar_todas_categorias:
@@ -70,10 +81,8 @@ if selecionar_todas_categorias:
 else:
     categorias_selecionadas = st.sidebar.multiselect("Selecione Categorias:", categorias_unicas)
 
-df_categoria = df_comercial[df_comercial["Categoria"].isin(categorias_selecionadas)]
-
 # Step 3: Entidade
-entidades_unicas = sorted(df_categoria["Entidade"].dropna().unique())
+entidades_unicas = indice.opcoes(comercial_selecionado, categorias_selecionadas)
 select_all_entidades = st.sidebar.checkbox("Selecionar todas as Entidades", value=True)
 
 if select_all_entidades:
@@ -81,12 +90,13 @@ if select_all_entidades:
 else:
     entidades_selecionadas = st.sidebar.multiselect("Selecione Entidades:", entidades_unicas)
 
-df_entidade = df_categoria[df_categoria["Entidade"].isin(entidades_selecionadas)]
+selecao = (comercial_selecionado, categorias_selecionadas, entidades_selecionadas)
 
 # Step 4: Dias slider
 st.sidebar.markdown("### ⏳ Filtro por Dias até Vencimento")
-dias_min_default = int(df_entidade["Dias"].min()) if not df_entidade.empty else 1
-dias_max_default = int(df_entidade["Dias"].max()) if not df_entidade.empty else 360
+dias_min_selecao, dias_max_selecao = indice.limites(*selecao)
+dias_min_default = int(dias_min_selecao) if dias_min_selecao is not None else 1
+dias_max_default = int(dias_max_selecao) if dias_max_selecao is not None else 360
 
 dias_min, dias_max = st.sidebar.slider(
     "Selecione o intervalo de Dias:",
@@ -97,10 +107,9 @@ dias_min, dias_max = st.sidebar.slider(
 )
 
 # Final filter
-df_filtrado = df_entidade[
-    (df_entidade["Dias"] >= dias_min) &
-    (df_entidade["Dias"] <= dias_max)
-]
+df_filtrado = indice.filtrar(*selecao, minimo=dias_min, maximo=dias_max)
+filtros_vencidos = chave_filtros(comercial=comercial_selecionado, categorias=categorias_selecionadas,
+                                 entidades=entidades_selecionadas, dias=(dias_min, dias_max))
 
 # -------------------------------
 # 📊 Display Results
@@ -114,7 +123,7 @@ Exibindo resultados para:
 - **Dias:** {dias_min}–{dias_max}
 """)
 
-st.dataframe(df_filtrado, use_container_width=True)
+tabela_paginada(df_filtrado, "vencidos_tabela", chave=(versao_dados(df), filtros_vencidos))
 
 # -------------------------------
 # 📈 Summary Metrics
@@ -156,11 +165,9 @@ resumo = {
     "Valor Pendente Total": f"€ {valor_total:,.2f}"
 }
 
-excel_data = to_excel(df_filtrado, resumo)
-
-st.download_button(
-    label="📥 Baixar Excel com Resumo",
-    data=excel_data,
-    file_name="vencimentos_comerciais.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# xlsx com a folha de resumo; CSV/Parquet/Arrow só com os vencimentos
+botao_exportacao_formatos(
+    "📥 Baixar Vencimentos", df_filtrado, "Vencidos.vencimentos", "vencimentos_comerciais",
+    gerar_xlsx=lambda: to_excel(df_filtrado, resumo).getvalue(),
+    filtros=filtros_vencidos,
 )
@@ -2,10 +2,19 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 import requests
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 import matplotlib.pyplot as plt
 import numpy as np
 
+from dados_versao import chave_filtros, marcar_versao, versao_dados
+from exportacoes import botao_exportacao_formatos
+from tabelas import tabela_paginada
+from graficos_excel import adicionar_grafico
+from motor_alertas import motor_alertas
+from rankings import rankings_em_cache
+from regras_alerta import classificar
+
 # Custom CSS with advanced theming
 custom_css = """
 <style>
@@ -290,7 +299,7 @@ def load_data():
 
         df = df.dropna(subset=['Código', 'Cliente', 'Qtd.', 'Artigo', 'Mês', 'Ano'])
 
-        return df, df_raw, colunas_detectadas, faltando
+        return marcar_versao(df), df_raw, colunas_detectadas, faltando
     except Exception as e:
         return None, None, {}, [f"Erro ao carregar dados: {str(e)}"]
 
@@ -341,36 +350,46 @@ with st.expander("📋 Ver valores únicos por coluna"):
                 st.warning(f"⚠️ Não foi possível exibir valores únicos para '{col}': {str(e)}")
 
 # Função para calcular alertas
-def calcular_alertas(df, mes_num, ano, threshold_aumento=50, threshold_reducao=-50):
+def _avaliar_variacao(coluna):
+    """Regra de variação mensal da quantidade por `coluna` (Cliente ou Artigo)."""
+    def avaliar(linhas, contexto):
+        mes_num, ano, mes_anterior, ano_anterior, regras = contexto
+        atual = linhas[(linhas['Mês'] == mes_num) & (linhas['Ano'] == ano)].groupby(coluna)['Qtd.'].sum().reset_index()
+        anterior = linhas[(linhas['Mês'] == mes_anterior) & (linhas['Ano'] == ano_anterior)].groupby(coluna)['Qtd.'].sum().reset_index()
+        merged = atual.merge(anterior, on=coluna, how='outer', suffixes=('_Atual', '_Anterior'))
+        merged.fillna({'Qtd._Atual': 0, 'Qtd._Anterior': 0}, inplace=True)
+        merged['Variação (%)'] = ((merged['Qtd._Atual'] - merged['Qtd._Anterior']) / merged['Qtd._Anterior'].replace(0, np.nan) * 100).round(2)
+        merged['Tipo'] = classificar(merged, regras, {"variacao": "Variação (%)"})
+        return merged
+    return avaliar
+
+
+def calcular_alertas(df, mes_num, ano, regras="variacao_significativa"):
+    """Alertas ativos por Cliente e por Artigo; só as entidades com linhas alteradas são reavaliadas.
+
+    Devolve (alertas_clientes, alertas_artigos, mudancas) com mudancas = {"novos": n, "resolvidos": n}.
+    """
     mes_anterior = mes_num - 1 if mes_num > 1 else 12
     ano_anterior = ano if mes_num > 1 else ano - 1
 
-    df_atual = df[(df['Mês'] == mes_num) & (df['Ano'] == ano)]
-    df_anterior = df[(df['Mês'] == mes_anterior) & (df['Ano'] == ano_anterior)]
-
-    # Alertas para Cliente
-    totais_cliente_atual = df_atual.groupby('Cliente')['Qtd.'].sum().reset_index()
-    totais_cliente_anterior = df_anterior.groupby('Cliente')['Qtd.'].sum().reset_index()
-    merged_clientes = totais_cliente_atual.merge(totais_cliente_anterior, on='Cliente', how='outer', suffixes=('_Atual', '_Anterior'))
-    merged_clientes.fillna({'Qtd._Atual': 0, 'Qtd._Anterior': 0}, inplace=True)
-    merged_clientes['Variação (%)'] = ((merged_clientes['Qtd._Atual'] - merged_clientes['Qtd._Anterior']) / merged_clientes['Qtd._Anterior'].replace(0, np.nan) * 100).round(2)
-    alertas_clientes = merged_clientes[
-        (merged_clientes['Variação (%)'].notna()) & 
-        ((merged_clientes['Variação (%)'] > threshold_aumento) | (merged_clientes['Variação (%)'] < threshold_reducao))
-    ][['Cliente', 'Qtd._Atual', 'Qtd._Anterior', 'Variação (%)']]
-
-    # Alertas para Artigo
-    totais_artigo_atual = df_atual.groupby('Artigo')['Qtd.'].sum().reset_index()
-    totais_artigo_anterior = df_anterior.groupby('Artigo')['Qtd.'].sum().reset_index()
-    merged_artigos = totais_artigo_atual.merge(totais_artigo_anterior, on='Artigo', how='outer', suffixes=('_Atual', '_Anterior'))
-    merged_artigos.fillna({'Qtd._Atual': 0, 'Qtd._Anterior': 0}, inplace=True)
-    merged_artigos['Variação (%)'] = ((merged_artigos['Qtd._Atual'] - merged_artigos['Qtd._Anterior']) / merged_artigos['Qtd._Anterior'].replace(0, np.nan) * 100).round(2)
-    alertas_artigos = merged_artigos[
-        (merged_artigos['Variação (%)'].notna()) & 
-        ((merged_artigos['Variação (%)'] > threshold_aumento) | (merged_artigos['Variação (%)'] < threshold_reducao))
-    ][['Artigo', 'Qtd._Atual', 'Qtd._Anterior', 'Variação (%)']]
-
-    return alertas_clientes, alertas_artigos
+    periodo = df[
+        ((df['Mês'] == mes_num) & (df['Ano'] == ano)) |
+        ((df['Mês'] == mes_anterior) & (df['Ano'] == ano_anterior))
+    ]
+    contexto = (mes_num, ano, mes_anterior, ano_anterior, regras)
+
+    alertas, mudancas = [], {"novos": 0, "resolvidos": 0}
+    for coluna in ('Cliente', 'Artigo'):
+        motor = motor_alertas(f"VendasGlobais.{coluna}.{ano}-{mes_num}", (coluna,), _avaliar_variacao(coluna),
+                              colunas=(coluna, 'Mês', 'Ano', 'Qtd.'))
+        resultado = motor.atualizar(periodo, contexto, versao_dados(df))
+        for tipo in mudancas:
+            mudancas[tipo] += len(resultado[tipo])
+        ativos = resultado["ativos"]
+        colunas = [coluna, 'Qtd._Atual', 'Qtd._Anterior', 'Variação (%)']
+        alertas.append(ativos.sort_values(coluna)[colunas] if len(ativos) else pd.DataFrame(columns=colunas))
+
+    return alertas[0], alertas[1], mudancas
 
 # Configurar estilo dos gráficos
 plt.style.use('seaborn-v0_8-whitegrid')
@@ -435,6 +454,9 @@ if compare_years:
         df_2024 = df_2024[df_2024['Comercial'].isin(comerciais)]
         df_2025 = df_2025[df_2025['Comercial'].isin(comerciais)]
 
+    filtros_comparacao = chave_filtros(mes=mes_num, clientes=clientes, artigos=artigos,
+                                       categorias=categorias, comerciais=comerciais)
+
     # KPIs para Clientes
     totais_cliente_2024 = df_2024.groupby('Cliente').agg({'Qtd.': 'sum', 'V. Líquido': 'sum'}).reset_index().sort_values('Qtd.', ascending=False)
     totais_cliente_2025 = df_2025.groupby('Cliente').agg({'Qtd.': 'sum', 'V. Líquido': 'sum'}).reset_index().sort_values('Qtd.', ascending=False)
@@ -462,13 +484,15 @@ if compare_years:
     kpi_df = merged_clientes[['Cliente', 'Qtd._2024', 'Qtd._2025', 'Crescimento Qtd. (%)']].fillna({'Qtd._2024': 0, 'Qtd._2025': 0})
 
     # Calcular alertas para 2025
-    alertas_clientes, alertas_artigos = calcular_alertas(df, mes_num, 2025)
+    alertas_clientes, alertas_artigos, mudancas_alertas = calcular_alertas(df, mes_num, 2025)
 
     st.subheader(f"🚨 Alertas de Quantidade: {mes_label} 2025 vs Mês Anterior")
+    if mudancas_alertas["novos"] or mudancas_alertas["resolvidos"]:
+        st.caption(f"🆕 {mudancas_alertas['novos']} novos · ✅ {mudancas_alertas['resolvidos']} resolvidos desde a última atualização")
     if not alertas_clientes.empty:
         st.markdown("**Clientes com variações significativas**")
         for _, row in alertas_clientes.iterrows():
-            if row['Variação (%)'] > 50:
+            if row['Variação (%)'] > 0:
                 st.markdown(f"<div class='alert-success'>✔ {row['Cliente']}: Aumento de {row['Variação (%)']:.1f}% (Atual: {row['Qtd._Atual']:.0f}, Anterior: {row['Qtd._Anterior']:.0f})</div>", unsafe_allow_html=True)
             else:
                 st.markdown(f"<div class='alert-error'>❌ {row['Cliente']}: Redução de {row['Variação (%)']:.1f}% (Atual: {row['Qtd._Atual']:.0f}, Anterior: {row['Qtd._Anterior']:.0f})</div>", unsafe_allow_html=True)
@@ -477,7 +501,7 @@ if compare_years:
     if not alertas_artigos.empty:
         st.markdown("**Artigos com variações significativas**")
         for _, row in alertas_artigos.iterrows():
-            if row['Variação (%)'] > 50:
+            if row['Variação (%)'] > 0:
                 st.markdown(f"<div class='alert-success'>✔ {row['Artigo']}: Aumento de {row['Variação (%)']:.1f}% (Atual: {row['Qtd._Atual']:.0f}, Anterior: {row['Qtd._Anterior']:.0f})</div>", unsafe_allow_html=True)
             else:
                 st.markdown(f"<div class='alert-error'>❌ {row['Artigo']}: Redução de {row['Variação (%)']:.1f}% (Atual: {row['Qtd._Atual']:.0f}, Anterior: {row['Qtd._Anterior']:.0f})</div>", unsafe_allow_html=True)
@@ -507,9 +531,11 @@ if compare_years:
 
     # Exibir dados filtrados
     st.subheader(f"📋 Dados Filtrados: {mes_label} 2024")
-    st.dataframe(df_2024[['Código', 'Cliente', 'Artigo', 'Qtd.', 'V. Líquido', 'PM', 'UN', 'Categoria', 'Comercial', 'Mês', 'Ano']], use_container_width=True)
+    tabela_paginada(df_2024[['Código', 'Cliente', 'Artigo', 'Qtd.', 'V. Líquido', 'PM', 'UN', 'Categoria', 'Comercial', 'Mês', 'Ano']], "dados_2024",
+                    chave=(versao_dados(df), 2024, filtros_comparacao))
     st.subheader(f"📋 Dados Filtrados: {mes_label} 2025")
-    st.dataframe(df_2025[['Código', 'Cliente', 'Artigo', 'Qtd.', 'V. Líquido', 'PM', 'UN', 'Categoria', 'Comercial', 'Mês', 'Ano']], use_container_width=True)
+    tabela_paginada(df_2025[['Código', 'Cliente', 'Artigo', 'Qtd.', 'V. Líquido', 'PM', 'UN', 'Categoria', 'Comercial', 'Mês', 'Ano']], "dados_2025",
+                    chave=(versao_dados(df), 2025, filtros_comparacao))
 
     # Visualizações comparativas
     st.subheader("📈 Comparação 2024 vs 2025")
@@ -597,13 +623,15 @@ else:
         df_filtrado = df_filtrado[df_filtrado['Comercial'].isin(comerciais)]
 
     # Calcular alertas
-    alertas_clientes, alertas_artigos = calcular_alertas(df, mes_num, ano_selecionado)
+    alertas_clientes, alertas_artigos, mudancas_alertas = calcular_alertas(df, mes_num, ano_selecionado)
 
     st.subheader(f"🚨 Alertas de Quantidade: {mes_label} {ano_selecionado} vs Mês Anterior")
+    if mudancas_alertas["novos"] or mudancas_alertas["resolvidos"]:
+        st.caption(f"🆕 {mudancas_alertas['novos']} novos · ✅ {mudancas_alertas['resolvidos']} resolvidos desde a última atualização")
     if not alertas_clientes.empty:
         st.markdown("**Clientes com variações significativas**")
         for _, row in alertas_clientes.iterrows():
-            if row['Variação (%)'] > 50:
+            if row['Variação (%)'] > 0:
                 st.markdown(f"<div class='alert-success'>✔ {row['Cliente']}: Aumento de {row['Variação (%)']:.1f}% (Atual: {row['Qtd._Atual']:.0f}, Anterior: {row['Qtd._Anterior']:.0f})</div>", unsafe_allow_html=True)
             else:
                 st.markdown(f"<div class='alert-error'>❌ {row['Cliente']}: Redução de {row['Variação (%)']:.1f}% (Atual: {row['Qtd._Atual']:.0f}, Anterior: {row['Qtd._Anterior']:.0f})</div>", unsafe_allow_html=True)
@@ -612,7 +640,7 @@ else:
     if not alertas_artigos.empty:
         st.markdown("**Artigos com variações significativas**")
         for _, row in alertas_artigos.iterrows():
-            if row['Variação (%)'] > 50:
+            if row['Variação (%)'] > 0:
                 st.markdown(f"<div class='alert-success'>✔ {row['Artigo']}: Aumento de {row['Variação (%)']:.1f}% (Atual: {row['Qtd._Atual']:.0f}, Anterior: {row['Qtd._Anterior']:.0f})</div>", unsafe_allow_html=True)
             else:
                 st.markdown(f"<div class='alert-error'>❌ {row['Artigo']}: Redução de {row['Variação (%)']:.1f}% (Atual: {row['Qtd._Atual']:.0f}, Anterior: {row['Qtd._Anterior']:.0f})</div>", unsafe_allow_html=True)
@@ -650,7 +678,10 @@ else:
         st.dataframe(kpi_df, use_container_width=True)
 
     st.subheader("📋 Dados Filtrados")
-    st.dataframe(df_filtrado[['Código', 'Cliente', 'Artigo', 'Qtd.', 'V. Líquido', 'PM', 'UN', 'Categoria', 'Comercial', 'Mês', 'Ano']], use_container_width=True)
+    tabela_paginada(df_filtrado[['Código', 'Cliente', 'Artigo', 'Qtd.', 'V. Líquido', 'PM', 'UN', 'Categoria', 'Comercial', 'Mês', 'Ano']], "dados_filtrados", chave=(versao_dados(df), chave_filtros(
+        ano=ano_selecionado, mes=mes_num, clientes=clientes, artigos=artigos,
+        categorias=categorias, comerciais=comerciais,
+    )))
 
     # Totais
     totais_artigo = df_filtrado.groupby('Artigo').agg({'Qtd.': 'sum', 'V. Líquido': 'sum'}).reset_index().sort_values('Qtd.', ascending=False)
@@ -819,7 +850,11 @@ if st.button("🔄 Gerar Relatório Cliente/Artigo", key="generate_report"):
                 # Sort by total quantity
                 pivot_data = pivot_data.sort_values('Total' if 'Total' in pivot_data.columns else month_cols[-1] if month_cols else 'Cliente', ascending=False)
                 
-                st.dataframe(pivot_data, use_container_width=True)
+                # matriz paginada num fragmento: navegar não apaga o relatório gerado pelo botão
+                tabela_paginada(pivot_data, "matriz_cliente_artigo", chave=(versao_dados(df), chave_filtros(
+                    ano=report_ano, meses=report_meses, clientes=report_clientes,
+                    artigos=report_artigos, categorias=report_categorias,
+                )))
                 
                 # 4. Top Performers Analysis
                 st.markdown("### 🏆 Análise de Top Performers")
@@ -962,6 +997,15 @@ if st.button("🔄 Gerar Relatório Cliente/Artigo", key="generate_report"):
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
 
+                # Dados completos também em CSV por blocos / Parquet / Arrow (mais leves que o xlsx)
+                botao_exportacao_formatos(
+                    "📥 Dados Completos", df_report, "VendasGlobais.dados_completos",
+                    f"Dados_Completos_{report_ano}_{'_'.join(report_meses)}",
+                    formatos=("csv", "parquet", "arrow"), seletor=False, on_click="ignore",
+                    filtros=chave_filtros(ano=report_ano, meses=report_meses, clientes=report_clientes,
+                                          artigos=report_artigos, categorias=report_categorias)
+                )
+
 # Quick access to common reports
 st.markdown("### ⚡ Relatórios Rápidos")
 col_quick1, col_quick2, col_quick3 = st.columns(3)
@@ -989,7 +1033,7 @@ with col_quick2:
 with col_quick3:
     if st.button("🔍 Top 20 Clientes", key="quick_top20"):
         # This would pre-filter for top 20 clients
-        top_20_clients = df.groupby('Cliente')['Qtd.'].sum().nlargest(20).index.tolist()
+        top_20_clients = rankings_em_cache(df, versao_dados(df), (), 'Cliente', ('Qtd.',), k=20)["top"]['Qtd.']['Cliente'].tolist()
         st.session_state.report_clientes = top_20_clients
         st.rerun()
 
@@ -997,31 +1041,97 @@ with col_quick3:
 # EXPORTAÇÃO COMPLETA (Existing export function)
 # =============================================
 
-def exportar_excel_completo(dados_df, cliente_df, artigo_df, categoria_df, comercial_df, kpi_df, alertas_clientes, alertas_artigos, nome_mes, mes_num, ano, compare_years=False, df_2024=None, df_2025=None, totais_cliente_2024=None, totais_cliente_2025=None, totais_categoria_2024=None, totais_categoria_2025=None):
-    output = BytesIO()
+LOGO_URL = "https://github.com/paulom40/PFonseca.py/raw/main/Bracar.png"
+
+# As folhas são preparadas (groupbys, pivots, títulos) numa pool de threads e
+# descritas por um dict; o workbook é montado no fim, numa só thread, porque o
+# xlsxwriter não é thread-safe. O logotipo fica em cache com timeout.
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def carregar_logo():
     try:
-        logo_url = "https://github.com/paulom40/PFonseca.py/raw/main/Bracar.png"
-        logo_data = requests.get(logo_url).content
-    except:
-        logo_data = None
-        st.warning("⚠️ Não foi possível carregar o logotipo para o relatório.")
+        resposta = requests.get(LOGO_URL, timeout=10)
+        resposta.raise_for_status()
+        return resposta.content
+    except requests.RequestException:
+        return None
 
-    # Variações por Cliente e Artigo
-    variacoes = dados_df.groupby(['Cliente', 'Artigo', 'Mês'])['Qtd.'].sum().reset_index()
-    variacoes_pivot = variacoes.pivot_table(index=['Cliente', 'Artigo'], columns='Mês', values='Qtd.', fill_value=0).reset_index()
+def totais_por(dados, coluna):
+    if coluna not in dados.columns:
+        return pd.DataFrame()
+    return dados.groupby(coluna).agg({'Qtd.': 'sum', 'V. Líquido': 'sum'}).reset_index().sort_values('Qtd.', ascending=False)
 
-    # Variações por Comercial
-    variacoes_comercial = dados_df.groupby(['Comercial', 'Cliente', 'Mês'])['Qtd.'].sum().reset_index() if 'Comercial' in dados_df.columns else pd.DataFrame()
-    variacoes_comercial_pivot = variacoes_comercial.pivot_table(index=['Comercial', 'Cliente'], columns='Mês', values='Qtd.', fill_value=0).reset_index() if not variacoes_comercial.empty else pd.DataFrame({'Aviso': ['Coluna "Comercial" não encontrada.']})
+def variacoes_cliente_artigo(dados):
+    variacoes = dados.groupby(['Cliente', 'Artigo', 'Mês'])['Qtd.'].sum().reset_index()
+    return variacoes.pivot_table(index=['Cliente', 'Artigo'], columns='Mês', values='Qtd.', fill_value=0).reset_index()
 
-    # Alertas de clientes inativos
+def variacoes_por_comercial(dados):
+    if 'Comercial' not in dados.columns:
+        return pd.DataFrame({'Aviso': ['Coluna "Comercial" não encontrada.']})
+    variacoes = dados.groupby(['Comercial', 'Cliente', 'Mês'])['Qtd.'].sum().reset_index()
+    if variacoes.empty:
+        return pd.DataFrame({'Aviso': ['Coluna "Comercial" não encontrada.']})
+    return variacoes.pivot_table(index=['Comercial', 'Cliente'], columns='Mês', values='Qtd.', fill_value=0).reset_index()
+
+def clientes_inativos(base, mes_num, ano):
     mes_anterior = mes_num - 1 if mes_num > 1 else 12
     ano_anterior = ano if mes_num > 1 else ano - 1
-    todos_clientes = sorted(df['Cliente'].unique())
-    clientes_ativos = sorted(df[(df['Mês'] == mes_anterior) & (df['Ano'] == ano_anterior)]['Cliente'].unique())
-    clientes_inativos = [c for c in todos_clientes if c not in clientes_ativos]
-    alertas_inativos_df = pd.DataFrame({'Cliente sem compras': clientes_inativos}) if clientes_inativos else pd.DataFrame({'Todos os clientes compraram': ['✔']})
+    ativos = base.loc[(base['Mês'] == mes_anterior) & (base['Ano'] == ano_anterior), 'Cliente'].unique()
+    inativos = np.setdiff1d(base['Cliente'].unique(), ativos)  # ordenado
+    return pd.DataFrame({'Cliente sem compras': inativos}) if len(inativos) else pd.DataFrame({'Todos os clientes compraram': ['✔']})
+
+def folha(nome, dados, titulo, subtitulo=False, grafico=None, obrigatoria=True):
+    """Descrição de uma folha; `grafico` é a coluna de categorias do top 15 (tabela a partir da linha 4)."""
+    return {'nome': nome, 'dados': dados, 'titulo': titulo, 'subtitulo': subtitulo,
+            'grafico': grafico, 'obrigatoria': obrigatoria}
+
+def exportar_excel_completo(dados_df, cliente_df, artigo_df, categoria_df, comercial_df, kpi_df, alertas_clientes, alertas_artigos, nome_mes, mes_num, ano, compare_years=False, df_2024=None, df_2025=None, totais_cliente_2024=None, totais_cliente_2025=None, totais_categoria_2024=None, totais_categoria_2025=None):
+    """Relatório completo. Totais passados como None são calculados na pool a partir de `dados_df`."""
+    output = BytesIO()
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        logo = pool.submit(carregar_logo)
+
+        def preparar(tabela, coluna):
+            return pool.submit(totais_por, dados_df, coluna) if tabela is None else tabela
+
+        totais = {
+            'Cliente': preparar(cliente_df, 'Cliente'),
+            'Artigo': preparar(artigo_df, 'Artigo'),
+            'Categoria': preparar(categoria_df, 'Categoria'),
+            'Comercial': preparar(comercial_df, 'Comercial'),
+        }
+        variacoes_pivot = pool.submit(variacoes_cliente_artigo, dados_df)
+        variacoes_comercial_pivot = pool.submit(variacoes_por_comercial, dados_df)
+        alertas_inativos_df = pool.submit(clientes_inativos, df, mes_num, ano)
+
+        totais = {coluna: t.result() if isinstance(t, Future) else t for coluna, t in totais.items()}
+        folhas = [
+            folha('Totais_Cliente', totais['Cliente'], f'Totais por Cliente – {nome_mes} {ano}', True, 'Cliente'),
+            folha('Totais_Artigo', totais['Artigo'], f'Totais por Artigo – {nome_mes} {ano}', True, 'Artigo'),
+            folha('Totais_Categoria', totais['Categoria'], f'Totais por Categoria – {nome_mes} {ano}', True, 'Categoria', obrigatoria=False),
+            folha('Totais_Comercial', totais['Comercial'], f'Totais por Comercial – {nome_mes} {ano}', True, 'Comercial', obrigatoria=False),
+            folha('KPIs_Cliente', kpi_df, f'KPIs por Cliente – {nome_mes} {ano}', True),
+            folha('Alertas_Qtd_Cliente', alertas_clientes, f'Alertas de Quantidade por Cliente – {nome_mes} {ano}', obrigatoria=False),
+            folha('Alertas_Qtd_Artigo', alertas_artigos, f'Alertas de Quantidade por Artigo – {nome_mes} {ano}', obrigatoria=False),
+            folha('Variacoes_Cliente_Artigo', variacoes_pivot.result(), 'Variações por Cliente e Artigo'),
+            folha('Variacoes_Comercial', variacoes_comercial_pivot.result(), 'Variações por Comercial'),
+            folha('Alertas_Clientes_Inativos', alertas_inativos_df.result(), 'Alertas de Clientes Inativos no Mês Anterior'),
+        ]
+        if compare_years:
+            folhas += [
+                folha('Comparacao_Cliente_2024', totais_cliente_2024, f'Comparação Clientes – {nome_mes} 2024', obrigatoria=False),
+                folha('Comparacao_Cliente_2025', totais_cliente_2025, f'Comparação Clientes – {nome_mes} 2025', obrigatoria=False),
+                folha('Comparacao_Categoria_2024', totais_categoria_2024, f'Comparação Categorias – {nome_mes} 2024', obrigatoria=False),
+                folha('Comparacao_Categoria_2025', totais_categoria_2025, f'Comparação Categorias – {nome_mes} 2025', obrigatoria=False),
+            ]
+        logo_data = logo.result()
+
+    if logo_data is None:
+        st.warning("⚠️ Não foi possível carregar o logotipo para o relatório.")
 
+    # Montagem: só escrita, pela ordem das folhas
+    gerado_em = f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}'
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         workbook = writer.book
         bold = workbook.add_format({'bold': True})
@@ -1034,97 +1144,26 @@ def exportar_excel_completo(dados_df, cliente_df, artigo_df, categoria_df, comer
         if logo_data:
             ws1.insert_image('A1', '', {'image_data': BytesIO(logo_data), 'x_scale': 0.5, 'y_scale': 0.5})
         ws1.write('C1', f'Relatório Comercial – {nome_mes} {ano}', bold)
-        ws1.write('C2', f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}', italic)
-
-        # Totais Cliente
-        cliente_df.to_excel(writer, index=False, sheet_name='Totais_Cliente')
-        ws2 = writer.sheets['Totais_Cliente']
-        ws2.set_column('A:Z', 20)
-        ws2.write('A1', f'Totais por Cliente – {nome_mes} {ano}', bold)
-        ws2.write('A2', f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}', italic)
-
-        # Totais Artigo
-        artigo_df.to_excel(writer, index=False, sheet_name='Totais_Artigo')
-        ws3 = writer.sheets['Totais_Artigo']
-        ws3.set_column('A:Z', 20)
-        ws3.write('A1', f'Totais por Artigo – {nome_mes} {ano}', bold)
-        ws3.write('A2', f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}', italic)
-
-        # Totais Categoria
-        if not categoria_df.empty:
-            categoria_df.to_excel(writer, index=False, sheet_name='Totais_Categoria')
-            ws4 = writer.sheets['Totais_Categoria']
-            ws4.set_column('A:Z', 20)
-            ws4.write('A1', f'Totais por Categoria – {nome_mes} {ano}', bold)
-            ws4.write('A2', f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}', italic)
-
-        # Totais Comercial
-        if not comercial_df.empty:
-            comercial_df.to_excel(writer, index=False, sheet_name='Totais_Comercial')
-            ws5 = writer.sheets['Totais_Comercial']
-            ws5.set_column('A:Z', 20)
-            ws5.write('A1', f'Totais por Comercial – {nome_mes} {ano}', bold)
-            ws5.write('A2', f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}', italic)
-
-        # KPIs Cliente
-        kpi_df.to_excel(writer, index=False, sheet_name='KPIs_Cliente')
-        ws6 = writer.sheets['KPIs_Cliente']
-        ws6.set_column('A:Z', 20)
-        ws6.write('A1', f'KPIs por Cliente – {nome_mes} {ano}', bold)
-        ws6.write('A2', f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}', italic)
-
-        # Alertas Qtd.
-        if not alertas_clientes.empty:
-            alertas_clientes.to_excel(writer, index=False, sheet_name='Alertas_Qtd_Cliente')
-            ws7 = writer.sheets['Alertas_Qtd_Cliente']
-            ws7.set_column('A:Z', 20)
-            ws7.write('A1', f'Alertas de Quantidade por Cliente – {nome_mes} {ano}', bold)
-        if not alertas_artigos.empty:
-            alertas_artigos.to_excel(writer, index=False, sheet_name='Alertas_Qtd_Artigo')
-            ws8 = writer.sheets['Alertas_Qtd_Artigo']
-            ws8.set_column('A:Z', 20)
-            ws8.write('A1', f'Alertas de Quantidade por Artigo – {nome_mes} {ano}', bold)
-
-        # Variações Cliente e Artigo
-        variacoes_pivot.to_excel(writer, index=False, sheet_name='Variacoes_Cliente_Artigo')
-        ws9 = writer.sheets['Variacoes_Cliente_Artigo']
-        ws9.set_column('A:Z', 20)
-        ws9.write('A1', f'Variações por Cliente e Artigo', bold)
-
-        # Variações Comercial
-        variacoes_comercial_pivot.to_excel(writer, index=False, sheet_name='Variacoes_Comercial')
-        ws10 = writer.sheets['Variacoes_Comercial']
-        ws10.set_column('A:Z', 20)
-        ws10.write('A1', f'Variações por Comercial', bold)
-
-        # Alertas de Clientes Inativos
-        alertas_inativos_df.to_excel(writer, index=False, sheet_name='Alertas_Clientes_Inativos')
-        ws11 = writer.sheets['Alertas_Clientes_Inativos']
-        ws11.set_column('A:Z', 20)
-        ws11.write('A1', f'Alertas de Clientes Inativos no Mês Anterior', bold)
-
-        # Comparação 2024 vs 2025
-        if compare_years:
-            if not totais_cliente_2024.empty:
-                totais_cliente_2024.to_excel(writer, index=False, sheet_name='Comparacao_Cliente_2024')
-                ws12 = writer.sheets['Comparacao_Cliente_2024']
-                ws12.set_column('A:Z', 20)
-                ws12.write('A1', f'Comparação Clientes – {nome_mes} 2024', bold)
-            if not totais_cliente_2025.empty:
-                totais_cliente_2025.to_excel(writer, index=False, sheet_name='Comparacao_Cliente_2025')
-                ws13 = writer.sheets['Comparacao_Cliente_2025']
-                ws13.set_column('A:Z', 20)
-                ws13.write('A1', f'Comparação Clientes – {nome_mes} 2025', bold)
-            if not totais_categoria_2024.empty:
-                totais_categoria_2024.to_excel(writer, index=False, sheet_name='Comparacao_Categoria_2024')
-                ws14 = writer.sheets['Comparacao_Categoria_2024']
-                ws14.set_column('A:Z', 20)
-                ws14.write('A1', f'Comparação Categorias – {nome_mes} 2024', bold)
-            if not totais_categoria_2025.empty:
-                totais_categoria_2025.to_excel(writer, index=False, sheet_name='Comparacao_Categoria_2025')
-                ws15 = writer.sheets['Comparacao_Categoria_2025']
-                ws15.set_column('A:Z', 20)
-                ws15.write('A1', f'Comparação Categorias – {nome_mes} 2025', bold)
+        ws1.write('C2', gerado_em, italic)
+
+        for f in folhas:
+            tabela = f['dados']
+            if tabela is None or (tabela.empty and not f['obrigatoria']):
+                continue
+            # com gráfico, a tabela começa na linha 4 para o título não sobrepor o cabeçalho
+            linha = 3 if f['grafico'] else 0
+            tabela.to_excel(writer, index=False, sheet_name=f['nome'], startrow=linha)
+            ws = writer.sheets[f['nome']]
+            ws.set_column('A:Z', 20)
+            ws.write('A1', f['titulo'], bold)
+            if f['subtitulo']:
+                ws.write('A2', gerado_em, italic)
+            # gráfico nativo (top 15 por quantidade) ligado às linhas da tabela
+            if f['grafico'] in tabela.columns and 'Qtd.' in tabela.columns:
+                adicionar_grafico(
+                    workbook, ws, tabela.head(15), f['grafico'], ['Qtd.'], tipo='bar',
+                    titulo=f"Top 15 {f['grafico']} por Qtd.", anchor='E4', linha_cabecalho=linha
+                )
 
     output.seek(0)
     return output
@@ -1136,14 +1175,9 @@ st.subheader("📥 Exportação de Relatórios")
 if st.button("📊 Exportar Relatório Principal para Excel"):
     try:
         if compare_years:
-            # Preparar dados para exportação no modo de comparação
-            totais_artigo_2024 = df_2024.groupby('Artigo').agg({'Qtd.': 'sum', 'V. Líquido': 'sum'}).reset_index().sort_values('Qtd.', ascending=False)
-            totais_artigo_2025 = df_2025.groupby('Artigo').agg({'Qtd.': 'sum', 'V. Líquido': 'sum'}).reset_index().sort_values('Qtd.', ascending=False)
-            totais_comercial_2024 = df_2024.groupby('Comercial').agg({'Qtd.': 'sum', 'V. Líquido': 'sum'}).reset_index().sort_values('Qtd.', ascending=False) if 'Comercial' in df_2024.columns else pd.DataFrame()
-            totais_comercial_2025 = df_2025.groupby('Comercial').agg({'Qtd.': 'sum', 'V. Líquido': 'sum'}).reset_index().sort_values('Qtd.', ascending=False) if 'Comercial' in df_2025.columns else pd.DataFrame()
-            
+            # Reutiliza os totais do dashboard; artigo/comercial de 2025 são calculados na pool
             excel_data = exportar_excel_completo(
-                df_2025, totais_cliente_2025, totais_artigo_2025, totais_categoria_2025, totais_comercial_2025,
+                df_2025, totais_cliente_2025, None, totais_categoria_2025, None,
                 kpi_df, alertas_clientes, alertas_artigos, mes_label, mes_num, 2025, compare_years=True,
                 df_2024=df_2024, df_2025=df_2025,
                 totais_cliente_2024=totais_cliente_2024, totais_cliente_2025=totais_cliente_2025,
@@ -1151,11 +1185,7 @@ if st.button("📊 Exportar Relatório Principal para Excel"):
             )
             file_name = f"Relatorio_Comercial_{mes_label}_2024_2025.xlsx"
         else:
-            # Preparar dados para exportação no modo normal
-            totais_artigo = df_filtrado.groupby('Artigo').agg({'Qtd.': 'sum', 'V. Líquido': 'sum'}).reset_index().sort_values('Qtd.', ascending=False)
-            totais_categoria = df_filtrado.groupby('Categoria').agg({'Qtd.': 'sum', 'V. Líquido': 'sum'}).reset_index().sort_values('Qtd.', ascending=False) if 'Categoria' in df_filtrado.columns else pd.DataFrame()
-            totais_comercial = df_filtrado.groupby('Comercial').agg({'Qtd.': 'sum', 'V. Líquido': 'sum'}).reset_index().sort_values('Qtd.', ascending=False) if 'Comercial' in df_filtrado.columns else pd.DataFrame()
-            
+            # Totais já calculados para o dashboard
             excel_data = exportar_excel_completo(
                 df_filtrado, totais_cliente, totais_artigo, totais_categoria, totais_comercial,
                 kpi_df, alertas_clientes, alertas_artigos, mes_label, mes_num, ano_selecionado
@@ -1,11 +1,16 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import base64
 from io import BytesIO
 from datetime import datetime
+from functools import partial
+from string import Template
+import html
 import json
 
+from dados_versao import chave_filtros, marcar_versao
+from exportacoes import MIME_CSV, botao_exportacao, botao_exportacao_ficheiro, escrever_csv
+
 # Configuração da página
 st.set_page_config(
     page_title="Via Verde Dashboard",
@@ -166,34 +171,15 @@ def to_excel(df):
     processed_data = output.getvalue()
     return processed_data
 
-def get_table_download_link_excel(df, filename="dados_viaverde.xlsx"):
-    excel_data = to_excel(df)
-    b64 = base64.b64encode(excel_data).decode()
-    return f'<a class="export-button export-excel" href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="{filename}">📊 Excel (.xlsx)</a>'
-
-def get_table_download_link_csv(df, filename="dados_viaverde.csv"):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()
-    return f'<a class="export-button export-csv" href="data:file/csv;base64,{b64}" download="{filename}">📝 CSV (.csv)</a>'
+# Relatório HTML: escrito por blocos num ficheiro temporário (ver exportacoes.botao_exportacao_ficheiro)
+COLUNAS_DETALHE = ['Matricula', 'Date', 'Month', 'Dia', 'Value']
+LINHAS_POR_PAGINA = 500
+MAX_LINHAS_DETALHE = 20000
 
-def create_complete_html_report(df, filtered_df, filters, charts_data, filename="relatorio_completo_viaverde.html"):
-    """Cria um relatório HTML completo com toda a página"""
-    
-    # Preparar dados para os gráficos
-    month_order = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
-                  'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
-    
-    # Dados para gráfico de meses
-    chart_df_month = filtered_df.groupby("Month")["Value"].sum().reset_index()
-    all_months_df = pd.DataFrame({'Month': month_order})
-    chart_df_month = all_months_df.merge(chart_df_month, on='Month', how='left').fillna(0)
-    
-    # Dados para gráfico de dias
-    chart_df_day = filtered_df.groupby("Dia")["Value"].sum().reset_index().sort_values("Dia")
-    
-    # Criar HTML completo
-    html_content = f"""
-    <!DOCTYPE html>
+@st.cache_resource
+def modelo_relatorio_html():
+    """Partes fixas do relatório (CSS, cabeçalho, scripts), compiladas uma vez por processo."""
+    inicio = Template("""<!DOCTYPE html>
     <html lang="pt">
     <head>
         <meta charset="UTF-8">
@@ -201,118 +187,118 @@ def create_complete_html_report(df, filtered_df, filters, charts_data, filename=
         <title>Relatório Completo - Via Verde Dashboard</title>
         <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
         <style>
-            * {{
+            * {
                 margin: 0;
                 padding: 0;
                 box-sizing: border-box;
-            }}
+            }
             
-            body {{
+            body {
                 font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
                 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                 min-height: 100vh;
                 color: #333;
-            }}
+            }
             
-            .container {{
+            .container {
                 max-width: 1400px;
                 margin: 0 auto;
                 padding: 20px;
-            }}
+            }
             
-            .header {{
+            .header {
                 text-align: center;
                 color: white;
                 padding: 40px 0;
                 margin-bottom: 30px;
-            }}
+            }
             
-            .header h1 {{
+            .header h1 {
                 font-size: 3em;
                 margin-bottom: 10px;
                 text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-            }}
+            }
             
-            .header p {{
+            .header p {
                 font-size: 1.3em;
                 opacity: 0.9;
-            }}
+            }
             
-            .report-section {{
+            .report-section {
                 background: white;
                 border-radius: 15px;
                 padding: 30px;
                 margin-bottom: 30px;
                 box-shadow: 0 8px 25px rgba(0, 0, 0, 0.1);
-            }}
+            }
             
-            .filters-info {{
+            .filters-info {
                 background: rgba(255, 255, 255, 0.95);
                 padding: 25px;
                 border-radius: 15px;
                 margin-bottom: 25px;
                 border-left: 4px solid #667eea;
-            }}
+            }
             
-            .metrics-grid {{
+            .metrics-grid {
                 display: grid;
                 grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
                 gap: 20px;
                 margin: 25px 0;
-            }}
+            }
             
-            .metric-card {{
+            .metric-card {
                 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                 color: white;
                 padding: 25px;
                 border-radius: 15px;
                 text-align: center;
                 box-shadow: 0 8px 25px rgba(0, 0, 0, 0.2);
-            }}
+            }
             
-            .metric-card.green {{
+            .metric-card.green {
                 background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%);
-            }}
+            }
             
-            .metric-card.pink {{
+            .metric-card.pink {
                 background: linear-gradient(135deg, #fc466b 0%, #3f5efb 100%);
-            }}
+            }
             
-            .metric-card.orange {{
+            .metric-card.orange {
                 background: linear-gradient(135deg, #fdbb2d 0%, #22c1c3 100%);
-            }}
+            }
             
-            .metric-card h3 {{
+            .metric-card h3 {
                 font-size: 1.1em;
                 margin-bottom: 10px;
                 opacity: 0.9;
-            }}
+            }
             
-            .metric-card h2 {{
+            .metric-card h2 {
                 font-size: 2em;
                 margin: 10px 0;
-            }}
+            }
             
-            .metric-card p {{
+            .metric-card p {
                 opacity: 0.8;
                 font-size: 0.9em;
-            }}
+            }
             
-            .charts-container {{
+            .charts-container {
                 display: grid;
                 grid-template-columns: 2fr 1fr;
                 gap: 30px;
                 margin: 30px 0;
-            }}
+            }
             
-            .chart-card {{
+            .chart-card {
                 background: white;
                 padding: 25px;
                 border-radius: 15px;
                 box-shadow: 0 4px 15px rgba(0, 0, 0, 0.1);
-            }}
+            }
             
-            .chart-placeholder {{
+            .chart-placeholder {
                 background: #f8f9fa;
                 border: 2px dashed #dee2e6;
                 border-radius: 10px;
@@ -320,67 +306,75 @@ def create_complete_html_report(df, filtered_df, filters, charts_data, filename=
                 text-align: center;
                 color: #6c757d;
                 margin: 20px 0;
-            }}
+            }
             
-            .data-table {{
+            .data-table {
                 width: 100%;
                 border-collapse: collapse;
                 margin-top: 20px;
                 border-radius: 10px;
                 overflow: hidden;
                 box-shadow: 0 4px 15px rgba(0, 0, 0, 0.1);
-            }}
+            }
             
-            .data-table th {{
+            .data-table th {
                 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                 color: white;
                 padding: 15px;
                 text-align: left;
                 font-weight: 600;
-            }}
+            }
             
-            .data-table td {{
+            .data-table td {
                 padding: 12px;
                 border-bottom: 1px solid #dee2e6;
-            }}
+            }
             
-            .data-table tr:nth-child(even) {{
+            .data-table tr:nth-child(even) {
                 background-color: #f8f9fa;
-            }}
+            }
             
-            .data-table tr:hover {{
+            .data-table tr:hover {
                 background-color: #e3f2fd;
-            }}
+            }
             
-            .footer {{
+            .footer {
                 text-align: center;
                 margin-top: 40px;
                 padding: 20px;
                 color: white;
                 opacity: 0.8;
-            }}
+            }
             
-            .summary-stats {{
+            .summary-stats {
                 background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
                 padding: 25px;
                 border-radius: 10px;
                 margin: 20px 0;
                 border-left: 4px solid #667eea;
-            }}
+            }
             
-            @media (max-width: 768px) {{
-                .charts-container {{
+            @media (max-width: 768px) {
+                .charts-container {
                     grid-template-columns: 1fr;
-                }}
+                }
                 
-                .metrics-grid {{
+                .metrics-grid {
                     grid-template-columns: 1fr;
-                }}
+                }
                 
-                .header h1 {{
+                .header h1 {
                     font-size: 2em;
-                }}
-            }}
+                }
+            }
+
+            .paginacao {
+                display: flex;
+                gap: 10px;
+                align-items: center;
+                justify-content: center;
+                margin-top: 15px;
+            }
         </style>
     </head>
     <body>
@@ -389,17 +383,17 @@ def create_complete_html_report(df, filtered_df, filters, charts_data, filename=
             <div class="header">
                 <h1>🚗 Via Verde Dashboard</h1>
                 <p>Relatório Completo - Análise de Portagens</p>
-                <p style="margin-top: 10px; font-size: 1em;">Gerado em: {datetime.now().strftime("%d/%m/%Y às %H:%M")}</p>
+                <p style="margin-top: 10px; font-size: 1em;">Gerado em: $gerado_em</p>
             </div>
             
             <!-- Informações dos Filtros -->
             <div class="filters-info">
                 <h2>🔍 Filtros Aplicados</h2>
                 <div style="margin-top: 15px;">
-                    <p><strong>Matrícula:</strong> {filters['matricula']}</p>
-                    <p><strong>Ano:</strong> {filters['ano']}</p>
-                    <p><strong>Meses:</strong> {filters['meses']}</p>
-                    <p><strong>Dias:</strong> {filters['dias']}</p>
+                    <p><strong>Matrícula:</strong> $matricula</p>
+                    <p><strong>Ano:</strong> $ano</p>
+                    <p><strong>Meses:</strong> $meses</p>
+                    <p><strong>Dias:</strong> $dias</p>
                 </div>
             </div>
             
@@ -409,22 +403,22 @@ def create_complete_html_report(df, filtered_df, filters, charts_data, filename=
                 <div class="metrics-grid">
                     <div class="metric-card">
                         <h3>💰 Total Gasto</h3>
-                        <h2>€{filtered_df['Value'].sum():,.2f}</h2>
+                        <h2>€$total</h2>
                         <p>Valor acumulado</p>
                     </div>
                     <div class="metric-card green">
                         <h3>📊 Total de Registos</h3>
-                        <h2>{len(filtered_df):,}</h2>
+                        <h2>$registos</h2>
                         <p>Transações totais</p>
                     </div>
                     <div class="metric-card pink">
                         <h3>📈 Média por Registo</h3>
-                        <h2>€{filtered_df['Value'].mean():.2f}</h2>
+                        <h2>€$media</h2>
                         <p>Valor médio</p>
                     </div>
                     <div class="metric-card orange">
                         <h3>🎯 Valor Máximo</h3>
-                        <h2>€{filtered_df['Value'].max():.2f}</h2>
+                        <h2>€$maximo</h2>
                         <p>Maior transação</p>
                     </div>
                 </div>
@@ -449,21 +443,35 @@ def create_complete_html_report(df, filtered_df, filters, charts_data, filename=
                 </div>
             </div>
             
+            <!-- Resumo por Matrícula e Mês -->
+            <div class="report-section">
+                <h2>🚘 Resumo por Matrícula e Mês</h2>
+""")
+    detalhe = Template("""            </div>
+            
             <!-- Dados Detalhados -->
             <div class="report-section">
                 <h2>📋 Dados Detalhados</h2>
-                <p><strong>Total de registos exibidos:</strong> {len(filtered_df)}</p>
-                {filtered_df[['Matricula', 'Date', 'Month', 'Dia', 'Value']].to_html(classes='data-table', index=False, border=0, escape=False)}
+                <p><strong>Total de registos exibidos:</strong> $exibidos $nota</p>
+                <table class="data-table">
+                    <thead><tr>$cabecalho</tr></thead>
+""")
+    fim = Template("""                </table>
+                <div class="paginacao">
+                    <button onclick="mudarPagina(-1)">◀</button>
+                    <span id="paginaAtual"></span>
+                    <button onclick="mudarPagina(1)">▶</button>
+                </div>
             </div>
             
             <!-- Resumo do Dataset -->
             <div class="report-section">
                 <h2>📊 Informações do Dataset</h2>
                 <div class="summary-stats">
-                    <p><strong>Período Total:</strong> {df['Ano'].min()} - {df['Ano'].max()}</p>
-                    <p><strong>Matrículas Únicas:</strong> {len(df['Matricula'].unique())}</p>
-                    <p><strong>Total de Registos no Dataset:</strong> {len(df):,}</p>
-                    <p><strong>Valor Total no Dataset:</strong> €{df['Value'].sum():,.2f}</p>
+                    <p><strong>Período Total:</strong> $ano_min - $ano_max</p>
+                    <p><strong>Matrículas Únicas:</strong> $matriculas</p>
+                    <p><strong>Total de Registos no Dataset:</strong> $registos_dataset</p>
+                    <p><strong>Valor Total no Dataset:</strong> €$total_dataset</p>
                 </div>
             </div>
             
@@ -475,65 +483,77 @@ def create_complete_html_report(df, filtered_df, filters, charts_data, filename=
         </div>
         
         <script>
+            // Paginação da tabela de detalhe
+            const paginas = document.querySelectorAll('tbody.pagina');
+            let pagina = 0;
+            function mudarPagina(passo) {
+                if (!paginas.length) return;
+                paginas[pagina].hidden = true;
+                pagina = Math.min(Math.max(pagina + passo, 0), paginas.length - 1);
+                paginas[pagina].hidden = false;
+                document.getElementById('paginaAtual').textContent = 'Página ' + (pagina + 1) + ' de ' + paginas.length;
+            }
+            mudarPagina(0);
+            
             // Dados para os gráficos
-            const monthlyData = {{
-                labels: {json.dumps(chart_df_month['Month'].tolist())},
-                values: {json.dumps(chart_df_month['Value'].tolist())}
-            }};
+            const monthlyData = {
+                labels: $meses_labels,
+                values: $meses_valores
+            };
             
-            const dailyData = {{
-                labels: {json.dumps(chart_df_day['Dia'].astype(str).tolist())},
-                values: {json.dumps(chart_df_day['Value'].tolist())}
-            }};
+            const dailyData = {
+                labels: $dias_labels,
+                values: $dias_valores
+            };
             
             // Gráfico Mensal
             const monthlyCtx = document.getElementById('monthlyChart').getContext('2d');
-            new Chart(monthlyCtx, {{
+            new Chart(monthlyCtx, {
                 type: 'bar',
-                data: {{
+                data: {
                     labels: monthlyData.labels,
-                    datasets: [{{
+                    datasets: [{
                         label: 'Valor (€)',
                         data: monthlyData.values,
                         backgroundColor: '#667eea',
                         borderColor: '#764ba2',
                         borderWidth: 1
-                    }}]
-                }},
-                options: {{
+                    }]
+                },
+                options: {
                     responsive: true,
-                    plugins: {{
-                        title: {{
+                    plugins: {
+                        title: {
                             display: true,
                             text: 'Distribuição Mensal de Gastos'
-                        }},
-                        tooltip: {{
-                            callbacks: {{
-                                label: function(context) {{
+                        },
+                        tooltip: {
+                            callbacks: {
+                                label: function(context) {
                                     return '€' + context.parsed.y.toFixed(2);
-                                }}
-                            }}
-                        }}
-                    }},
-                    scales: {{
-                        y: {{
+                                }
+                            }
+                        }
+                    },
+                    scales: {
+                        y: {
                             beginAtZero: true,
-                            title: {{
+                            title: {
                                 display: true,
                                 text: 'Valor (€)'
-                            }}
-                        }}
-                    }}
-                }}
-            }});
+                            }
+                        }
+                    }
+                }
+            });
             
             // Gráfico Diário
             const dailyCtx = document.getElementById('dailyChart').getContext('2d');
-            new Chart(dailyCtx, {{
+            new Chart(dailyCtx, {
                 type: 'line',
-                data: {{
+                data: {
                     labels: dailyData.labels,
-                    datasets: [{{
+                    datasets: [{
                         label: 'Valor (€)',
                         data: dailyData.values,
                         backgroundColor: 'rgba(17, 153, 142, 0.2)',
@@ -541,50 +561,115 @@ def create_complete_html_report(df, filtered_df, filters, charts_data, filename=
                         borderWidth: 2,
                         fill: true,
                         tension: 0.4
-                    }}]
-                }},
-                options: {{
+                    }]
+                },
+                options: {
                     responsive: true,
-                    plugins: {{
-                        title: {{
+                    plugins: {
+                        title: {
                             display: true,
                             text: 'Distribuição Diária de Gastos'
-                        }},
-                        tooltip: {{
-                            callbacks: {{
-                                label: function(context) {{
+                        },
+                        tooltip: {
+                            callbacks: {
+                                label: function(context) {
                                     return '€' + context.parsed.y.toFixed(2);
-                                }}
-                            }}
-                        }}
-                    }},
-                    scales: {{
-                        y: {{
+                                }
+                            }
+                        }
+                    },
+                    scales: {
+                        y: {
                             beginAtZero: true,
-                            title: {{
+                            title: {
                                 display: true,
                                 text: 'Valor (€)'
-                            }}
-                        }},
-                        x: {{
-                            title: {{
+                            }
+                        },
+                        x: {
+                            title: {
                                 display: true,
                                 text: 'Dia do Mês'
-                            }}
-                        }}
-                    }}
-                }}
-            }});
+                            }
+                        }
+                    }
+                }
+            });
         </script>
     </body>
     </html>
-    """
-    
-    b64 = base64.b64encode(html_content.encode()).decode()
-    return f'<a class="export-button export-html" href="data:text/html;base64,{b64}" download="{filename}">🌐 Relatório Completo HTML</a>'
+""")
+    return {"inicio": inicio, "detalhe": detalhe, "fim": fim}
+
+def linhas_html(bloco):
+    """Linhas <tr> de um bloco, concatenadas coluna a coluna (sem iterar célula a célula)."""
+    celulas = [bloco[col].astype(str).map(html.escape) for col in bloco.columns]
+    linhas = "<tr><td>" + celulas[0]
+    for coluna in celulas[1:]:
+        linhas = linhas + "</td><td>" + coluna
+    return "\n".join(linhas + "</td></tr>") + "\n"
 
-def get_table_download_link_html(df, filtered_df, filters, filename="relatorio_completo_viaverde.html"):
-    return create_complete_html_report(df, filtered_df, filters, {}, filename)
+def escrever_relatorio_html(f, df, filtered_df, filters):
+    """Escreve o relatório completo em `f` por partes: o detalhe vai em páginas de
+    LINHAS_POR_PAGINA linhas e fica limitado a MAX_LINHAS_DETALHE (o resumo por
+    matrícula/mês cobre sempre todos os registos filtrados)."""
+    modelo = modelo_relatorio_html()
+    
+    # Preparar dados para os gráficos
+    month_order = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+                  'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
+    
+    # Dados para gráfico de meses
+    chart_df_month = filtered_df.groupby("Month")["Value"].sum().reset_index()
+    all_months_df = pd.DataFrame({'Month': month_order})
+    chart_df_month = all_months_df.merge(chart_df_month, on='Month', how='left').fillna(0)
+    
+    # Dados para gráfico de dias
+    chart_df_day = filtered_df.groupby("Dia")["Value"].sum().reset_index().sort_values("Dia")
+    
+    f.write(modelo["inicio"].substitute(
+        gerado_em=datetime.now().strftime("%d/%m/%Y às %H:%M"),
+        matricula=html.escape(str(filters['matricula'])),
+        ano=html.escape(str(filters['ano'])),
+        meses=html.escape(filters['meses']),
+        dias=html.escape(filters['dias']),
+        total=f"{filtered_df['Value'].sum():,.2f}",
+        registos=f"{len(filtered_df):,}",
+        media=f"{filtered_df['Value'].mean():.2f}",
+        maximo=f"{filtered_df['Value'].max():.2f}",
+    ))
+    
+    # Resumo por matrícula e mês (pequeno, sempre completo)
+    resumo = filtered_df.groupby(['Matricula', 'Month'])['Value'].agg(Registos='count', Total='sum').reset_index()
+    f.write(resumo.to_html(classes='data-table', index=False, border=0, float_format=lambda v: f"{v:,.2f}"))
+    
+    detalhe = filtered_df[COLUNAS_DETALHE]
+    nota = ""
+    if len(detalhe) > MAX_LINHAS_DETALHE:
+        nota = f"(primeiros {MAX_LINHAS_DETALHE:,} de {len(detalhe):,}; exporte em Excel/CSV para a lista completa)"
+        detalhe = detalhe.iloc[:MAX_LINHAS_DETALHE]
+    f.write(modelo["detalhe"].substitute(
+        exibidos=len(detalhe),
+        nota=nota,
+        cabecalho="".join(f"<th>{col}</th>" for col in COLUNAS_DETALHE),
+    ))
+    
+    for n, inicio in enumerate(range(0, len(detalhe), LINHAS_POR_PAGINA)):
+        f.write('<tbody class="pagina"' + (' hidden' if n else '') + '>\n')
+        f.write(linhas_html(detalhe.iloc[inicio:inicio + LINHAS_POR_PAGINA]))
+        f.write('</tbody>\n')
+    
+    f.write(modelo["fim"].substitute(
+        ano_min=df['Ano'].min(),
+        ano_max=df['Ano'].max(),
+        matriculas=len(df['Matricula'].unique()),
+        registos_dataset=f"{len(df):,}",
+        total_dataset=f"{df['Value'].sum():,.2f}",
+        meses_labels=json.dumps(chart_df_month['Month'].tolist()),
+        meses_valores=json.dumps(chart_df_month['Value'].tolist()),
+        dias_labels=json.dumps(chart_df_day['Dia'].astype(str).tolist()),
+        dias_valores=json.dumps(chart_df_day['Value'].tolist()),
+    ))
 
 # 📂 Carregar Excel do GitHub
 file_url = "https://github.com/paulom40/PFonseca.py/raw/main/ViaVerde_streamlit.xlsx"
@@ -603,7 +688,7 @@ def load_data():
     try:
         df = pd.read_excel(file_url)
         df = df.drop(columns=['Mês'], errors='ignore')
-        return df, True
+        return marcar_versao(df), True
     except Exception as e:
         st.error(f"❌ Erro ao carregar o arquivo: {e}")
         return None, False
@@ -677,7 +762,11 @@ filters_info = {
     'dias': ', '.join(map(str, selected_dias)) if "Todos" not in selected_dias else 'Todos'
 }
 
-# 📤 Seção de Exportação
+# 📤 Seção de Exportação (os ficheiros só são gerados ao clicar, em cache por versão + filtros)
+filtros_export = chave_filtros(
+    matricula=selected_matricula, ano=selected_ano, meses=selected_months, dias=selected_dias
+)
+
 if not filtered_df.empty:
     st.markdown('<div class="export-buttons">', unsafe_allow_html=True)
     st.markdown("### 📤 Exportar Dados")
@@ -686,13 +775,17 @@ if not filtered_df.empty:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.markdown(get_table_download_link_excel(filtered_df), unsafe_allow_html=True)
+        botao_exportacao("📊 Excel (.xlsx)", df, "Viaverde.xlsx", partial(to_excel, filtered_df),
+                         file_name="dados_viaverde.xlsx", filtros=filtros_export)
     
     with col2:
-        st.markdown(get_table_download_link_csv(filtered_df), unsafe_allow_html=True)
+        botao_exportacao_ficheiro("📝 CSV (.csv)", df, "Viaverde.csv", partial(escrever_csv, df=filtered_df),
+                                  file_name="dados_viaverde.csv", mime=MIME_CSV, filtros=filtros_export)
     
     with col3:
-        st.markdown(get_table_download_link_html(df, filtered_df, filters_info), unsafe_allow_html=True)
+        botao_exportacao_ficheiro("🌐 Relatório Completo HTML", df, "Viaverde.html",
+                                  partial(escrever_relatorio_html, df=df, filtered_df=filtered_df, filters=filters_info),
+                                  file_name="relatorio_completo_viaverde.html", filtros=filtros_export)
     
     st.markdown("""
     <div style="margin-top: 15px; font-size: 0.9em; color: #666;">
@@ -0,0 +1,208 @@
+import json
+import queue
+import smtplib
+import threading
+from datetime import datetime
+from email.mime.text import MIMEText
+from pathlib import Path
+
+import pandas as pd
+
+from atividade import IndiceUltimaAtividade
+
+# ====================== ALERTAS POR EMAIL (FORA DO RENDER) ======================
+# As regras de alerta são avaliadas numa thread de fundo depois de cada
+# atualização dos dados (e, opcionalmente, de X em X tempo sem ninguém abrir a
+# página). Um registo persistente em JSON evita reenviar o mesmo alerta; os
+# alertas novos seguem num só email (digest) por uma ligação SMTP reutilizada.
+# Para testes basta apontar a config para um servidor SMTP local
+# (starttls=False e sem palavra-passe). O registo fica em
+# config["ficheiro_envios"] (st.secrets["email"]), por omissão FICHEIRO_ENVIOS.
+
+FICHEIRO_ENVIOS = "alertas_enviados.json"
+_PARAR = object()
+
+
+class RegistoEnvios:
+    """Alertas já enviados, por regra: {regra: {chave: data do envio}}."""
+
+    def __init__(self, caminho=FICHEIRO_ENVIOS):
+        self.caminho = Path(caminho)
+        self._lock = threading.Lock()
+        self.enviados = json.loads(self.caminho.read_text(encoding="utf-8")) if self.caminho.exists() else {}
+
+    def por_enviar(self, regra: str, chaves: list) -> list:
+        with self._lock:
+            ja = self.enviados.get(regra, {})
+            return [c for c in chaves if c not in ja]
+
+    def marcar(self, regra: str, chaves: list):
+        with self._lock:
+            agora = datetime.now().isoformat(timespec="seconds")
+            self.enviados.setdefault(regra, {}).update({c: agora for c in chaves})
+            temporario = self.caminho.with_suffix(".tmp")
+            temporario.write_text(json.dumps(self.enviados, ensure_ascii=False, indent=1), encoding="utf-8")
+            temporario.replace(self.caminho)
+
+
+class LigacaoSMTP:
+    """Uma ligação SMTP aberta na primeira mensagem e reutilizada nas seguintes."""
+
+    def __init__(self, servidor: str, porta: int, remetente: str, palavra_passe: str = "",
+                 starttls: bool = True, timeout: float = 30):
+        self.servidor = servidor
+        self.porta = int(porta)
+        self.remetente = remetente
+        self.palavra_passe = palavra_passe
+        self.starttls = starttls
+        self.timeout = timeout
+        self._smtp = None
+
+    def _ligar(self):
+        smtp = smtplib.SMTP(self.servidor, self.porta, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.palavra_passe:
+            smtp.login(self.remetente, self.palavra_passe)
+        self._smtp = smtp
+
+    def _ativa(self) -> bool:
+        if self._smtp is None:
+            return False
+        try:
+            return self._smtp.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+
+    def enviar(self, mensagem):
+        if not self._ativa():
+            self.fechar()
+            self._ligar()
+        try:
+            self._smtp.send_message(mensagem)
+        except smtplib.SMTPServerDisconnected:
+            # o servidor fechou a ligação entretanto: uma nova tentativa
+            self._ligar()
+            self._smtp.send_message(mensagem)
+
+    def fechar(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            self._smtp = None
+
+
+def regra_ultimo_documento(df: pd.DataFrame, minimo: int = 30, maximo: int = 60, hoje=None) -> pd.DataFrame:
+    """Entidades com o último documento há mais de `minimo` e até `maximo` dias."""
+    indice = IndiceUltimaAtividade("Entidade", "Data Doc.")
+    indice.ingerir(df)
+    return indice.banda(minimo, maximo, hoje).rename(
+        columns={"Data Doc.": "Last Data Doc", "dias": "Days Since Last Doc"}
+    )
+
+
+def chaves_ultimo_documento(alertas: pd.DataFrame) -> list:
+    # a mesma entidade volta a alertar quando tiver um novo "último documento"
+    datas = pd.to_datetime(alertas["Last Data Doc"]).dt.strftime("%Y-%m-%d")
+    return (alertas["Entidade"].astype(str) + "|" + datas).tolist()
+
+
+def digest_ultimo_documento(alertas: pd.DataFrame, remetente: str, destinatario: str) -> MIMEText:
+    corpo = "As seguintes entidades têm o último documento entre 30 e 60 dias:\n\n"
+    corpo += "\n".join(
+        f"Entidade: {entidade}, Dias desde último documento: {dias}"
+        for entidade, dias in zip(alertas["Entidade"], alertas["Days Since Last Doc"])
+    )
+    mensagem = MIMEText(corpo + "\n", "plain", "utf-8")
+    mensagem["From"] = remetente
+    mensagem["To"] = destinatario
+    mensagem["Subject"] = f"⚠️ Alert: {len(alertas)} Entidades com Último Documento entre 30 e 60 Dias"
+    return mensagem
+
+
+class AgendadorAlertas:
+    """Thread de fundo que avalia a regra dos 30–60 dias e envia os alertas novos."""
+
+    REGRA = "ultimo_documento_30_60"
+
+    def __init__(self, config: dict, registo: RegistoEnvios = None, carregar=None, intervalo: float = None):
+        self.config = config
+        self.registo = registo or RegistoEnvios(config.get("ficheiro_envios", FICHEIRO_ENVIOS))
+        self.carregar = carregar
+        self.intervalo = intervalo
+        self.ligacao = LigacaoSMTP(
+            config["smtp_server"], config["smtp_port"], config["sender_email"],
+            config.get("sender_password", ""), config.get("starttls", True),
+        )
+        self.ultimo_resultado = None
+        self._fila = queue.Queue()
+        # última versão avaliada com sucesso e a que está na fila: as sessões que
+        # reabrem os mesmos dados não voltam a pedir; uma avaliação falhada pode repetir-se
+        self._versao = None
+        self._pendente = None
+        self._lock_versao = threading.Lock()
+        self._thread = threading.Thread(target=self._ciclo, name="agendador-alertas", daemon=True)
+        self._thread.start()
+
+    def notificar(self, df: pd.DataFrame, versao: str = None):
+        """Pede a avaliação de `df` (não bloqueia; `versao` = dados_versao.versao_dados(df)).
+
+        Uma versão igual à última avaliada com sucesso (ou já na fila) é ignorada.
+        """
+        if versao is not None:
+            with self._lock_versao:
+                if versao in (self._versao, self._pendente):
+                    return
+                self._pendente = versao
+        self._fila.put((df, versao))
+
+    def parar(self):
+        self._fila.put(_PARAR)
+        self._thread.join()
+
+    def _ciclo(self):
+        while True:
+            try:
+                pedido = self._fila.get(timeout=self.intervalo)
+            except queue.Empty:
+                pedido = (None, None)
+            if pedido is _PARAR:
+                break
+            df, versao = pedido
+            try:
+                if df is None:
+                    # sem atualizações durante `intervalo`: recarrega por conta própria
+                    if self.carregar is None:
+                        continue
+                    df = self.carregar()
+                self.ultimo_resultado = self.avaliar(df)
+            except Exception as e:  # a thread não pode morrer por causa de um envio falhado
+                self.ultimo_resultado = e
+            else:
+                if versao is not None:
+                    with self._lock_versao:
+                        self._versao = versao
+            finally:
+                if versao is not None:
+                    with self._lock_versao:
+                        if self._pendente == versao:
+                            self._pendente = None
+        self.ligacao.fechar()
+
+    def avaliar(self, df: pd.DataFrame, hoje=None) -> int:
+        """Envia um digest com os alertas ainda não enviados; devolve quantos seguiram."""
+        alertas = regra_ultimo_documento(df, hoje=hoje)
+        if alertas.empty:
+            return 0
+        chaves = chaves_ultimo_documento(alertas)
+        novas = set(self.registo.por_enviar(self.REGRA, chaves))
+        if not novas:
+            return 0
+        alertas = alertas[[c in novas for c in chaves]]
+        self.ligacao.enviar(digest_ultimo_documento(
+            alertas, self.config["sender_email"], self.config["recipient_email"]
+        ))
+        self.registo.marcar(self.REGRA, sorted(novas))
+        return len(alertas)
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+# ====================== ESCALÕES DE ANTIGUIDADE ======================
+# Os intervalos de dias são definidos uma só vez. O escalão de cada documento
+# é um código (posição em ESCALOES, -1 = fora de todos) obtido por
+# searchsorted nos limites inferiores e guardado como coluna categórica
+# "Intervalo" quando a carteira é carregada. Os resumos saem de uma redução
+# agrupada (bincount) sobre esses códigos; com as linhas ordenadas por código,
+# o detalhe de um escalão é um slice contíguo em vez de uma máscara nova.
+
+# (mínimo, máximo, rótulo), limites inclusivos, por ordem crescente
+ESCALOES = [
+    (0, 15, "0 a 15 dias"),
+    (16, 30, "16 a 30 dias"),
+    (31, 60, "31 a 60 dias"),
+    (61, 90, "61 a 90 dias"),
+    (91, 365, "91 a 365 dias"),
+]
+# os mesmos escalões, mais os documentos por vencer e os muito antigos (cobre tudo)
+ESCALOES_TODOS = [(-np.inf, -1, "Por vencer")] + ESCALOES + [(366, np.inf, "Mais de 365 dias")]
+
+COLUNA_ESCALAO = "Intervalo"
+
+
+def rotulos(escaloes: list = ESCALOES) -> list:
+    return [rotulo for _, _, rotulo in escaloes]
+
+
+def codigos_escalao(dias, escaloes: list = ESCALOES) -> np.ndarray:
+    """Código do escalão de cada valor de `dias` (-1 fora dos escalões ou NaN)."""
+    dias = np.asarray(dias, dtype=float)
+    minimos = np.array([e[0] for e in escaloes], dtype=float)
+    maximos = np.array([e[1] for e in escaloes], dtype=float)
+    pos = np.searchsorted(minimos, dias, side="right") - 1
+    with np.errstate(invalid="ignore"):
+        fora = (pos < 0) | ~(dias <= maximos[np.maximum(pos, 0)])
+    return np.where(fora, -1, pos).astype(np.int8)
+
+
+def categorias_escalao(dias, escaloes: list = ESCALOES) -> pd.Categorical:
+    """Escalões como categórica ordenada (os códigos são os de codigos_escalao)."""
+    return pd.Categorical.from_codes(codigos_escalao(dias, escaloes), categories=rotulos(escaloes), ordered=True)
+
+
+def _codigos(df: pd.DataFrame, escaloes: list) -> np.ndarray:
+    if COLUNA_ESCALAO in df.columns and isinstance(df[COLUNA_ESCALAO].dtype, pd.CategoricalDtype):
+        return df[COLUNA_ESCALAO].cat.codes.to_numpy()
+    return codigos_escalao(df["Dias"], escaloes)
+
+
+def resumo_escaloes(df: pd.DataFrame, escaloes: list = ESCALOES) -> pd.DataFrame:
+    """Quantidade, Valor Pendente e Dias Médios de todos os escalões numa só passagem."""
+    codigos = _codigos(df, escaloes)
+    validos = codigos >= 0
+    codigos = codigos[validos]
+    n = len(escaloes)
+    quantidade = np.bincount(codigos, minlength=n)
+    if "Valor Pendente" in df.columns:
+        valores = pd.to_numeric(df["Valor Pendente"], errors="coerce").to_numpy(dtype=float)[validos]
+        valor = np.bincount(codigos, weights=np.nan_to_num(valores), minlength=n)
+    else:
+        valor = np.zeros(n)
+    soma_dias = np.bincount(codigos, weights=df["Dias"].to_numpy(dtype=float)[validos], minlength=n)
+    dias_medios = np.divide(soma_dias, quantidade, out=np.zeros(n), where=quantidade > 0)
+    return pd.DataFrame({
+        "Intervalo": rotulos(escaloes),
+        "Quantidade": quantidade,
+        "Valor Pendente": valor,
+        "Dias Médios": dias_medios,
+    })
+
+
+def ordenar_por_escalao(df: pd.DataFrame, escaloes: list = ESCALOES) -> pd.DataFrame:
+    """`df` com as linhas agrupadas por escalão (ordenação estável; sem cópia se já estiver)."""
+    codigos = _codigos(df, escaloes)
+    if len(codigos) < 2 or (codigos[1:] >= codigos[:-1]).all():
+        return df
+    return df.iloc[np.argsort(codigos, kind="stable")]
+
+
+def fatia_escalao(df: pd.DataFrame, codigo: int, escaloes: list = ESCALOES) -> pd.DataFrame:
+    """Linhas do escalão `codigo`; `df` tem de estar ordenado por escalão (ordenar_por_escalao)."""
+    codigos = _codigos(df, escaloes)
+    inicio, fim = np.searchsorted(codigos, [codigo, codigo + 1])
+    return df.iloc[inicio:fim]
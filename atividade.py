@@ -0,0 +1,97 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ====================== ÍNDICE DE ÚLTIMA ATIVIDADE ======================
+# Mantém a data da última atividade por cliente/entidade. Cada sincronização
+# só agrega as linhas novas (após a marca de água) e funde-as com np.fmax,
+# desde que a cauda já ingerida (últimas LINHAS_CAUDA linhas) não tenha mudado;
+# os dias de inatividade saem de um único `hoje - ultima` vetorizado.
+
+LINHAS_CAUDA = 256
+
+
+class IndiceUltimaAtividade:
+    def __init__(self, chave: str, coluna_data: str):
+        self.chave = chave
+        self.coluna_data = coluna_data
+        self.ultima = pd.Series(dtype="datetime64[ns]")
+        self.linhas = 0
+        self._versao = None
+        self._cauda = None
+        self._lock = threading.Lock()
+
+    def _impressao(self, linhas: pd.DataFrame) -> int:
+        """Impressão digital vetorizada de (chave, data) das `linhas`."""
+        return int(pd.util.hash_pandas_object(linhas[[self.chave, self.coluna_data]], index=False).sum())
+
+    def ingerir(self, novas: pd.DataFrame):
+        """Funde as linhas novas no índice (groupby só sobre o delta)."""
+        if novas.empty:
+            return
+        datas = pd.to_datetime(novas[self.coluna_data], errors="coerce")
+        delta = datas.groupby(novas[self.chave]).max().dropna()
+        if self.ultima.empty:
+            self.ultima = delta.astype("datetime64[ns]")
+            return
+        chaves = self.ultima.index.union(delta.index)
+        atual = self.ultima.reindex(chaves).to_numpy(dtype="datetime64[ns]")
+        novo = delta.reindex(chaves).to_numpy(dtype="datetime64[ns]")
+        self.ultima = pd.Series(np.fmax(atual, novo), index=chaves)
+
+    def sincronizar(self, df: pd.DataFrame):
+        """Ingere apenas as linhas acrescentadas desde a última sincronização.
+
+        A mesma versão dos dados (dados_versao) não é reprocessada. Numa versão
+        nova, o índice é reconstruído se há menos linhas ou se a cauda já
+        ingerida mudou; só essa cauda é comparada, por isso edições anteriores
+        a ela não são detetadas (para isso é preciso um índice novo, p.ex.
+        st.cache_resource.clear()).
+        """
+        with self._lock:
+            n = len(df)
+            versao = df.attrs.get("versao")
+            if versao is not None and versao == self._versao and n == self.linhas:
+                return self
+            anexado = (
+                self._cauda is not None and n >= self.linhas
+                and self._impressao(df.iloc[max(0, self.linhas - LINHAS_CAUDA):self.linhas]) == self._cauda
+            )
+            if not anexado:
+                self.ultima = pd.Series(dtype="datetime64[ns]")
+                self.linhas = 0
+            if n > self.linhas:
+                self.ingerir(df.iloc[self.linhas:])
+                self.linhas = n
+            self._cauda = self._impressao(df.iloc[max(0, n - LINHAS_CAUDA):n])
+            self._versao = versao
+            return self
+
+    def dias_sem_atividade(self, hoje=None, entidades=None) -> pd.DataFrame:
+        """Tabela chave / última data / dias desde a última atividade."""
+        hoje = pd.Timestamp.today() if hoje is None else pd.Timestamp(hoje)
+        ultima = self.ultima if entidades is None else self.ultima[self.ultima.index.isin(entidades)]
+        dias = (hoje.to_datetime64() - ultima.to_numpy(dtype="datetime64[ns]")) // np.timedelta64(1, "D")
+        return pd.DataFrame({
+            self.chave: ultima.index,
+            self.coluna_data: ultima.to_numpy(),
+            "dias": dias.astype(int),
+        })
+
+    def banda(self, minimo=None, maximo=None, hoje=None, entidades=None) -> pd.DataFrame:
+        """Entidades com minimo < dias <= maximo, das mais antigas para as mais recentes."""
+        tabela = self.dias_sem_atividade(hoje, entidades)
+        mascara = np.ones(len(tabela), dtype=bool)
+        if minimo is not None:
+            mascara &= tabela["dias"].to_numpy() > minimo
+        if maximo is not None:
+            mascara &= tabela["dias"].to_numpy() <= maximo
+        return tabela[mascara].sort_values("dias", ascending=False)
+
+
+@st.cache_resource(show_spinner=False)
+def indice_atividade(nome: str, chave: str, coluna_data: str) -> IndiceUltimaAtividade:
+    """Índice partilhado entre reruns e sessões, identificado por `nome`."""
+    return IndiceUltimaAtividade(chave, coluna_data)
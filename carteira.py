@@ -0,0 +1,73 @@
+import re
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+
+from antiguidade import COLUNA_ESCALAO, categorias_escalao
+
+# ====================== CARTEIRA DE RECEBÍVEIS (V0808) ======================
+# O V0808 é a carteira completa de documentos pendentes; os ficheiros por
+# comercial (PFonseca.xlsx, BBrito.xlsx, SSilva.xlsx, ...) eram só fatias dele.
+# A carteira é carregada uma vez, ordenada por Comercial e indexada por
+# intervalos de linhas: a partição de um comercial é um slice contíguo (sem
+# cópia, com copy-on-write) e servir mais um comercial não custa downloads
+# nem memória adicionais. Dentro de cada comercial as linhas seguem a ordem
+# dos escalões de antiguidade (antiguidade.ESCALOES), calculados uma vez por
+# carregamento.
+
+URL_V0808 = "https://github.com/paulom40/PFonseca.py/raw/main/V0808.xlsx"
+
+
+def carregar_v0808(origem: str = URL_V0808) -> pd.DataFrame:
+    """Lê o V0808 (URL ou caminho local) e normaliza as colunas usadas nos dashboards."""
+    if re.match(r"https?://", origem):
+        resposta = requests.get(origem, timeout=60)
+        resposta.raise_for_status()
+        origem = BytesIO(resposta.content)
+    df = pd.read_excel(origem, sheet_name=0)
+    df.columns = df.columns.str.strip()
+    df["Comercial"] = df["Comercial"].astype(str).str.strip()
+    df["Entidade"] = df["Entidade"].astype(str).str.strip()
+    df["Dias"] = pd.to_numeric(df["Dias"], errors="coerce")
+    df = df.dropna(subset=["Dias"])
+    df["Dias"] = df["Dias"].astype(int)
+    df["Valor Pendente"] = pd.to_numeric(df["Valor Pendente"], errors="coerce").fillna(0)
+    df["Data Venc."] = pd.to_datetime(df["Data Venc."], errors="coerce")
+    df[COLUNA_ESCALAO] = categorias_escalao(df["Dias"])
+    return df
+
+
+class CarteiraRecebiveis:
+    def __init__(self, df: pd.DataFrame):
+        if COLUNA_ESCALAO not in df.columns:
+            df = df.assign(**{COLUNA_ESCALAO: categorias_escalao(df["Dias"])})
+        # por Comercial e, dentro de cada um, por escalão (lexsort é estável)
+        ordem = np.lexsort((df[COLUNA_ESCALAO].cat.codes.to_numpy(), df["Comercial"].to_numpy()))
+        self.df = df.iloc[ordem].reset_index(drop=True)
+        comerciais = self.df["Comercial"].to_numpy()
+        cortes = np.flatnonzero(comerciais[1:] != comerciais[:-1]) + 1
+        inicios = np.r_[0, cortes] if len(comerciais) else np.array([], dtype=int)
+        fins = np.r_[cortes, len(comerciais)] if len(comerciais) else np.array([], dtype=int)
+        # comercial -> (primeira linha, fim) no frame ordenado
+        self.indice = {comerciais[i]: (int(i), int(f)) for i, f in zip(inicios, fins)}
+
+    def comerciais(self) -> list:
+        return list(self.indice)
+
+    def particao(self, comercial: str) -> pd.DataFrame:
+        """Documentos de `comercial` (vazio se não existir); é um slice, não uma cópia."""
+        inicio, fim = self.indice.get(comercial, (0, 0))
+        return self.df.iloc[inicio:fim]
+
+    def particoes(self):
+        for comercial in self.indice:
+            yield comercial, self.particao(comercial)
+
+
+@st.cache_resource(ttl=3600, show_spinner="A carregar a carteira V0808...")
+def carteira_partilhada(origem: str = URL_V0808) -> CarteiraRecebiveis:
+    """Carteira única para todas as sessões e dashboards do processo (recarregada de hora a hora)."""
+    return CarteiraRecebiveis(carregar_v0808(origem))
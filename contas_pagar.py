@@ -0,0 +1,129 @@
+import re
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+
+from antiguidade import ESCALOES_TODOS, codigos_escalao, rotulos
+from dados_versao import marcar_versao
+from hierarquia import IndiceHierarquico
+
+# ====================== CONTAS A PAGAR (FORNECEDORES) ======================
+# O ficheiro de dívidas a fornecedores é lido uma vez por hora e partilhado
+# entre sessões. As datas em número de série do Excel são convertidas numa só
+# operação vetorizada, as colunas numéricas ficam numéricas (a formatação é só
+# na apresentação) e o frame fica ordenado por Entidade e Data Venc: os filtros
+# da página são slices do índice e o resumo por Entidade (antiguidade e
+# vencimentos) é calculado no carregamento, numa redução agrupada (bincount).
+
+URL_FORNECEDORES = "https://www.dropbox.com/scl/fi/378p5bzv5oejc9e2omvp5/Fornecedores_Deb.xlsx?rlkey=e27iy6mdtadqlxnrr2fn220r1&st=mplutmqb&dl=1"
+ORIGEM_EXCEL = "1899-12-30"
+ROTULOS_ESCALOES = rotulos(ESCALOES_TODOS)
+
+
+def datas_excel(serie: pd.Series) -> pd.Series:
+    """Datas em número de série do Excel e/ou texto, convertidas sem apply."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    numeros = pd.to_numeric(serie, errors="coerce")
+    datas = pd.to_datetime(numeros, unit="D", origin=ORIGEM_EXCEL)
+    texto = serie.where(numeros.isna() & serie.notna())
+    if texto.notna().any():
+        datas = datas.fillna(pd.to_datetime(texto, errors="coerce"))
+    return datas
+
+
+def carregar_fornecedores(origem: str = URL_FORNECEDORES) -> pd.DataFrame:
+    """Lê o ficheiro de fornecedores (URL ou caminho local) com colunas limpas e numéricas."""
+    if re.match(r"https?://", origem):
+        resposta = requests.get(origem, timeout=60)
+        resposta.raise_for_status()
+        origem = BytesIO(resposta.content)
+    df = pd.read_excel(origem)
+    df.columns = df.columns.str.strip()
+    df["Entidade"] = df["Entidade"].astype(str).str.strip()
+    df["Data Venc"] = datas_excel(df["Data Venc"])
+    df["Dias"] = pd.to_numeric(df["Dias"], errors="coerce")
+    df["Valor Pendente"] = pd.to_numeric(df["Valor Pendente"], errors="coerce").fillna(0)
+    return marcar_versao(df)
+
+
+def resumo_entidades(df: pd.DataFrame) -> pd.DataFrame:
+    """Por Entidade: documentos, valores vencido/por vencer, dias, próximo vencimento e antiguidade."""
+    entidades, codigos = np.unique(df["Entidade"].to_numpy(), return_inverse=True)
+    n = len(entidades)
+    valores = df["Valor Pendente"].to_numpy(dtype=float)
+    dias = df["Dias"].to_numpy(dtype=float)
+    com_dias = ~np.isnan(dias)
+    vencido = com_dias & (dias >= 0)  # como em antiguidade: dia 0 (vence hoje) já é vencido
+
+    documentos = np.bincount(codigos, minlength=n)
+    soma_dias = np.bincount(codigos[com_dias], weights=dias[com_dias], minlength=n)
+    n_dias = np.bincount(codigos[com_dias], minlength=n)
+    maior_atraso = np.full(n, np.nan)
+    np.fmax.at(maior_atraso, codigos[com_dias], dias[com_dias])
+
+    datas = df["Data Venc"].to_numpy(dtype="datetime64[ns]")
+    por_vencer = ~vencido & ~np.isnat(datas)
+    proximo = np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")
+    # datas em inteiros para o mínimo por grupo (NaT fica de fora)
+    minimos = np.full(n, np.iinfo(np.int64).max)
+    np.minimum.at(minimos, codigos[por_vencer], datas[por_vencer].astype(np.int64))
+    tem_proximo = minimos != np.iinfo(np.int64).max
+    proximo[tem_proximo] = minimos[tem_proximo].astype("datetime64[ns]")
+
+    resumo = pd.DataFrame({
+        "Entidade": entidades,
+        "Documentos": documentos,
+        "Valor Pendente": np.bincount(codigos, weights=valores, minlength=n),
+        "Vencido": np.bincount(codigos, weights=np.where(vencido, valores, 0), minlength=n),
+        "Por Vencer": np.bincount(codigos, weights=np.where(vencido, 0, valores), minlength=n),
+        "Dias Médios": np.divide(soma_dias, n_dias, out=np.full(n, np.nan), where=n_dias > 0),
+        "Maior Atraso": maior_atraso,
+        "Próximo Vencimento": proximo,
+    })
+
+    # antiguidade: valor por (Entidade, escalão) num só bincount
+    escaloes = codigos_escalao(dias, ESCALOES_TODOS).astype(np.int64)
+    validos = escaloes >= 0
+    k = len(ROTULOS_ESCALOES)
+    antiguidade = np.bincount(
+        codigos[validos] * k + escaloes[validos], weights=valores[validos], minlength=n * k
+    ).reshape(n, k)
+    resumo[ROTULOS_ESCALOES] = antiguidade
+    return resumo
+
+
+class ContasPagar:
+    def __init__(self, df: pd.DataFrame):
+        # Entidade -> linhas contíguas, ordenadas por Data Venc
+        self.indice = IndiceHierarquico(df, ["Entidade"], "Data Venc")
+        self.df = self.indice.df
+        self.resumo = resumo_entidades(self.df)
+
+    def entidades(self) -> list:
+        return self.indice.opcoes()
+
+    def limites_datas(self, entidade: str = None) -> tuple:
+        """(primeiro, último) vencimento de `entidade` (None = todas); NaT sem datas."""
+        datas = self.indice.filtrar(entidade)["Data Venc"]
+        return datas.min(), datas.max()
+
+    def filtrar(self, entidade: str = None, inicio=None, fim=None) -> pd.DataFrame:
+        """Documentos de `entidade` (None = todas) com vencimento entre `inicio` e `fim` (inclusivos)."""
+        minimo = np.datetime64(pd.Timestamp(inicio), "ns") if inicio is not None else None
+        maximo = np.datetime64(pd.Timestamp(fim), "ns") if fim is not None else None
+        return self.indice.filtrar(entidade, minimo=minimo, maximo=maximo)
+
+    def resumo_entidade(self, entidade: str = None) -> pd.DataFrame:
+        if entidade is None:
+            return self.resumo
+        return self.resumo[self.resumo["Entidade"] == entidade]
+
+
+@st.cache_resource(ttl=3600, show_spinner="A carregar as dívidas a fornecedores...")
+def contas_pagar(origem: str = URL_FORNECEDORES) -> ContasPagar:
+    """Contas a pagar partilhadas por todas as sessões (recarregadas de hora a hora)."""
+    return ContasPagar(carregar_fornecedores(origem))
@@ -0,0 +1,51 @@
+import uuid
+
+import pandas as pd
+
+# ====================== VERSÃO DOS DADOS ======================
+# Os loaders em cache marcam o DataFrame com uma versão (df.attrs sobrevive
+# à cópia feita por st.cache_data). Os caches derivados (rankings, exportações,
+# índices) usam essa versão + o estado dos filtros como chave, em vez de
+# voltar a fazer hash do DataFrame inteiro em cada rerun.
+
+
+def marcar_versao(df: pd.DataFrame) -> pd.DataFrame:
+    df.attrs["versao"] = uuid.uuid4().hex
+    return df
+
+
+def versao_dados(df: pd.DataFrame) -> str:
+    versao = df.attrs.get("versao")
+    if versao is None:
+        # DataFrame sem marca: impressão digital vetorizada do conteúdo
+        versao = f"{len(df)}-{int(pd.util.hash_pandas_object(df, index=False).sum())}"
+        df.attrs["versao"] = versao
+    return versao
+
+
+def chave_filtros(**filtros) -> tuple:
+    """Normaliza o estado dos filtros para uma chave hashable e estável."""
+    chave = []
+    for nome, valor in sorted(filtros.items()):
+        if isinstance(valor, (list, tuple, set)):
+            valor = tuple(sorted(map(str, valor)))
+        elif valor is not None:
+            valor = str(valor)
+        chave.append((nome, valor))
+    return tuple(chave)
+
+
+def marcar_filtros(df: pd.DataFrame, **filtros) -> pd.DataFrame:
+    """Guarda em df.attrs a chave do estado de filtros que produziu `df`."""
+    df.attrs["filtros"] = chave_filtros(**filtros)
+    return df
+
+
+def marcar_derivado(df: pd.DataFrame, origem: pd.DataFrame, **filtros) -> pd.DataFrame:
+    """Marca `df` (tabela calculada a partir de `origem`) com a versão de `origem` e a chave dos filtros."""
+    df.attrs["versao"] = versao_dados(origem)
+    return marcar_filtros(df, **filtros)
+
+
+def filtros_dados(df: pd.DataFrame, omissao=()) -> tuple:
+    return df.attrs.get("filtros", omissao)
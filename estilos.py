@@ -0,0 +1,233 @@
+import warnings
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from xlsxwriter.utility import xl_rowcol_to_cell
+
+from formatacao import aplicar_formatos_excel
+
+# ====================== ESTILOS VETORIZADOS ======================
+# Um estilo condicional é descrito uma vez (dict criado por regra_*) e serve
+# para o ecrã e para o Excel:
+# - no ecrã, estilizar() calcula a matriz CSS da tabela inteira numa só
+#   passagem vetorizada (Styler.apply(axis=None)), sem callbacks por linha
+#   ou por célula;
+# - na exportação, aplicar_regras_excel() grava regras de formatação
+#   condicional nativas (uma regra por banda/valor, não um formato por célula).
+
+# acima disto o Styler deixa de pintar (só formata): o custo passa a ser o HTML
+LIMITE_CELULAS_ESTILO = 262_144
+
+# operador -> (função numpy, operador Excel)
+_OPERADORES = {
+    "gt": (np.greater, ">"),
+    "ge": (np.greater_equal, ">="),
+    "lt": (np.less, "<"),
+    "le": (np.less_equal, "<="),
+    "eq": (np.equal, "="),
+}
+
+
+def regra_linhas(coluna: str, css_por_valor: dict) -> dict:
+    """Pinta a linha inteira conforme o valor (categórico) de `coluna`."""
+    return {"tipo": "valores", "coluna": coluna, "css": css_por_valor}
+
+
+def regra_bandas(coluna: str, bandas: list, linha_inteira: bool = False) -> dict:
+    """Bandas [(operador, limite, css)], a primeira que se verifica ganha.
+
+    Operadores: gt, ge, lt, le, eq; (None, None, css) é o valor por omissão.
+    """
+    return {"tipo": "bandas", "coluna": coluna, "bandas": bandas, "linha_inteira": linha_inteira}
+
+
+def regra_gradiente(colunas: list = None, cmap: str = "YlGnBu", limites: dict = None) -> dict:
+    """Escala de cores por coluna (como Styler.background_gradient); None = colunas numéricas.
+
+    `limites` ({coluna: (mínimo, máximo)}) fixa os extremos da escala; sem eles
+    são os da tabela pintada.
+    """
+    return {"tipo": "gradiente", "colunas": colunas, "cmap": cmap, "limites": limites}
+
+
+def fixar_gradientes(regras: list, df: pd.DataFrame) -> list:
+    """`regras` com os limites dos gradientes calculados sobre `df` inteiro.
+
+    Para tabelas paginadas: pintada só a página, o mesmo valor tem a mesma cor
+    em todas as páginas.
+    """
+    fixadas = []
+    for regra in regras:
+        if regra["tipo"] == "gradiente" and not regra.get("limites"):
+            colunas = [c for c in (regra["colunas"] or df.select_dtypes("number").columns) if c in df.columns]
+            valores = df[colunas].apply(pd.to_numeric, errors="coerce")
+            regra = {**regra, "colunas": colunas,
+                     "limites": dict(zip(colunas, zip(valores.min().tolist(), valores.max().tolist())))}
+        fixadas.append(regra)
+    return fixadas
+
+
+# ---------------------- ecrã ----------------------
+
+def _cores_hex(rgba: np.ndarray) -> np.ndarray:
+    rgb = (rgba[..., :3] * 255).round().astype(int)
+    return np.array([f"#{r:02x}{g:02x}{b:02x}" for r, g, b in rgb.reshape(-1, 3)]).reshape(rgb.shape[:-1])
+
+
+def _css_gradiente(valores: pd.DataFrame, cmap: str, limites: dict = None) -> np.ndarray:
+    from matplotlib import colormaps
+
+    v = valores.to_numpy(dtype=float)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)  # colunas só com NaN
+        minimo, maximo = np.nanmin(v, axis=0), np.nanmax(v, axis=0)
+        for i, coluna in enumerate(valores.columns):
+            if limites and coluna in limites:
+                minimo[i], maximo[i] = limites[coluna]
+        normal = np.clip((v - minimo) / np.where(maximo > minimo, maximo - minimo, 1), 0, 1)
+    rgba = colormaps[cmap](np.nan_to_num(normal))
+    # texto claro sobre fundos escuros (luminância relativa, como o pandas)
+    luz = 0.2126 * rgba[..., 0] + 0.7152 * rgba[..., 1] + 0.0722 * rgba[..., 2]
+    css = "background-color: " + _cores_hex(rgba).astype(object) + np.where(luz < 0.408, "; color: #f1f1f1", "; color: #000000")
+    return np.where(np.isnan(v), "", css)
+
+
+def _mascaras_bandas(valores: np.ndarray, bandas: list) -> list:
+    mascaras = []
+    with np.errstate(invalid="ignore"):
+        for op, limite, _ in bandas:
+            mascaras.append(np.ones(len(valores), bool) if op is None else _OPERADORES[op][0](valores, limite))
+    return mascaras
+
+
+def matriz_css(df: pd.DataFrame, regras: list) -> pd.DataFrame:
+    """Matriz CSS (mesma forma de `df`) com todas as regras, coluna a coluna e sem ciclos por linha."""
+    css = np.full(df.shape, "", dtype=object)
+    for regra in regras:
+        if regra["tipo"] == "gradiente":
+            colunas = regra["colunas"] or df.select_dtypes("number").columns.tolist()
+            idx = [df.columns.get_loc(c) for c in colunas if c in df.columns]
+            if idx:
+                css[:, idx] = _junta(css[:, idx], _css_gradiente(df.iloc[:, idx], regra["cmap"], regra.get("limites")))
+            continue
+        if regra["coluna"] not in df.columns:
+            continue
+        col = df.columns.get_loc(regra["coluna"])
+        if regra["tipo"] == "valores":
+            camada = df.iloc[:, col].map(regra["css"]).fillna("").to_numpy(dtype=object)
+        else:
+            valores = pd.to_numeric(df.iloc[:, col], errors="coerce").to_numpy(dtype=float)
+            bandas = regra["bandas"]
+            camada = np.select(_mascaras_bandas(valores, bandas), [b[2] for b in bandas], default="").astype(object)
+        if regra.get("linha_inteira", regra["tipo"] == "valores"):
+            css = _junta(css, np.repeat(camada[:, None], df.shape[1], axis=1))
+        else:
+            css[:, col] = _junta(css[:, col], camada)
+    return pd.DataFrame(css, index=df.index, columns=df.columns)
+
+
+def _junta(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.where(a == "", b, np.where(b == "", a, a + "; " + b))
+
+
+def estilizar(dados, regras: list):
+    """Styler com as `regras` aplicadas numa só passagem (aceita DataFrame ou Styler)."""
+    styler = dados.style if isinstance(dados, pd.DataFrame) else dados
+    if styler.data.size > LIMITE_CELULAS_ESTILO:
+        return styler
+    return styler.apply(lambda d: matriz_css(d, regras), axis=None)
+
+
+# ---------------------- Excel ----------------------
+
+def formato_de_css(css: str) -> dict:
+    """Converte "background-color: #x; color: #y; font-weight: bold" num formato xlsxwriter."""
+    formato = {}
+    for declaracao in css.split(";"):
+        if ":" not in declaracao:
+            continue
+        nome, valor = (p.strip() for p in declaracao.split(":", 1))
+        if nome == "background-color":
+            formato["bg_color"] = valor
+        elif nome == "color":
+            formato["font_color"] = valor
+        elif nome == "font-weight" and valor == "bold":
+            formato["bold"] = True
+        elif nome == "font-style" and valor == "italic":
+            formato["italic"] = True
+    return formato
+
+
+def _literal_excel(valor) -> str:
+    if isinstance(valor, str):
+        return '"' + valor.replace('"', '""') + '"'
+    return repr(float(valor))
+
+
+def aplicar_regras_excel(writer, sheet_name: str, df: pd.DataFrame, regras: list, linha_cabecalho: int = 0):
+    """Grava as `regras` como formatação condicional nativa sobre `df` já escrito (xlsxwriter)."""
+    if df.empty:
+        return
+    ws = writer.sheets[sheet_name]
+    book = writer.book
+    primeira, ultima = linha_cabecalho + 1, linha_cabecalho + len(df)
+    ultima_col = len(df.columns) - 1
+
+    for regra in regras:
+        if regra["tipo"] == "gradiente":
+            from matplotlib import colormaps
+
+            cores = _cores_hex(colormaps[regra["cmap"]]([0.0, 0.5, 1.0]))
+            colunas = regra["colunas"] or df.select_dtypes("number").columns.tolist()
+            limites = regra.get("limites") or {}
+            for coluna in colunas:
+                if coluna not in df.columns:
+                    continue
+                if coluna in limites:
+                    minimo, maximo = limites[coluna]
+                else:
+                    valores = pd.to_numeric(df[coluna], errors="coerce")
+                    minimo, maximo = valores.min(), valores.max()
+                if pd.isna(minimo) or pd.isna(maximo):
+                    continue
+                # escala linear como no ecrã: meio = média dos extremos (não o percentil 50)
+                col = df.columns.get_loc(coluna)
+                ws.conditional_format(primeira, col, ultima, col, {
+                    "type": "3_color_scale",
+                    "min_type": "num", "min_value": float(minimo), "min_color": cores[0],
+                    "mid_type": "num", "mid_value": (float(minimo) + float(maximo)) / 2, "mid_color": cores[1],
+                    "max_type": "num", "max_value": float(maximo), "max_color": cores[2],
+                })
+            continue
+        if regra["coluna"] not in df.columns:
+            continue
+        col = df.columns.get_loc(regra["coluna"])
+        celula = xl_rowcol_to_cell(primeira, col, col_abs=True)
+        if regra["tipo"] == "valores":
+            condicoes = [(f"={celula}={_literal_excel(v)}", css) for v, css in regra["css"].items() if css]
+            inteira = True
+        else:
+            condicoes = [
+                ("=TRUE" if op is None else f"=AND(ISNUMBER({celula}),{celula}{_OPERADORES[op][1]}{_literal_excel(limite)})", css)
+                for op, limite, css in regra["bandas"]
+            ]  # bandas sem css também entram: param a avaliação como no ecrã
+            inteira = regra["linha_inteira"]
+        primeira_col, ultima_col_regra = (0, ultima_col) if inteira else (col, col)
+        for criterio, css in condicoes:
+            ws.conditional_format(primeira, primeira_col, ultima, ultima_col_regra, {
+                "type": "formula", "criteria": criterio,
+                "format": book.add_format(formato_de_css(css)), "stop_if_true": True,
+            })
+
+
+def to_excel_estilizado(df: pd.DataFrame, formatos: dict = None, regras: list = None, sheet_name: str = "Dados") -> bytes:
+    """Folha única com formatos numéricos nativos e as `regras` como formatação condicional."""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name=sheet_name)
+        if formatos:
+            aplicar_formatos_excel(writer, sheet_name, df, formatos)
+        if regras:
+            aplicar_regras_excel(writer, sheet_name, df, regras)
+    return output.getvalue()
@@ -0,0 +1,272 @@
+import hashlib
+import importlib.util
+import tempfile
+import time
+import uuid
+import warnings
+from functools import partial
+from pathlib import Path
+
+import streamlit as st
+
+from dados_versao import filtros_dados, versao_dados
+from formatacao import to_excel_formatado
+
+# ====================== EXPORTAÇÕES A PEDIDO ======================
+# Os ficheiros de exportação só são gerados quando o utilizador carrega no
+# botão (st.download_button aceita um callable como `data`) e ficam num cache
+# limitado, chaveado por (versão dos dados, estado dos filtros, tipo de
+# exportação). Um rerun sem download não serializa nenhum workbook.
+#
+# A chave dos filtros é obrigatória: `filtros=` no botão ou df.attrs["filtros"]
+# (dados_versao.marcar_filtros / marcar_derivado); filtros=() = dados completos.
+# Slices herdam a versão do frame de origem, por isso sem filtros a chave não
+# distingue seleções: nesse caso a exportação não é memorizada e fica um aviso.
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MIME_CSV = "text/csv"
+MIME_HTML = "text/html"
+MIME_PARQUET = "application/vnd.apache.parquet"
+MIME_ARROW = "application/vnd.apache.arrow.file"
+
+# Relatórios grandes são escritos por blocos num ficheiro (memória limitada);
+# a pasta funciona como cache em disco com no máximo MAX_FICHEIROS ficheiros.
+PASTA_EXPORTACOES = Path(tempfile.gettempdir()) / "exportacoes_dashboard"
+MAX_FICHEIROS = 16
+IDADE_MAXIMA_PARCIAL = 3600  # segundos
+TENTATIVAS_LEITURA = 3
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _exportacao_em_cache(versao: str, filtros: tuple, tipo: str, _gerar):
+    return _gerar()
+
+
+def chave_exportacao(df, filtros: tuple = None, tipo: str = None):
+    """(versão, filtros) que identificam os dados de uma exportação; None sem chave de filtros."""
+    filtros = filtros_dados(df, None) if filtros is None else filtros
+    if filtros is None:
+        warnings.warn(f"Exportação {tipo!r} sem chave de filtros (filtros= ou marcar_filtros): "
+                      "gerada em cada pedido, sem cache.", stacklevel=3)
+        return None
+    return versao_dados(df), filtros
+
+
+def exportacao(df, tipo: str, gerar, filtros: tuple = None):
+    """Conteúdo da exportação `tipo`; `gerar()` só corre se a chave ainda não estiver em cache."""
+    chave = chave_exportacao(df, filtros, tipo)
+    return gerar() if chave is None else _exportacao_em_cache(*chave, tipo, gerar)
+
+
+def botao_exportacao(label: str, df, tipo: str, gerar, file_name: str, mime: str = MIME_XLSX,
+                     filtros: tuple = None, key: str = None, on_click="rerun"):
+    """st.download_button cujo ficheiro só é gerado (e memorizado) quando é pedido.
+
+    `tipo` identifica a exportação (ex.: "CompAnos.xlsx"); `filtros` é a chave
+    do estado dos filtros que produziu os dados (por omissão, a de df.attrs;
+    () para os dados completos).
+    Dentro de blocos `if st.button(...)` use on_click="ignore" (o rerun apagaria o botão).
+    """
+    # a chave é calculada já, no rerun; o callable corre noutra thread ao clicar
+    chave = chave_exportacao(df, filtros, tipo)
+    return st.download_button(
+        label=label,
+        data=gerar if chave is None else (lambda: _exportacao_em_cache(*chave, tipo, gerar)),
+        file_name=file_name,
+        mime=mime,
+        key=key or f"exportacao_{tipo}",
+        on_click=on_click,
+    )
+
+
+def _mtime(caminho: Path) -> float:
+    try:
+        return caminho.stat().st_mtime
+    except FileNotFoundError:  # apagado entretanto por outra sessão
+        return 0.0
+
+
+def _limitar_pasta():
+    ficheiros = sorted(PASTA_EXPORTACOES.glob("*.exp*"), key=_mtime, reverse=True)
+    for antigo in ficheiros[MAX_FICHEIROS:]:
+        antigo.unlink(missing_ok=True)
+    # restos de escritas interrompidas (processo terminado a meio); os recentes podem estar em curso
+    limite = time.time() - IDADE_MAXIMA_PARCIAL
+    for parcial in PASTA_EXPORTACOES.glob("*.parcial"):
+        if _mtime(parcial) < limite:
+            parcial.unlink(missing_ok=True)
+
+
+def _escrever_exportacao(caminho: Path, nome: str, escrever, binario: bool):
+    PASTA_EXPORTACOES.mkdir(parents=True, exist_ok=True)
+    parcial = PASTA_EXPORTACOES / f"{nome}.{uuid.uuid4().hex}.parcial"
+    try:
+        with (open(parcial, "wb") if binario else open(parcial, "w", encoding="utf-8", newline="")) as f:
+            escrever(f)
+        parcial.replace(caminho)  # só fica visível depois de completo
+    finally:
+        parcial.unlink(missing_ok=True)
+    _limitar_pasta()
+
+
+def exportacao_ficheiro(chave: tuple, escrever, sufixo: str, binario: bool = False) -> bytes:
+    """Conteúdo da exportação `chave`, escrito em ficheiro por `escrever(f)` só se ainda não existir.
+
+    Outra sessão pode apagar o ficheiro (_limitar_pasta) entre a verificação e
+    a leitura: nesse caso é escrito de novo.
+    """
+    nome = hashlib.sha1(repr(chave).encode()).hexdigest()
+    caminho = PASTA_EXPORTACOES / f"{nome}.exp{sufixo}"
+    for _ in range(TENTATIVAS_LEITURA):
+        if not caminho.exists():
+            _escrever_exportacao(caminho, nome, escrever, binario)
+        try:
+            return caminho.read_bytes()
+        except FileNotFoundError:
+            continue
+    raise FileNotFoundError(caminho)
+
+
+def botao_exportacao_ficheiro(label: str, df, tipo: str, escrever, file_name: str, mime: str = MIME_HTML,
+                              filtros: tuple = None, key: str = None, binario: bool = False, on_click="rerun"):
+    """Como botao_exportacao, mas `escrever(f)` grava o conteúdo por partes num ficheiro temporário.
+
+    O ficheiro é aberto em modo texto (utf-8), ou em modo binário se `binario`.
+    """
+    chave = chave_exportacao(df, filtros, tipo)
+    # sem chave de filtros: um ficheiro novo por rerun, nunca partilhado
+    chave = (uuid.uuid4().hex, tipo) if chave is None else (*chave, tipo)
+    sufixo = Path(file_name).suffix
+    return st.download_button(
+        label=label,
+        data=lambda: exportacao_ficheiro(chave, escrever, sufixo, binario),
+        file_name=file_name,
+        mime=mime,
+        key=key or f"exportacao_{tipo}",
+        on_click=on_click,
+    )
+
+
+# ====================== FORMATOS DE EXPORTAÇÃO ======================
+# xlsx é o formato mais lento e pesado; para extrações grandes há CSV
+# escrito por blocos (gerador) e os formatos colunares Parquet / Arrow IPC
+# (se o pyarrow estiver instalado), todos gravados por partes em ficheiro.
+
+BLOCO_LINHAS = 50_000
+LIMITE_XLSX = 100_000  # acima disto o xlsx deixa de ser oferecido
+
+# formato -> (rótulo, extensão, mime)
+FORMATOS_EXPORTACAO = {
+    "xlsx": ("Excel", ".xlsx", MIME_XLSX),
+    "csv": ("CSV", ".csv", MIME_CSV),
+    "parquet": ("Parquet", ".parquet", MIME_PARQUET),
+    "arrow": ("Arrow IPC", ".arrow", MIME_ARROW),
+}
+
+
+def tem_pyarrow() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def blocos_csv(df, bloco: int = BLOCO_LINHAS):
+    """Gerador do CSV de `df`, um bloco de linhas de cada vez (cabeçalho só no primeiro)."""
+    for inicio in range(0, max(len(df), 1), bloco):
+        yield df.iloc[inicio:inicio + bloco].to_csv(index=False, header=inicio == 0)
+
+
+def escrever_csv(f, df):
+    for pedaco in blocos_csv(df):
+        f.write(pedaco)
+
+
+def _tabelas_arrow(df, bloco: int = BLOCO_LINHAS):
+    """(schema, gerador de pa.Table por bloco); colunas object mistas passam a texto."""
+    import pyarrow as pa
+
+    try:
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        df = df.astype({c: "string" for c in df.select_dtypes(include="object").columns})
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+    def tabelas():
+        for inicio in range(0, max(len(df), 1), bloco):
+            yield pa.Table.from_pandas(df.iloc[inicio:inicio + bloco], schema=schema, preserve_index=False)
+
+    return schema, tabelas()
+
+
+def escrever_parquet(f, df):
+    import pyarrow.parquet as pq
+
+    schema, tabelas = _tabelas_arrow(df)
+    with pq.ParquetWriter(f, schema) as escritor:
+        for tabela in tabelas:
+            escritor.write_table(tabela)
+
+
+def escrever_arrow(f, df):
+    import pyarrow as pa
+
+    schema, tabelas = _tabelas_arrow(df)
+    with pa.ipc.new_file(f, schema) as escritor:
+        for tabela in tabelas:
+            escritor.write_table(tabela)
+
+
+ESCRITORES = {"csv": escrever_csv, "parquet": escrever_parquet, "arrow": escrever_arrow}
+
+
+def formatos_disponiveis(n_linhas: int, formatos=None) -> list:
+    formatos = list(formatos or FORMATOS_EXPORTACAO)
+    if n_linhas > LIMITE_XLSX and "xlsx" in formatos and len(formatos) > 1:
+        formatos.remove("xlsx")
+    if not tem_pyarrow():
+        # pyarrow está em requirements.txt; sem ele (instalação incompleta) os formatos colunares ficam de fora
+        formatos = [f for f in formatos if f not in ("parquet", "arrow")]
+    return formatos
+
+
+def _botao_formato(label: str, dados, tipo: str, nome_base: str, formato: str, gerar_xlsx,
+                   filtros: tuple, key: str, on_click):
+    _, extensao, mime = FORMATOS_EXPORTACAO[formato]
+    file_name = f"{nome_base}{extensao}"
+    if formato == "xlsx":
+        gerar = gerar_xlsx or partial(to_excel_formatado, dados)
+        return botao_exportacao(label, dados, tipo, gerar, file_name, mime=mime, filtros=filtros,
+                                key=key, on_click=on_click)
+    return botao_exportacao_ficheiro(
+        label, dados, f"{tipo}.{formato}", partial(ESCRITORES[formato], df=dados), file_name,
+        mime=mime, filtros=filtros, key=key, binario=formato != "csv", on_click=on_click,
+    )
+
+
+def botao_exportacao_formatos(label: str, dados, tipo: str, nome_base: str, gerar_xlsx=None,
+                              filtros: tuple = None, key: str = None, formatos=None,
+                              seletor: bool = True, on_click="rerun"):
+    """Seletor de formato + botão de download de `dados`.
+
+    xlsx usa `gerar_xlsx()` (por omissão, uma folha simples) e fica em cache em
+    memória; CSV / Parquet / Arrow são escritos por blocos num ficheiro.
+    `nome_base` é o nome do ficheiro sem extensão. Com seletor=False é desenhado
+    um botão por formato (para blocos onde um rerun apagaria o seletor).
+    """
+    key = key or f"exportacao_{tipo}"
+    disponiveis = formatos_disponiveis(len(dados), formatos)
+    if "xlsx" not in disponiveis and len(dados) > LIMITE_XLSX:
+        st.caption(f"Excel indisponível acima de {LIMITE_XLSX:,} linhas; use CSV ou Parquet.")
+    sem_pyarrow = [f for f in (formatos or FORMATOS_EXPORTACAO) if f in ("parquet", "arrow") and f not in disponiveis]
+    if sem_pyarrow:
+        st.caption(f"{' / '.join(FORMATOS_EXPORTACAO[f][0] for f in sem_pyarrow)} indisponível: "
+                   "o pacote pyarrow (requirements.txt) não está instalado.")
+    if not seletor:
+        for coluna, formato in zip(st.columns(len(disponiveis)), disponiveis):
+            with coluna:
+                _botao_formato(f"{label} ({FORMATOS_EXPORTACAO[formato][0]})", dados, tipo, nome_base, formato,
+                               gerar_xlsx, filtros, f"{key}_{formato}", on_click)
+        return None
+    formato = st.radio(
+        "Formato", disponiveis, horizontal=True, key=f"{key}_formato",
+        format_func=lambda f: FORMATOS_EXPORTACAO[f][0],
+    )
+    return _botao_formato(label, dados, tipo, nome_base, formato, gerar_xlsx, filtros, key, on_click)
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from vencimentos import dia_inteiro
+
+# ====================== PREVISÃO DE RECEBIMENTOS ======================
+# Cada Entidade tem uma distribuição empírica do atraso de pagamento (Data
+# Receb. - Data Venc., em dias), aprendida dos documentos já liquidados numa
+# só passagem: os atrasos são discretizados por dia e contados com um
+# bincount sobre (entidade, dia), o que dá uma matriz entidades x dias.
+# Entidades com pouco histórico são puxadas para a distribuição global
+# (PESO_GLOBAL documentos "virtuais"). Para os documentos em aberto, a
+# probabilidade de recebimento em cada semana sai de consultas vetorizadas à
+# função de distribuição acumulada da sua entidade, condicionada a ainda não
+# ter sido pago até hoje; o recebimento esperado por semana é a soma de
+# valor x probabilidade. Não há ciclos Python por entidade nem por documento.
+
+ATRASO_MINIMO = -90   # pagamentos antecipados além disto contam como -90
+ATRASO_MAXIMO = 365   # atrasos além disto contam como 365
+PESO_GLOBAL = 5.0
+
+
+def _dias(serie: pd.Series) -> np.ndarray:
+    """Datas (sem NaT) como nº inteiro de dias desde 1970."""
+    return pd.to_datetime(serie, errors="coerce").to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+
+class PrevisaoRecebimentos:
+    def __init__(self, df: pd.DataFrame, hoje=None, coluna_valor: str = "Valor Pendente"):
+        self.hoje = pd.Timestamp(hoje if hoje is not None else pd.Timestamp.today()).normalize()
+        vencimento = pd.to_datetime(df["Data Venc."], errors="coerce")
+        recebimento = pd.to_datetime(df["Data Receb."], errors="coerce")
+        valores = pd.to_numeric(df[coluna_valor], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+        liquidados = (vencimento.notna() & recebimento.notna()).to_numpy()
+        abertos = (vencimento.notna() & recebimento.isna()).to_numpy() & (valores > 0)
+        self.entidades, codigos = np.unique(df["Entidade"].astype(str).to_numpy(), return_inverse=True)
+        n = len(self.entidades)
+        k = ATRASO_MAXIMO - ATRASO_MINIMO + 1
+
+        # histograma de atrasos por entidade: um bincount sobre entidade * k + dia
+        atrasos = _dias(recebimento[liquidados]) - _dias(vencimento[liquidados])
+        posicoes = np.clip(atrasos, ATRASO_MINIMO, ATRASO_MAXIMO) - ATRASO_MINIMO
+        contagens = np.bincount(codigos[liquidados] * k + posicoes, minlength=n * k).reshape(n, k).astype(float)
+        self.liquidados = contagens.sum(axis=1)
+        total = contagens.sum(axis=0)
+        globais = total / total.sum() if total.sum() > 0 else np.full(k, 1.0 / k)
+        probabilidades = (contagens + PESO_GLOBAL * globais) / (self.liquidados + PESO_GLOBAL)[:, None]
+        # P(atraso < x) em _acumulada[:, x - ATRASO_MINIMO] (a coluna 0 é zero)
+        self._acumulada = np.hstack([np.zeros((n, 1)), np.cumsum(probabilidades, axis=1)])
+        self._contagens = contagens
+
+        colunas = [c for c in ["Entidade", "Comercial", "Data Venc."] if c in df.columns]
+        self.abertos = df.loc[abertos, colunas].assign(**{coluna_valor: valores[abertos]})
+        self.coluna_valor = coluna_valor
+        self._codigos_abertos = codigos[abertos]
+        # vencimento em dias relativos a hoje (negativo = já vencido)
+        self._vencimento = _dias(vencimento[abertos]) - dia_inteiro(self.hoje)
+
+    def probabilidades(self, semanas: int) -> np.ndarray:
+        """Matriz documentos em aberto x semanas com P(recebimento na semana | não pago até hoje)."""
+        # fronteiras das semanas em dias desde hoje (0, 7, 14, ...) convertidas em atraso
+        atrasos = 7 * np.arange(semanas + 1)[None, :] - self._vencimento[:, None]
+        colunas = np.clip(atrasos - ATRASO_MINIMO, 0, self._acumulada.shape[1] - 1)
+        acumulada = self._acumulada[self._codigos_abertos[:, None], colunas]
+        # a primeira fronteira é hoje: F nesse ponto é a probabilidade de já ter sido pago
+        restante = 1.0 - acumulada[:, :1]
+        return np.divide(np.diff(acumulada, axis=1), restante, out=np.zeros((len(colunas), semanas)),
+                         where=restante > 1e-12)
+
+    def _mascara(self, filtro: dict = None) -> np.ndarray:
+        mascara = np.ones(len(self.abertos), dtype=bool)
+        for coluna, valores in (filtro or {}).items():
+            if valores:
+                mascara &= self.abertos[coluna].isin(valores).to_numpy()
+        return mascara
+
+    def projecao(self, semanas: int = 12, por: str = None, filtro: dict = None) -> pd.DataFrame:
+        """Recebimento esperado em cada uma das próximas `semanas` semanas.
+
+        `filtro` restringe os documentos em aberto ({coluna: valores}); com `por`
+        ("Comercial" ou "Entidade") há uma linha por semana e grupo.
+        """
+        mascara = self._mascara(filtro)
+        valores = self.abertos[self.coluna_valor].to_numpy()[mascara]
+        esperado = self.probabilidades(semanas)[mascara] * valores[:, None]
+
+        inicios = self.hoje + pd.to_timedelta(7 * np.arange(semanas), unit="D")
+        semanas_df = pd.DataFrame({
+            "Semana": np.arange(1, semanas + 1),
+            "Início": inicios,
+            "Fim": inicios + pd.Timedelta(days=6),
+        })
+        if por is None:
+            semanas_df["Recebimento Esperado"] = esperado.sum(axis=0)
+            semanas_df["Acumulado"] = semanas_df["Recebimento Esperado"].cumsum()
+            return semanas_df
+
+        grupos = self.abertos[por].to_numpy()[mascara]
+        agrupado = pd.DataFrame(esperado, columns=semanas_df["Semana"]).groupby(grupos).sum()
+        agrupado = agrupado.rename_axis(por).reset_index().melt(
+            id_vars=por, var_name="Semana", value_name="Recebimento Esperado"
+        )
+        return semanas_df.merge(agrupado, on="Semana").sort_values(["Semana", por], ignore_index=True)
+
+    def fora_do_horizonte(self, semanas: int = 12, filtro: dict = None) -> float:
+        """Valor em aberto que não se espera receber dentro das `semanas` semanas."""
+        total = self.projecao(semanas, filtro=filtro)["Recebimento Esperado"].sum()
+        return float(self.abertos[self.coluna_valor].to_numpy()[self._mascara(filtro)].sum() - total)
+
+    def perfis(self) -> pd.DataFrame:
+        """Por Entidade: documentos liquidados, atraso médio e mediano (só histórico próprio)."""
+        dias = np.arange(ATRASO_MINIMO, ATRASO_MAXIMO + 1)
+        n = self.liquidados
+        media = np.divide(self._contagens @ dias, n, out=np.full(len(n), np.nan), where=n > 0)
+        acumulada = np.cumsum(self._contagens, axis=1)
+        mediana = np.where(n > 0, dias[np.argmax(acumulada >= (n / 2)[:, None], axis=1)], np.nan)
+        return pd.DataFrame({
+            "Entidade": self.entidades,
+            "Documentos Liquidados": n.astype(int),
+            "Atraso Médio": media,
+            "Atraso Mediano": mediana,
+        })
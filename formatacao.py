@@ -0,0 +1,85 @@
+from io import BytesIO
+
+import pandas as pd
+
+# ====================== FORMATAÇÃO DIFERIDA ======================
+# Os dados ficam sempre numéricos; a formatação só é aplicada ao
+# desenhar (Styler / column_config) ou ao gravar (formato nativo Excel).
+
+
+def formatar_numero_pt(valor, simbolo="", sinal_forcado=False):
+    if pd.isna(valor):
+        return "N/D"
+    valor = float(valor)
+    sinal = "+" if sinal_forcado and valor >= 0 else ("-" if valor < 0 else "")
+    valor_abs = abs(valor)
+    if valor_abs == int(valor_abs):
+        return f"{sinal}{simbolo}{valor_abs:,.0f}".replace(",", " ")
+    else:
+        return f"{sinal}{simbolo}{valor_abs:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+# nome -> formato para Styler ("styler"), st.column_config ("coluna") e Excel ("excel")
+FORMATOS = {
+    "euro": {"styler": "€{:,.2f}", "coluna": "€%.2f", "excel": '"€"#,##0.00'},
+    "euro_pt": {"styler": lambda x: formatar_numero_pt(x, "€ "), "coluna": "€ %.2f", "excel": '"€ "#,##0.00'},
+    "numero_pt": {"styler": formatar_numero_pt, "coluna": "%.2f", "excel": "#,##0.00"},
+    "decimal": {"styler": "{:,.2f}", "coluna": "%.2f", "excel": "#,##0.00"},
+    "inteiro": {"styler": "{:,.0f}", "coluna": "%d", "excel": "#,##0"},
+    # valores em fração (0.25 -> 25,00%)
+    "percentagem": {"styler": "{:.2%}", "coluna": None, "excel": "0.00%"},
+    # valores já em pontos percentuais (25 -> +25,0%)
+    "variacao": {"styler": "{:+.1f}%", "coluna": "%+.1f%%", "excel": '+0.0"%";-0.0"%";0.0"%"'},
+}
+
+
+def formatar_estilo(dados, formatos: dict, na_rep: str = "N/D"):
+    """Aplica os formatos {coluna: nome} a um DataFrame ou Styler, sem alterar os valores."""
+    styler = dados.style if isinstance(dados, pd.DataFrame) else dados
+    colunas = styler.data.columns
+    return styler.format(
+        {col: FORMATOS[nome]["styler"] for col, nome in formatos.items() if col in colunas},
+        na_rep=na_rep
+    )
+
+
+def config_colunas(formatos: dict, **extra) -> dict:
+    """column_config de st.dataframe com os formatos {coluna: nome}."""
+    import streamlit as st
+
+    config = {}
+    for col, nome in formatos.items():
+        formato = FORMATOS[nome]["coluna"]
+        if formato:
+            config[col] = st.column_config.NumberColumn(format=formato)
+    config.update(extra)
+    return config
+
+
+def aplicar_formatos_excel(writer, sheet_name: str, df: pd.DataFrame, formatos: dict, largura: int = None):
+    """Grava formatos numéricos nativos nas colunas já escritas por df.to_excel."""
+    ws = writer.sheets[sheet_name]
+    colunas = [(df.columns.get_loc(col), FORMATOS[nome]["excel"]) for col, nome in formatos.items() if col in df.columns]
+
+    if writer.engine == "xlsxwriter":
+        for idx, num_format in colunas:
+            ws.set_column(idx, idx, largura, writer.book.add_format({"num_format": num_format}))
+        return
+
+    from openpyxl.utils import get_column_letter
+
+    for idx, num_format in colunas:
+        letra = get_column_letter(idx + 1)
+        for (cell,) in ws.iter_rows(min_row=2, max_row=len(df) + 1, min_col=idx + 1, max_col=idx + 1):
+            cell.number_format = num_format
+        if largura:
+            ws.column_dimensions[letra].width = largura
+
+
+def to_excel_formatado(df: pd.DataFrame, formatos: dict = None, sheet_name: str = "Dados", engine: str = "xlsxwriter") -> bytes:
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine=engine) as writer:
+        df.to_excel(writer, index=False, sheet_name=sheet_name)
+        if formatos:
+            aplicar_formatos_excel(writer, sheet_name, df, formatos)
+    return output.getvalue()
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ====================== CUBO DA FROTA ======================
+# As métricas da frota (Combustivel, Portagem, Manutenção, Consumo, Kms_Perc)
+# são agregadas uma vez por carregamento em células (Marca, Matricula, Ano,
+# Mês) com soma, contagem, máximo e as somas/contagens dos valores > 0. Os
+# filtros da página escolhem células do cubo (muito menos linhas do que os
+# dados) e os KPIs por viatura, os gráficos mensais e os resumos da
+# exportação são agregações dessas células: uma tabela por viatura em vez de
+# um filtro + groupby por viatura e por métrica.
+
+METRICAS = ["Combustivel", "Portagem", "Manutenção", "Consumo", "Kms_Perc"]
+DIMENSOES = ["Marca", "Matricula", "Ano", "Mês"]
+# estatísticas guardadas por célula; todas se somam ao agregar, exceto o máximo
+ESTATISTICAS = ["soma", "contagem", "maximo", "positivos", "soma_positivos"]
+
+
+def _media(soma, contagem):
+    return soma / contagem.where(contagem > 0)
+
+
+class CuboFrota:
+    def __init__(self, estatisticas: dict, linhas: pd.Series):
+        """`estatisticas`: {estatística: DataFrame células x métricas}; `linhas`: registos por célula."""
+        self.estatisticas = estatisticas
+        self.linhas = linhas
+        self.metricas = list(estatisticas["soma"].columns)
+
+    @classmethod
+    def de_dados(cls, df: pd.DataFrame) -> "CuboFrota":
+        metricas = [m for m in METRICAS if m in df.columns]
+        valores = df[metricas].apply(pd.to_numeric, errors="coerce")
+        positivos = valores.gt(0)
+        chaves = [df[d] for d in DIMENSOES]
+        grupos = valores.groupby(chaves, observed=True, dropna=False, sort=True)
+        grupos_positivos = valores.where(positivos).groupby(chaves, observed=True, dropna=False, sort=True)
+        return cls({
+            "soma": grupos.sum(),
+            "contagem": grupos.count(),
+            "maximo": grupos.max(),
+            "positivos": grupos_positivos.count(),
+            "soma_positivos": grupos_positivos.sum(),
+        }, grupos.size())
+
+    def filtrar(self, marca=None, matriculas=None, ano=None, mes=None) -> "CuboFrota":
+        """Células dos filtros da página (None / vazio = todos)."""
+        indice = self.linhas.index
+        mascara = np.ones(len(indice), dtype=bool)
+        if marca is not None:
+            mascara &= indice.get_level_values("Marca") == marca
+        if matriculas:
+            mascara &= indice.get_level_values("Matricula").isin(matriculas)
+        if ano is not None:
+            mascara &= indice.get_level_values("Ano") == ano
+        if mes is not None:
+            mascara &= indice.get_level_values("Mês") == mes
+        return CuboFrota({nome: e[mascara] for nome, e in self.estatisticas.items()}, self.linhas[mascara])
+
+    def agregar(self, niveis: list) -> "CuboFrota":
+        """Cubo com as células agrupadas pelos `niveis` de DIMENSOES."""
+        estatisticas = {}
+        for nome, e in self.estatisticas.items():
+            grupos = e.groupby(level=niveis, observed=True, sort=True)
+            estatisticas[nome] = grupos.max() if nome == "maximo" else grupos.sum()
+        return CuboFrota(estatisticas, self.linhas.groupby(level=niveis, observed=True, sort=True).sum())
+
+    def totais(self, niveis: list, metrica: str) -> pd.Series:
+        """Soma de `metrica` por `niveis` (ex.: ["Mês", "Matricula"])."""
+        return self.agregar(niveis).estatisticas["soma"][metrica]
+
+    def resumo(self, metrica: str, por: str = "Matricula") -> pd.DataFrame:
+        """Total, média por registo e nº de registos de `metrica` por `por` (resumos da exportação)."""
+        agregado = self.agregar([por]).estatisticas
+        soma, contagem = agregado["soma"][metrica], agregado["contagem"][metrica]
+        return pd.DataFrame({"sum": soma, "mean": _media(soma, contagem), "count": contagem})
+
+    def kpis_viaturas(self) -> dict:
+        """{métrica: DataFrame com os KPIs de cada Matricula} (uma linha por viatura)."""
+        viatura = self.agregar(["Matricula"]).estatisticas
+        # meses com registos de cada viatura (todos os anos do filtro juntos)
+        mensal = self.agregar(["Matricula", "Mês"]).estatisticas
+        por_viatura_mensal = mensal["soma"].groupby(level="Matricula", observed=True)
+        meses_positivos = (mensal["positivos"] > 0).groupby(level="Matricula", observed=True).sum()
+        return {
+            m: pd.DataFrame({
+                "total": viatura["soma"][m],
+                "media": _media(viatura["soma"][m], viatura["contagem"][m]),
+                "maximo": viatura["maximo"][m],
+                "media_positivos": _media(viatura["soma_positivos"][m], viatura["positivos"][m]),
+                "media_mensal": por_viatura_mensal[m].mean(),
+                "maximo_mensal": por_viatura_mensal[m].max(),
+                "meses_positivos": meses_positivos[m],
+            })
+            for m in self.metricas
+        }
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cubo_frota(_df: pd.DataFrame, versao: str) -> CuboFrota:
+    """Cubo materializado uma vez por versão dos dados (dados_versao)."""
+    return CuboFrota.de_dados(_df)
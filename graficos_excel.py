@@ -0,0 +1,63 @@
+import pandas as pd
+
+# ====================== GRÁFICOS NATIVOS EXCEL ======================
+# Em vez de rasterizar figuras para PNG, as exportações criam gráficos do
+# próprio Excel (xlsxwriter) ligados ao intervalo onde os dados já foram
+# escritos: o ficheiro fica pequeno, gera-se depressa e o gráfico continua
+# editável e atualizado se os valores forem alterados.
+
+
+def adicionar_grafico(workbook, worksheet, df: pd.DataFrame, categorias: str, valores: list,
+                      tipo: str = "column", titulo: str = None, anchor: str = "H2",
+                      linha_cabecalho: int = 0, combinar: str = None,
+                      eixo_x: str = None, eixo_y: str = None, escala: tuple = (1.5, 1.25)):
+    """Insere um gráfico nativo ligado às colunas de `df`.
+
+    `df` tem de ter sido escrito a partir da coluna A com o cabeçalho na linha
+    `linha_cabecalho` (0 = primeira linha). `tipo` é um tipo de gráfico do
+    xlsxwriter ("column", "bar", "line", ...); `combinar="line"` sobrepõe uma
+    linha às mesmas séries. Devolve o gráfico, ou None se não houver dados.
+    """
+    if df.empty:
+        return None
+
+    folha = worksheet.get_name()
+    primeira, ultima = linha_cabecalho + 1, linha_cabecalho + len(df)
+    col_cat = df.columns.get_loc(categorias)
+
+    def series(grafico, tipo_serie):
+        for coluna in valores:
+            col = df.columns.get_loc(coluna)
+            serie = {
+                "name": [folha, linha_cabecalho, col],
+                "categories": [folha, primeira, col_cat, ultima, col_cat],
+                "values": [folha, primeira, col, ultima, col],
+            }
+            if tipo_serie == "line":
+                serie["marker"] = {"type": "circle"}
+            grafico.add_series(serie)
+
+    grafico = workbook.add_chart({"type": tipo})
+    series(grafico, tipo)
+    if combinar:
+        sobreposto = workbook.add_chart({"type": combinar})
+        series(sobreposto, combinar)
+        grafico.combine(sobreposto)
+
+    if titulo:
+        grafico.set_title({"name": titulo})
+    eixo_categorias = {"name": eixo_x} if eixo_x else {}
+    eixo_valores = {"name": eixo_y} if eixo_y else {}
+    if tipo == "bar":
+        # barras horizontais: no xlsxwriter o eixo das categorias é o y e o dos
+        # valores é o x; invertido, o primeiro (maior) fica em cima
+        eixo_categorias["reverse"] = True
+        grafico.set_y_axis(eixo_categorias)
+        grafico.set_x_axis(eixo_valores)
+    else:
+        grafico.set_x_axis(eixo_categorias)
+        grafico.set_y_axis(eixo_valores)
+    grafico.set_legend({"none": True} if len(valores) == 1 and not combinar else {"position": "bottom"})
+
+    worksheet.insert_chart(anchor, grafico, {"x_scale": escala[0], "y_scale": escala[1]})
+    return grafico
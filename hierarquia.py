@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ====================== ÍNDICE HIERÁRQUICO DE FILTROS ======================
+# Para filtros em cascata (Comercial → Categoria → Entidade, ou só Entidade):
+# o frame é ordenado uma vez pelos níveis e, dentro de cada folha, pela
+# coluna numérica dos sliders (Dias). Cada nó da árvore guarda o seu intervalo
+# de linhas [início, fim). As opções de um nível são as chaves dos nós
+# selecionados e os filtros juntam slices contíguos, sem máscaras sobre o
+# frame inteiro; o intervalo do slider resolve-se com searchsorted em cada folha.
+
+
+class IndiceHierarquico:
+    def __init__(self, df: pd.DataFrame, niveis: list, coluna_ordem: str = None):
+        self.niveis = list(niveis)
+        self.coluna_ordem = coluna_ordem
+        chaves = self.niveis + ([coluna_ordem] if coluna_ordem else [])
+        self.df = df.dropna(subset=self.niveis).sort_values(chaves, kind="stable").reset_index(drop=True)
+        self._valores = [self.df[n].to_numpy() for n in self.niveis]
+        self._ordem = self.df[coluna_ordem].to_numpy() if coluna_ordem else None
+        self.raiz = self._construir(0, len(self.df), 0)
+
+    def _construir(self, inicio: int, fim: int, nivel: int) -> dict:
+        no = {"inicio": inicio, "fim": fim, "filhos": {}}
+        if nivel == len(self.niveis) or inicio == fim:
+            return no
+        valores = self._valores[nivel][inicio:fim]
+        cortes = np.flatnonzero(valores[1:] != valores[:-1]) + 1 + inicio
+        for a, b in zip(np.r_[inicio, cortes], np.r_[cortes, fim]):
+            no["filhos"][self._valores[nivel][a]] = self._construir(int(a), int(b), nivel + 1)
+        return no
+
+    def _nos(self, selecao: tuple) -> list:
+        """Nós no fim da `selecao` (por nível: um valor, uma lista ou None = todos)."""
+        nos = [self.raiz]
+        for escolha in selecao:
+            if escolha is None:
+                nos = [f for no in nos for f in no["filhos"].values()]
+            else:
+                escolhas = [escolha] if isinstance(escolha, str) or not hasattr(escolha, "__iter__") else escolha
+                nos = [no["filhos"][e] for no in nos for e in escolhas if e in no["filhos"]]
+        return nos
+
+    def opcoes(self, *selecao) -> list:
+        """Valores disponíveis no nível seguinte à `selecao`, ordenados."""
+        nos = self._nos(selecao)
+        if len(nos) == 1:
+            return list(nos[0]["filhos"])  # já ordenados
+        return sorted(set().union(*(no["filhos"] for no in nos)))
+
+    def _folhas(self, selecao: tuple) -> list:
+        # abaixo da seleção todos os níveis ficam em aberto; cada folha está ordenada por coluna_ordem
+        return self._nos(tuple(selecao) + (None,) * (len(self.niveis) - len(selecao)))
+
+    def _intervalos(self, selecao: tuple, minimo=None, maximo=None) -> list:
+        intervalos = []
+        for folha in self._folhas(selecao):
+            i, j = folha["inicio"], folha["fim"]
+            if self._ordem is not None:
+                valores = self._ordem[i:j]
+                if minimo is not None:
+                    i = folha["inicio"] + int(np.searchsorted(valores, minimo, side="left"))
+                if maximo is not None:
+                    j = folha["inicio"] + int(np.searchsorted(valores, maximo, side="right"))
+            if i < j:
+                if intervalos and intervalos[-1][1] == i:
+                    intervalos[-1] = (intervalos[-1][0], j)  # folhas vizinhas: um só slice
+                else:
+                    intervalos.append((i, j))
+        return intervalos
+
+    def posicoes(self, *selecao, minimo=None, maximo=None) -> np.ndarray:
+        intervalos = self._intervalos(selecao, minimo, maximo)
+        if not intervalos:
+            return np.array([], dtype=int)
+        return np.concatenate([np.arange(i, j) for i, j in intervalos])
+
+    def filtrar(self, *selecao, minimo=None, maximo=None) -> pd.DataFrame:
+        """Linhas da `selecao` com minimo <= coluna_ordem <= maximo."""
+        intervalos = self._intervalos(selecao, minimo, maximo)
+        if len(intervalos) == 1:
+            return self.df.iloc[intervalos[0][0]:intervalos[0][1]]
+        return self.df.iloc[self.posicoes(*selecao, minimo=minimo, maximo=maximo)]
+
+    def limites(self, *selecao) -> tuple:
+        """(mínimo, máximo) de coluna_ordem na `selecao`, lidos nas pontas de cada folha; (None, None) se vazia."""
+        folhas = [f for f in self._folhas(selecao) if f["fim"] > f["inicio"]]
+        if not folhas or self._ordem is None:
+            return None, None
+        return (min(self._ordem[f["inicio"]] for f in folhas),
+                max(self._ordem[f["fim"] - 1] for f in folhas))
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def indice_hierarquico(_df: pd.DataFrame, versao: str, niveis: tuple, coluna_ordem: str = None) -> IndiceHierarquico:
+    """Índice construído uma vez por versão dos dados (dados_versao)."""
+    return IndiceHierarquico(_df, list(niveis), coluna_ordem)
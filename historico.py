@@ -0,0 +1,234 @@
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from antiguidade import ESCALOES_TODOS, codigos_escalao, rotulos
+
+# ====================== HISTÓRICO DE SNAPSHOTS DA CARTEIRA ======================
+# Cada ficheiro de vencimentos (Venc_040725, Venc_1209, V0808, AVencer,
+# VVencidos, ...) é uma fotografia da carteira numa data. O histórico guarda
+# todas num só ficheiro parquet, com uma linha por (documento, data do
+# snapshot) e só as colunas necessárias (categorias + numéricos compactos).
+# Um ficheiro já ingerido não volta a ser lido; as taxas de rolagem entre
+# escalões saem de junções vetorizadas entre snapshots consecutivos.
+#
+#   python historico.py Venc_040725.xlsx Venc_1209.xlsx V0808.xlsx AVencer.xlsx VVencidos.xlsx
+#   python historico.py --rolagem Comercial
+
+FICHEIRO_HISTORICO = "historico_carteira.parquet"
+COLUNAS_DOCUMENTO = ["Entidade", "Documento", "Série", "N.º Doc."]
+# esquema da chave "documento" de cada snapshot: só snapshots com o mesmo
+# esquema se juntam pelo documento; entre esquemas diferentes a junção é pela
+# chave comum "vencimento" (Entidade + Data Venc.)
+ESQUEMA_DOCUMENTO = "documento"
+ESQUEMA_VENCIMENTO = "entidade_vencimento"
+LIQUIDADO = "Liquidado"
+ROTULOS_ESCALOES = rotulos(ESCALOES_TODOS)
+
+
+def data_snapshot(df: pd.DataFrame) -> pd.Timestamp:
+    """Data da fotografia: Dias = data do snapshot - Data Venc. (a mais frequente)."""
+    vencimento = pd.to_datetime(df["Data Venc."], errors="coerce").dt.normalize()
+    dias = pd.to_numeric(df["Dias"], errors="coerce").round()
+    return (vencimento + pd.to_timedelta(dias, unit="D")).mode().iloc[0]
+
+
+def chave_vencimento(df: pd.DataFrame) -> np.ndarray:
+    """Hash de Entidade + Data Venc. (colunas presentes em todos os ficheiros de vencimentos)."""
+    return pd.util.hash_pandas_object(pd.DataFrame({
+        "Entidade": df["Entidade"].astype(str).str.strip(),
+        "Data Venc.": pd.to_datetime(df["Data Venc."], errors="coerce").dt.normalize().astype(str),
+    }), index=False).to_numpy()
+
+
+def chave_documento(df: pd.DataFrame) -> tuple:
+    """(esquema, hash estável do documento); sem colunas de documento usa Entidade + Data Venc."""
+    if all(c in df.columns for c in COLUNAS_DOCUMENTO):
+        return ESQUEMA_DOCUMENTO, pd.util.hash_pandas_object(df[COLUNAS_DOCUMENTO].astype(str), index=False).to_numpy()
+    return ESQUEMA_VENCIMENTO, chave_vencimento(df)
+
+
+def normalizar_snapshot(df: pd.DataFrame, origem: str, data=None) -> pd.DataFrame:
+    """Reduz um ficheiro de vencimentos às colunas do histórico (uma linha por documento)."""
+    df = df.rename(columns=lambda c: str(c).strip())
+    df = df[pd.to_numeric(df["Dias"], errors="coerce").notna()]
+    data = data_snapshot(df) if data is None else pd.Timestamp(data)
+    dias = pd.to_numeric(df["Dias"], errors="coerce").round().astype(np.int32)
+    esquema, documento = chave_documento(df)
+    snapshot = pd.DataFrame({
+        "documento": documento,
+        "vencimento": chave_vencimento(df),
+        "Comercial": df["Comercial"].astype(str).str.strip() if "Comercial" in df.columns else "",
+        "Entidade": df["Entidade"].astype(str).str.strip(),
+        "Dias": dias.to_numpy(),
+        "Valor Pendente": pd.to_numeric(df["Valor Pendente"], errors="coerce").fillna(0).to_numpy(),
+    })
+    # linhas repetidas do mesmo documento (parcelas) somam-se
+    snapshot = (
+        snapshot.groupby("documento", sort=False)
+        .agg({"vencimento": "first", "Comercial": "first", "Entidade": "first", "Dias": "max",
+              "Valor Pendente": "sum"})
+        .reset_index()
+    )
+    snapshot.insert(0, "data_snapshot", data.normalize())
+    snapshot["origem"] = origem
+    snapshot["esquema"] = esquema
+    snapshot["escalao"] = codigos_escalao(snapshot["Dias"], ESCALOES_TODOS)
+    return snapshot
+
+
+def _compactar(df: pd.DataFrame) -> pd.DataFrame:
+    for coluna in ["Comercial", "Entidade", "origem", "esquema"]:
+        df[coluna] = df[coluna].astype("category")
+    df["data_snapshot"] = df["data_snapshot"].astype("datetime64[s]")
+    return df
+
+
+class HistoricoCarteira:
+    def __init__(self, caminho=FICHEIRO_HISTORICO):
+        self.caminho = Path(caminho)
+        if self.caminho.exists():
+            self.df = pd.read_parquet(self.caminho)
+        else:
+            self.df = _compactar(pd.DataFrame({
+                "data_snapshot": pd.Series(dtype="datetime64[s]"),
+                "documento": pd.Series(dtype="uint64"),
+                "vencimento": pd.Series(dtype="uint64"),
+                "Comercial": pd.Series(dtype=object),
+                "Entidade": pd.Series(dtype=object),
+                "Dias": pd.Series(dtype="int32"),
+                "Valor Pendente": pd.Series(dtype=float),
+                "origem": pd.Series(dtype=object),
+                "escalao": pd.Series(dtype="int8"),
+                "esquema": pd.Series(dtype=object),
+            }))
+        if "esquema" not in self.df.columns:
+            # histórico anterior aos esquemas de chave: sem junções entre esquemas
+            self.df["vencimento"] = np.zeros(len(self.df), dtype="uint64")
+            self.df["esquema"] = pd.Categorical([""] * len(self.df))
+
+    def origens(self) -> set:
+        return set(self.df["origem"].astype(str).unique())
+
+    def datas(self) -> list:
+        return sorted(self.df["data_snapshot"].unique())
+
+    def ingerir(self, ficheiros: list, forcar: bool = False) -> list:
+        """Acrescenta os ficheiros ainda não ingeridos; devolve os que foram lidos."""
+        novos = []
+        for ficheiro in map(Path, ficheiros):
+            if not forcar and ficheiro.name in self.origens():
+                continue
+            novos.append(normalizar_snapshot(pd.read_excel(ficheiro, sheet_name=0), ficheiro.name))
+        if not novos:
+            return []
+        df = pd.concat([self.df.astype({c: "object" for c in ["Comercial", "Entidade", "origem", "esquema"]}), *novos],
+                       ignore_index=True)
+        # a mesma fotografia lida duas vezes (ou dois ficheiros com a mesma data) não duplica linhas
+        df = df.drop_duplicates(["documento", "data_snapshot"], keep="last")
+        self.df = _compactar(df.sort_values(["data_snapshot", "documento"], kind="stable").reset_index(drop=True))
+        self.df.to_parquet(self.caminho, index=False)
+        return [str(n["origem"].iloc[0]) for n in novos if len(n)]
+
+    def snapshot(self, data) -> pd.DataFrame:
+        data = pd.Timestamp(data)
+        datas = self.df["data_snapshot"].to_numpy()
+        i, j = np.searchsorted(datas, [np.datetime64(data, "s"), np.datetime64(data + pd.Timedelta(days=1), "s")])
+        return self.df.iloc[i:j]
+
+    def _chave_juncao(self, a: pd.DataFrame, b: pd.DataFrame):
+        """Coluna por onde juntar a e b: o documento se os dois snapshots usam o mesmo esquema."""
+        esquemas = set(a["esquema"].astype(str)) | set(b["esquema"].astype(str))
+        if len(esquemas) == 1:
+            return "documento"
+        return None if "" in esquemas else "vencimento"
+
+    def rolagem(self, por: str = None, inicio=None, fim=None) -> pd.DataFrame:
+        """Valor que passa de cada escalão (snapshot anterior) para cada escalão do seguinte.
+
+        Documentos que desaparecem no snapshot seguinte contam como "Liquidado".
+        Snapshots com esquemas de chave diferentes (ex.: VVencidos, sem colunas
+        de documento) juntam-se por Entidade + Data Venc. Valores negativos
+        (notas de crédito) ficam de fora: ver creditos().
+        Com `por` ("Comercial" ou "Entidade") a matriz é calculada por grupo.
+        """
+        datas = [d for d in self.datas()
+                 if (inicio is None or d >= pd.Timestamp(inicio)) and (fim is None or d <= pd.Timestamp(fim))]
+        transicoes = []
+        for anterior, seguinte in zip(datas, datas[1:]):
+            a = self.snapshot(anterior)
+            b = self.snapshot(seguinte)
+            chave = self._chave_juncao(a, b)
+            if chave is None:
+                continue
+            # na chave comum vários documentos partilham a mesma chave (e o mesmo escalão)
+            destino = b.drop_duplicates(chave)
+            pos = pd.Index(destino[chave]).get_indexer(a[chave])
+            para = np.where(pos >= 0, destino["escalao"].to_numpy()[np.maximum(pos, 0)], len(ROTULOS_ESCALOES))
+            transicoes.append(pd.DataFrame({
+                "De Snapshot": anterior,
+                "Para Snapshot": seguinte,
+                "De": a["escalao"].to_numpy(),
+                "Para": para,
+                "Valor Pendente": a["Valor Pendente"].to_numpy(),
+                **({por: a[por].astype(str).to_numpy()} if por else {}),
+            }))
+        chaves = ["De Snapshot", "Para Snapshot", *([por] if por else []), "De", "Para"]
+        if not transicoes:
+            return pd.DataFrame(columns=[*chaves, "Valor Pendente", "Taxa"])
+
+        movimentos = pd.concat(transicoes, ignore_index=True)
+        movimentos = movimentos[(movimentos["De"] >= 0) & (movimentos["Valor Pendente"] > 0)]
+        matriz = movimentos.groupby(chaves, sort=True)["Valor Pendente"].sum().reset_index()
+        origem = matriz.groupby(chaves[:-1])["Valor Pendente"].transform("sum")
+        matriz["Taxa"] = np.divide(matriz["Valor Pendente"], origem, out=np.zeros(len(matriz)), where=origem != 0)
+        categorias = [*ROTULOS_ESCALOES, LIQUIDADO]
+        for coluna in ["De", "Para"]:
+            matriz[coluna] = pd.Categorical.from_codes(matriz[coluna], categories=categorias, ordered=True)
+        return matriz
+
+    def creditos(self, por: str = None) -> pd.DataFrame:
+        """Notas de crédito (Valor Pendente < 0) por snapshot, excluídas da rolagem."""
+        negativos = self.df[self.df["Valor Pendente"] < 0]
+        chaves = ["data_snapshot", *([por] if por else [])]
+        return (negativos.groupby(chaves, observed=True)["Valor Pendente"]
+                .agg(["count", "sum"]).rename(columns={"count": "Documentos", "sum": "Valor Pendente"})
+                .reset_index())
+
+    def matriz_rolagem(self, anterior, seguinte, valores: str = "Taxa") -> pd.DataFrame:
+        """Matriz De x Para (taxas ou valores) entre dois snapshots."""
+        rolagem = self.rolagem(inicio=anterior, fim=seguinte)
+        rolagem = rolagem[rolagem["De Snapshot"] == pd.Timestamp(anterior)]
+        return rolagem.pivot_table(index="De", columns="Para", values=valores, aggfunc="sum",
+                                   fill_value=0, observed=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Ingere snapshots de vencimentos no histórico e calcula taxas de rolagem.")
+    parser.add_argument("ficheiros", nargs="*", help="ficheiros .xlsx de vencimentos a ingerir")
+    parser.add_argument("--historico", default=FICHEIRO_HISTORICO, help="ficheiro parquet do histórico")
+    parser.add_argument("--forcar", action="store_true", help="reingerir ficheiros já presentes")
+    parser.add_argument("--rolagem", choices=["total", "Comercial", "Entidade"], help="mostrar as taxas de rolagem")
+    args = parser.parse_args(argv)
+
+    historico = HistoricoCarteira(args.historico)
+    for origem in historico.ingerir(args.ficheiros, forcar=args.forcar):
+        print(f"✔ {origem}")
+    print(f"{len(historico.df):,} linhas · snapshots: "
+          + ", ".join(pd.Timestamp(d).strftime("%d/%m/%Y") for d in historico.datas()))
+    if args.rolagem:
+        rolagem = historico.rolagem(por=None if args.rolagem == "total" else args.rolagem)
+        with pd.option_context("display.max_rows", 200, "display.width", 160):
+            print(rolagem.to_string(index=False))
+            creditos = historico.creditos(por=None if args.rolagem == "total" else args.rolagem)
+            if len(creditos):
+                print("\nNotas de crédito (fora da rolagem):")
+                print(creditos.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
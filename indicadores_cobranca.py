@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+from vencimentos import dia_inteiro
+
+# ====================== INDICADORES DE COBRANÇA ======================
+# DSO, atraso médio ponderado e taxa de pontualidade por Entidade, Comercial
+# ou carteira total, em janelas móveis (últimos 30/90/180/365 dias).
+#
+# Cada documento gera eventos datados: faturação (Data Doc.), liquidação
+# (Data Receb.) e saldo em aberto (+valor na emissão, -valor no recebimento).
+# Os eventos são ordenados uma vez por (grupo, dia) com uma chave inteira
+# grupo * S + dia e acumulados com cumsum. Qualquer soma de um grupo numa
+# janela (t - W, t] é então a diferença de dois acumulados localizados por
+# searchsorted, para todos os grupos e datas de fim de uma só vez.
+#
+#   DSO = saldo em aberto em t / faturado na janela x W
+#   Atraso médio ponderado = Σ valor x max(0, Receb. - Venc.) / Σ valor (liquidados na janela)
+#   Taxa de pontualidade = documentos pagos até ao vencimento / documentos liquidados na janela
+
+JANELAS = (30, 90, 180, 365)
+NIVEIS = ("Entidade", "Comercial")
+
+
+class _Eventos:
+    """Somas acumuladas de várias grandezas, por (grupo, dia)."""
+
+    def __init__(self, codigos: np.ndarray, dias: np.ndarray, escala: int, **grandezas):
+        chaves = codigos.astype(np.int64) * escala + dias
+        ordem = np.argsort(chaves, kind="stable")
+        self.escala = escala
+        self.chaves = chaves[ordem]
+        self.acumulados = {
+            nome: np.r_[0.0, np.cumsum(np.asarray(valores, dtype=float)[ordem])]
+            for nome, valores in grandezas.items()
+        }
+
+    def ate(self, nome: str, codigos: np.ndarray, dias: np.ndarray) -> np.ndarray:
+        """Soma de `nome` no grupo até ao dia (inclusive); `codigos` e `dias` fazem broadcast."""
+        acumulado = self.acumulados[nome]
+        dias = np.clip(dias, -1, self.escala - 2)
+        # o acumulado até ao fim do grupo anterior (chave grupo * S - 1) é descontado
+        fim = np.searchsorted(self.chaves, codigos * self.escala + dias, side="right")
+        inicio = np.searchsorted(self.chaves, codigos * self.escala - 1, side="right")
+        return acumulado[fim] - acumulado[inicio]
+
+    def janela(self, nome: str, codigos: np.ndarray, dias: np.ndarray, largura: int) -> np.ndarray:
+        """Soma de `nome` em (dia - largura, dia]."""
+        return self.ate(nome, codigos, dias) - self.ate(nome, codigos, dias - largura)
+
+
+class IndicadoresCobranca:
+    def __init__(self, df: pd.DataFrame, hoje=None, coluna_valor: str = None):
+        """`coluna_valor`: valor do documento; por omissão "Valor Total" (ou "Valor Pendente", se não existir)."""
+        if coluna_valor is None:
+            coluna_valor = "Valor Total" if "Valor Total" in df.columns else "Valor Pendente"
+        self.coluna_valor = coluna_valor
+        self.hoje = pd.Timestamp(hoje if hoje is not None else pd.Timestamp.today()).normalize()
+        datas = {c: pd.to_datetime(df[c], errors="coerce").to_numpy(dtype="datetime64[D]")
+                 for c in ["Data Doc.", "Data Venc.", "Data Receb."]}
+        validas = {c: ~np.isnat(d) for c, d in datas.items()}
+        # dias contados a partir do primeiro dia com dados (chaves sempre >= 0)
+        todas = np.concatenate([d[validas[c]] for c, d in datas.items()])
+        self.origem = todas.min() if len(todas) else np.datetime64(self.hoje.date(), "D")
+        dias = {c: np.where(validas[c], (d - self.origem).astype(np.int64), 0) for c, d in datas.items()}
+        # S: maior dia possível + 2 (o dia -1 de cada grupo fica livre para o desconto)
+        self._escala = max(int(max(d.max(initial=0) for d in dias.values())), self._dia(self.hoje)) + 2
+        valores = pd.to_numeric(df[coluna_valor], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+        emitidos = validas["Data Doc."]
+        liquidados = validas["Data Receb."] & validas["Data Venc."]
+        atraso = dias["Data Receb."] - dias["Data Venc."]
+        self._grupos = {}
+        for nivel in (None, *NIVEIS):
+            if nivel is not None and nivel not in df.columns:
+                continue
+            rotulos_grupo, codigos = (
+                np.unique(df[nivel].astype(str).to_numpy(), return_inverse=True) if nivel
+                else (np.array(["Total"]), np.zeros(len(df), dtype=np.int64))
+            )
+            recebidos = emitidos & validas["Data Receb."]
+            self._grupos[nivel] = (rotulos_grupo, {
+                "faturacao": _Eventos(codigos[emitidos], dias["Data Doc."][emitidos], self._escala,
+                                      faturado=valores[emitidos]),
+                "liquidacao": _Eventos(
+                    codigos[liquidados], dias["Data Receb."][liquidados], self._escala,
+                    valor=valores[liquidados],
+                    valor_atraso=valores[liquidados] * np.maximum(atraso[liquidados], 0),
+                    documentos=np.ones(liquidados.sum()),
+                    pontuais=(atraso[liquidados] <= 0),
+                ),
+                "saldo": _Eventos(
+                    np.r_[codigos[emitidos], codigos[recebidos]],
+                    np.r_[dias["Data Doc."][emitidos], dias["Data Receb."][recebidos]],
+                    self._escala,
+                    saldo=np.r_[valores[emitidos], -valores[recebidos]],
+                ),
+            })
+
+    def _dia(self, data) -> int:
+        return dia_inteiro(data) - int(self.origem.astype(np.int64))
+
+    def _calcular(self, por: str, fins: np.ndarray, janela: int) -> tuple:
+        """Arrays grupos x datas de fim com as grandezas de cada janela."""
+        rotulos_grupo, eventos = self._grupos[por]
+        codigos = np.arange(len(rotulos_grupo))[:, None]
+        fins = fins[None, :]
+        faturado = eventos["faturacao"].janela("faturado", codigos, fins, janela)
+        saldo = eventos["saldo"].ate("saldo", codigos, fins)
+        liquidacao = {nome: eventos["liquidacao"].janela(nome, codigos, fins, janela)
+                      for nome in ["valor", "valor_atraso", "documentos", "pontuais"]}
+        return rotulos_grupo, {
+            "Faturado": faturado,
+            "Em Aberto": saldo,
+            "DSO": np.divide(saldo * janela, faturado, out=np.full(saldo.shape, np.nan), where=faturado > 0),
+            "Liquidados": liquidacao["documentos"].astype(int),
+            "Valor Liquidado": liquidacao["valor"],
+            "Atraso Médio Ponderado": np.divide(liquidacao["valor_atraso"], liquidacao["valor"],
+                                                out=np.full(saldo.shape, np.nan), where=liquidacao["valor"] > 0),
+            "Taxa Pontualidade": np.divide(liquidacao["pontuais"], liquidacao["documentos"],
+                                           out=np.full(saldo.shape, np.nan), where=liquidacao["documentos"] > 0),
+        }
+
+    def metricas(self, por: str = "Entidade", janelas=JANELAS, fim=None) -> pd.DataFrame:
+        """Uma linha por grupo e janela (em dias) a terminar em `fim` (por omissão, hoje)."""
+        fim = self.hoje if fim is None else pd.Timestamp(fim)
+        partes = []
+        for janela in janelas:
+            rotulos_grupo, valores = self._calcular(por, np.array([self._dia(fim)]), janela)
+            partes.append(pd.DataFrame({
+                por or "Grupo": rotulos_grupo,
+                "Janela (dias)": janela,
+                **{nome: v[:, 0] for nome, v in valores.items()},
+            }))
+        return pd.concat(partes, ignore_index=True)
+
+    def serie(self, por: str = None, janela: int = 90, meses: int = 12) -> pd.DataFrame:
+        """Indicadores com janela móvel de `janela` dias, a terminar hoje e em cada um dos `meses` - 1 meses anteriores."""
+        fins = pd.date_range(end=self.hoje, periods=meses, freq=pd.DateOffset(months=1))
+        dias = np.array([self._dia(f) for f in fins])
+        rotulos_grupo, valores = self._calcular(por, dias, janela)
+        return pd.DataFrame({
+            por or "Grupo": np.repeat(rotulos_grupo, len(fins)),
+            "Data": np.tile(fins, len(rotulos_grupo)),
+            **{nome: v.ravel() for nome, v in valores.items()},
+        })
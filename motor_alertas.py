@@ -0,0 +1,110 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ====================== MOTOR DE ALERTAS INCREMENTAL ======================
+# Cada regra guarda estado por entidade (cliente, artigo, cliente/artigo...):
+# uma impressão digital das suas linhas de entrada e os alertas ativos.
+# Quando chegam dados novos só as entidades cujas linhas mudaram são
+# reavaliadas; o resultado é comparado com o estado anterior e sai em três
+# tabelas: novos, resolvidos e ativos. Detetar as entidades alteradas custa um
+# hash vetorizado das linhas (saltado se a versão dos dados não mudou); a
+# regra em si só corre sobre as linhas dessas entidades.
+
+SEM_ALERTA = ""
+
+
+def _hash_linhas(df: pd.DataFrame, colunas: list) -> np.ndarray:
+    return pd.util.hash_pandas_object(df[colunas], index=False).to_numpy()
+
+
+class MotorAlertas:
+    def __init__(self, chave: list, avaliar, colunas: list = None, identidade: list = None):
+        """`avaliar(linhas, contexto)` recebe as linhas das entidades alteradas e devolve
+        um DataFrame com as colunas `chave`, "Tipo" ("" = sem alerta) e métricas.
+
+        `colunas` são as colunas de entrada de que a regra depende (por omissão
+        todas); `identidade` são as colunas que, além da chave, distinguem dois
+        alertas da mesma entidade (por omissão só "Tipo").
+        """
+        self.chave = list(chave)
+        self.avaliar = avaliar
+        self.colunas = colunas
+        self.identidade = list(identidade or ["Tipo"])
+        self._lock = threading.Lock()
+        self._limpar()
+
+    def _limpar(self, contexto=None):
+        self.contexto = contexto
+        self.versao = None
+        self.impressoes = pd.Series(dtype="uint64")
+        self.ativos = pd.DataFrame(columns=[*self.chave, *self.identidade])
+        self.ultimo = {"novos": self.ativos, "resolvidos": self.ativos, "ativos": self.ativos}
+
+    def _ids(self, df: pd.DataFrame) -> np.ndarray:
+        return _hash_linhas(df, self.chave)
+
+    def _impressoes(self, df: pd.DataFrame, colunas: list) -> pd.Series:
+        # soma (mod 2^64) dos hashes das linhas: não depende da ordem das linhas
+        return pd.Series(_hash_linhas(df, colunas)).groupby(self._ids(df)).sum()
+
+    def _id_alertas(self, alertas: pd.DataFrame) -> np.ndarray:
+        return _hash_linhas(alertas, self.chave + self.identidade)
+
+    def atualizar(self, df: pd.DataFrame, contexto=None, versao: str = None) -> dict:
+        """Reavalia só as entidades alteradas e devolve {"novos", "resolvidos", "ativos"}.
+
+        Mudar `contexto` (por ex. o mês em análise) recomeça o estado; com a
+        mesma `versao` dos dados (dados_versao) devolve o último resultado sem reavaliar.
+        """
+        with self._lock:
+            if contexto != self.contexto:
+                self._limpar(contexto)
+            if versao is not None and versao == self.versao:
+                return self.ultimo
+            self.versao = versao
+
+            atuais = self._impressoes(df, self.colunas or list(df.columns))
+            anteriores = self.impressoes.reindex(atuais.index)
+            alteradas = atuais.index[anteriores.isna().to_numpy() | (anteriores.to_numpy() != atuais.to_numpy())]
+            removidas = self.impressoes.index.difference(atuais.index)
+            self.impressoes = atuais
+
+            if len(alteradas):
+                linhas = df[np.isin(self._ids(df), alteradas.to_numpy())]
+                resultado = self.avaliar(linhas, self.contexto)
+                resultado = resultado[resultado["Tipo"] != SEM_ALERTA]
+            else:
+                resultado = pd.DataFrame(columns=[*self.chave, *self.identidade])
+
+            tocadas = alteradas.union(removidas).to_numpy()
+            if self.ativos.empty:
+                anteriores = self.ativos
+                mantidos = self.ativos
+            else:
+                afetados = np.isin(self._ids(self.ativos), tocadas)
+                anteriores = self.ativos[afetados]
+                mantidos = self.ativos[~afetados]
+
+            id_novos = self._id_alertas(resultado) if len(resultado) else np.array([], dtype="uint64")
+            id_anteriores = self._id_alertas(anteriores) if len(anteriores) else np.array([], dtype="uint64")
+            novos = resultado[~np.isin(id_novos, id_anteriores)]
+            resolvidos = anteriores[~np.isin(id_anteriores, id_novos)]
+            partes = [p for p in (mantidos, resultado) if len(p)]
+            self.ativos = pd.concat(partes, ignore_index=True) if partes else resultado.iloc[0:0]
+            self.ultimo = {
+                "novos": novos.reset_index(drop=True),
+                "resolvidos": resolvidos.reset_index(drop=True),
+                "ativos": self.ativos,
+            }
+            return self.ultimo
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def motor_alertas(nome: str, chave: tuple, _avaliar, colunas: tuple = None, identidade: tuple = None) -> MotorAlertas:
+    """Motor partilhado entre reruns e sessões, identificado por `nome` (incluir nele o contexto,
+    ex. o período, para que sessões com seleções diferentes não partilhem estado)."""
+    return MotorAlertas(list(chave), _avaliar, list(colunas) if colunas else None,
+                        list(identidade) if identidade else None)
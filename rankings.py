@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ====================== RANKINGS TOP-N / BOTTOM-N ======================
+# Um único groupby agrega todas as medidas por (partição, entidade); a seleção
+# do top-k/bottom-k de cada partição usa np.argpartition (seleção parcial,
+# O(n)) em vez de ordenar o agregado inteiro.
+
+
+def _selecionar(valores: np.ndarray, k: int, maiores: bool) -> np.ndarray:
+    """Posições dos k maiores (ou menores) valores, já ordenadas."""
+    n = len(valores)
+    if n == 0:
+        return np.array([], dtype=int)
+    chave = -valores if maiores else valores
+    if k < n:
+        idx = np.argpartition(chave, k - 1)[:k]
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(chave[idx], kind="stable")]
+
+
+def calcular_rankings(df: pd.DataFrame, entidade: str, medidas: list, particao: str = None,
+                      k: int = 10, bottom: bool = False) -> dict:
+    """Top-k (e opcionalmente bottom-k) por partição para várias medidas.
+
+    Devolve {"agregado": DataFrame, "top": {medida: DataFrame}, "bottom": {medida: DataFrame}}.
+    """
+    chaves = [particao, entidade] if particao else [entidade]
+    agregado = df.groupby(chaves, observed=True)[medidas].sum().reset_index()
+
+    if particao:
+        grupos = list(agregado.groupby(particao, observed=True, sort=True).indices.values())
+    else:
+        grupos = [np.arange(len(agregado))]
+
+    resultado = {"agregado": agregado, "top": {}, "bottom": {}}
+    sentidos = [("top", True)] + ([("bottom", False)] if bottom else [])
+    for medida in medidas:
+        valores = agregado[medida].to_numpy(dtype=float)
+        for nome, maiores in sentidos:
+            linhas = [g[_selecionar(valores[g], k, maiores)] for g in grupos]
+            linhas = np.concatenate(linhas) if linhas else np.array([], dtype=int)
+            resultado[nome][medida] = agregado.iloc[linhas].reset_index(drop=True)
+    return resultado
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def rankings_em_cache(_df: pd.DataFrame, versao: str, filtros: tuple, entidade: str, medidas: tuple,
+                      particao: str = None, k: int = 10, bottom: bool = False) -> dict:
+    """calcular_rankings memorizado por (versão dos dados, estado dos filtros, parâmetros)."""
+    return calcular_rankings(_df, entidade, list(medidas), particao, k, bottom)
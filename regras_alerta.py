@@ -0,0 +1,125 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ====================== TABELAS DE REGRAS ======================
+# Cada tabela é uma lista ordenada de bandas: a primeira regra cujas
+# condições sejam todas verdadeiras define o rótulo (np.select).
+# Uma regra com "quando" vazio funciona como valor por omissão.
+# As condições referem-se a nomes lógicos ("variacao", "anterior", ...)
+# que cada dashboard associa às suas colunas no momento da classificação.
+#
+# Para alterar limiares sem mexer no código basta criar
+# diagnosticos/regras_alerta.json com as tabelas a substituir, por ex.:
+#   {"variacao_significativa": [{"rotulo": "Aumento", "quando": {"variacao": {"gt": 80}}}, ...]}
+
+REGRAS_PATH = Path("diagnosticos/regras_alerta.json")
+
+REGRAS_PADRAO = {
+    # Variação entre os dois últimos meses por cliente
+    "variacao_mensal": [
+        {"rotulo": "Novo Cliente", "icone": "🟢", "cor": "#e8f5e8",
+         "quando": {"anterior": {"eq": 0}, "atual": {"gt": 0}}},
+        {"rotulo": "Parou de Comprar", "icone": "🔴", "cor": "#ffe6e6",
+         "quando": {"anterior": {"gt": 0}, "atual": {"eq": 0}}},
+        {"rotulo": "Subida Forte", "icone": "🟢", "cor": "#e8f5e8",
+         "quando": {"variacao": {"gt": 50}}},
+        {"rotulo": "Subida Moderada", "icone": "🟡", "cor": "#fff3e0",
+         "quando": {"variacao": {"gt": 20}}},
+        {"rotulo": "Descida Forte", "icone": "🔴", "cor": "#ffe6e6",
+         "quando": {"variacao": {"lt": -50}}},
+        {"rotulo": "Descida Moderada", "icone": "🟠", "cor": "#fbe9e7",
+         "quando": {"variacao": {"lt": -20}}},
+        {"rotulo": "Subida Leve", "icone": "🔵", "cor": "",
+         "quando": {"variacao": {"gt": 0}}},
+        {"rotulo": "Descida Leve", "icone": "⚫", "cor": "",
+         "quando": {"variacao": {"lt": 0}}},
+        {"rotulo": "Estável", "icone": "⚪", "cor": "", "quando": {}},
+    ],
+    # Variações significativas (CliArtComp, VendasGlobais)
+    "variacao_significativa": [
+        {"rotulo": "Aumento", "icone": "↑", "cor": "#C6EFCE", "classe": "alert-success",
+         "quando": {"variacao": {"gt": 50}}},
+        {"rotulo": "Redução", "icone": "↓", "cor": "#FFC7CE", "classe": "alert-error",
+         "quando": {"variacao": {"lt": -50}}},
+    ],
+    # Crescimento ano a ano (Bolama)
+    "crescimento": [
+        {"rotulo": "Sem dados", "cor": "#D9D9D9", "fonte": "#404040",
+         "quando": {"variacao": {"isna": True}}},
+        {"rotulo": "Descida", "cor": "#FFC7CE", "fonte": "#9C0006",
+         "quando": {"variacao": {"lt": 0}}},
+        {"rotulo": "Estável", "cor": "#FFEB9C", "fonte": "#9C6500",
+         "quando": {"variacao": {"eq": 0}}},
+        {"rotulo": "Subida", "cor": "#C6EFCE", "fonte": "#006100",
+         "quando": {"variacao": {"gt": 0}}},
+    ],
+}
+
+_OPERADORES = {
+    "gt": lambda v, x: v > x,
+    "ge": lambda v, x: v >= x,
+    "lt": lambda v, x: v < x,
+    "le": lambda v, x: v <= x,
+    "eq": lambda v, x: v == x,
+    "ne": lambda v, x: v != x,
+    "isna": lambda v, x: np.isnan(v) if x else ~np.isnan(v),
+}
+
+
+def carregar_regras(nome: str) -> list:
+    """Devolve a tabela de regras `nome`, com prioridade para o ficheiro JSON."""
+    if REGRAS_PATH.exists():
+        try:
+            with open(REGRAS_PATH, "r", encoding="utf-8") as f:
+                personalizadas = json.load(f)
+            if nome in personalizadas:
+                return personalizadas[nome]
+        except (OSError, ValueError):
+            pass
+    return REGRAS_PADRAO[nome]
+
+
+def _mascara(regra: dict, valores: dict, n: int) -> np.ndarray:
+    mascara = np.ones(n, dtype=bool)
+    for campo, condicoes in regra.get("quando", {}).items():
+        v = valores[campo]
+        with np.errstate(invalid="ignore"):
+            for op, limite in condicoes.items():
+                mascara &= _OPERADORES[op](v, limite)
+    return mascara
+
+
+def avaliar_regras(regras: list, valores: dict, atributo: str = "rotulo", padrao="") -> np.ndarray:
+    """Avalia as regras sobre colunas inteiras e devolve o `atributo` da primeira banda válida."""
+    valores = {k: np.asarray(v, dtype=float) for k, v in valores.items()}
+    n = len(next(iter(valores.values()))) if valores else 0
+    condicoes = [_mascara(r, valores, n) for r in regras]
+    escolhas = [r.get(atributo, padrao) for r in regras]
+    if not condicoes:
+        return np.full(n, padrao, dtype=object)
+    return np.select(condicoes, escolhas, default=padrao)
+
+
+def classificar(df: pd.DataFrame, nome: str, colunas: dict, com_icone: bool = False) -> pd.Series:
+    """Classifica todas as linhas de `df` com a tabela `nome`.
+
+    `colunas` associa os nomes lógicos das regras às colunas de `df`,
+    por ex. {"variacao": "Variacao_%", "anterior": "Qtd_Anterior"}.
+    """
+    regras = carregar_regras(nome)
+    valores = {campo: df[coluna].to_numpy() for campo, coluna in colunas.items()}
+    if com_icone:
+        regras = [dict(r, rotulo=f"{r['icone']} {r['rotulo']}" if r.get("icone") else r["rotulo"]) for r in regras]
+    return pd.Series(avaliar_regras(regras, valores), index=df.index, dtype=object)
+
+
+def atributos_por_rotulo(nome: str, atributo: str = "cor", com_icone: bool = False) -> dict:
+    """Mapa rótulo -> atributo (cor, classe CSS, ...) para estilos e legendas."""
+    mapa = {}
+    for r in carregar_regras(nome):
+        rotulo = f"{r['icone']} {r['rotulo']}" if com_icone and r.get("icone") else r["rotulo"]
+        mapa[rotulo] = r.get(atributo, "")
+    return mapa
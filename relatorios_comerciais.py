@@ -0,0 +1,138 @@
+import argparse
+import html
+import re
+import sys
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from antiguidade import resumo_escaloes
+from carteira import URL_V0808, CarteiraRecebiveis, carregar_v0808
+from formatacao import aplicar_formatos_excel
+
+# ====================== RELATÓRIOS POR COMERCIAL (BATCH) ======================
+# Substitui as N sessões interativas (PFonseca, BBrito, MMiranda, VSilva,
+# RenatoF, RSilva, PCostaMobile): lê o V0808 uma vez, parte-o por Comercial
+# (carteira.CarteiraRecebiveis) e escreve os relatórios Excel/HTML de cada comercial em processos paralelos.
+#
+#   python relatorios_comerciais.py --pasta relatorios
+#   python relatorios_comerciais.py --origem V0808.xlsx --formatos xlsx --comercial "Bruno Brito"
+
+# "Por vencer nos próximos 20 dias" (Dias negativos = ainda não venceu)
+POR_VENCER = (-20, -1)
+
+COLUNAS_RELATORIO = ["Entidade", "Documento", "Data Venc.", "Dias", "Valor Pendente", "Categoria"]
+FORMATOS_EXCEL = {"Valor Pendente": "euro", "Dias": "inteiro", "Quantidade": "inteiro", "Dias Médios": "decimal"}
+
+
+def por_vencer(df: pd.DataFrame) -> pd.DataFrame:
+    minimo, maximo = POR_VENCER
+    return df[df["Dias"].between(minimo, maximo)].sort_values("Dias", ascending=False)
+
+
+def nome_ficheiro(comercial: str) -> str:
+    sem_acentos = unicodedata.normalize("NFKD", comercial).encode("ascii", "ignore").decode()
+    return re.sub(r"[^A-Za-z0-9]+", "_", sem_acentos).strip("_") or "sem_comercial"
+
+
+def escrever_excel(caminho: Path, dados: pd.DataFrame, resumo: pd.DataFrame, a_vencer: pd.DataFrame):
+    with pd.ExcelWriter(caminho, engine="xlsxwriter",
+                        datetime_format="dd/mm/yyyy", date_format="dd/mm/yyyy") as writer:
+        for sheet_name, tabela in [("Resumo", resumo), ("Dados Filtrados", dados), ("Por Vencer 20 Dias", a_vencer)]:
+            tabela.to_excel(writer, index=False, sheet_name=sheet_name)
+            writer.sheets[sheet_name].set_column(0, len(tabela.columns) - 1, 18)
+            aplicar_formatos_excel(writer, sheet_name, tabela, FORMATOS_EXCEL, largura=18)
+
+
+def escrever_html(caminho: Path, comercial: str, dados: pd.DataFrame, resumo: pd.DataFrame, a_vencer: pd.DataFrame):
+    formatadores = {
+        "Valor Pendente": lambda v: f"€{v:,.2f}",
+        "Dias Médios": lambda v: f"{v:.1f}",
+        "Data Venc.": lambda v: v.strftime("%d/%m/%Y") if pd.notna(v) else "",
+    }
+
+    def tabela(df):
+        return df.to_html(index=False, border=0, classes="tabela", na_rep="",
+                          formatters={c: f for c, f in formatadores.items() if c in df.columns})
+
+    titulo = html.escape(comercial)
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(f"""<!DOCTYPE html>
+<html lang="pt"><head><meta charset="utf-8"><title>Vencimentos {titulo}</title>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 2rem; color: #333; }}
+h1 {{ color: #764ba2; }}
+.tabela {{ border-collapse: collapse; width: 100%; margin-bottom: 2rem; }}
+.tabela th {{ background: #667eea; color: white; padding: 6px; text-align: left; }}
+.tabela td {{ border-bottom: 1px solid #e0e0e0; padding: 6px; }}
+</style></head><body>
+<h1>📊 Vencimentos {titulo}</h1>
+<p>Gerado em {datetime.now().strftime("%d/%m/%Y %H:%M")} · {len(dados)} registos ·
+Valor pendente total €{dados["Valor Pendente"].sum():,.2f}</p>
+<h2>📋 Resumo por Intervalos</h2>
+""")
+        f.write(tabela(resumo))
+        f.write("<h2>📉 Por Vencer nos Próximos 20 Dias</h2>\n")
+        f.write(tabela(a_vencer))
+        f.write("<h2>📁 Documentos</h2>\n")
+        f.write(tabela(dados))
+        f.write("</body></html>\n")
+
+
+def gerar_relatorios(comercial: str, dados: pd.DataFrame, pasta: Path, formatos: tuple) -> list:
+    """Escreve os relatórios de um comercial; corre num processo do pool."""
+    dados = dados[[c for c in COLUNAS_RELATORIO if c in dados.columns]].sort_values("Dias", ascending=False)
+    resumo = resumo_escaloes(dados)
+    a_vencer = por_vencer(dados)
+    base = pasta / f"vencimentos_{nome_ficheiro(comercial)}"
+    gerados = []
+    if "xlsx" in formatos:
+        escrever_excel(base.with_suffix(".xlsx"), dados, resumo, a_vencer)
+        gerados.append(base.with_suffix(".xlsx"))
+    if "html" in formatos:
+        escrever_html(base.with_suffix(".html"), comercial, dados, resumo, a_vencer)
+        gerados.append(base.with_suffix(".html"))
+    return gerados
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Gera os relatórios de vencimentos de todos os comerciais numa só passagem.")
+    parser.add_argument("--origem", default=URL_V0808, help="URL ou caminho do V0808.xlsx")
+    parser.add_argument("--pasta", default="relatorios", help="pasta de destino")
+    parser.add_argument("--formatos", nargs="+", choices=["xlsx", "html"], default=["xlsx", "html"])
+    parser.add_argument("--comercial", action="append", help="limitar a este comercial (pode repetir)")
+    parser.add_argument("--processos", type=int, default=None, help="número de processos (por omissão, nº de CPUs)")
+    args = parser.parse_args(argv)
+
+    carteira = CarteiraRecebiveis(carregar_v0808(args.origem))
+    particoes = [(c, p) for c, p in carteira.particoes() if not args.comercial or c in args.comercial]
+    if not particoes:
+        print("Nenhum registo para os comerciais pedidos.", file=sys.stderr)
+        return 1
+
+    pasta = Path(args.pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    formatos = tuple(args.formatos)
+
+    erros = 0
+    with ProcessPoolExecutor(max_workers=args.processos) as pool:
+        tarefas = {
+            pool.submit(gerar_relatorios, comercial, parte, pasta, formatos): comercial
+            for comercial, parte in particoes
+        }
+        for tarefa in as_completed(tarefas):
+            comercial = tarefas[tarefa]
+            try:
+                for caminho in tarefa.result():
+                    print(f"✔ {comercial}: {caminho}")
+            except Exception as e:
+                erros += 1
+                print(f"❌ {comercial}: {e}", file=sys.stderr)
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
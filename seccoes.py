@@ -0,0 +1,34 @@
+import streamlit as st
+
+# ====================== SECÇÕES LAZY ======================
+# st.tabs executa o corpo de todos os separadores em cada rerun, mesmo os
+# que estão escondidos. Aqui a navegação é um seletor e só a função da secção
+# ativa é executada, dentro de um st.fragment: os widgets da secção voltam a
+# correr apenas essa secção. Os cálculos pesados de cada secção ficam em
+# funções st.cache_data chaveadas por (versão dos dados, estado dos filtros).
+
+
+def _seletor(rotulos: list, key: str) -> str:
+    if hasattr(st, "segmented_control"):
+        ativa = st.segmented_control(
+            "Secção", rotulos, default=rotulos[0], key=key, label_visibility="collapsed"
+        )
+        # o segmented_control permite desmarcar a opção: volta à primeira secção
+        return ativa or rotulos[0]
+    return st.radio("Secção", rotulos, horizontal=True, key=key, label_visibility="collapsed")
+
+
+def seccoes_lazy(seccoes: dict, key: str, fragmento: bool = True) -> str:
+    """Substituto de st.tabs: {rótulo: função}; só a secção ativa é executada.
+
+    Devolve o rótulo da secção ativa. Use fragmento=False em secções aninhadas
+    ou que escrevam na sidebar (um fragmento só pode desenhar no seu corpo).
+    """
+    rotulos = list(seccoes)
+    ativa = _seletor(rotulos, key)
+    corpo = seccoes[ativa]
+    if fragmento and hasattr(st, "fragment"):
+        st.fragment(corpo)()
+    else:
+        corpo()
+    return ativa
@@ -5,6 +5,9 @@ from io import BytesIO
 from openpyxl import Workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 
+from dados_versao import chave_filtros, marcar_versao, versao_dados
+from tabelas import tabela_paginada
+
 st.markdown("""
     <style>
     #MainMenu {visibility: hidden;}
@@ -26,7 +29,7 @@ def load_data():
     df = pd.read_excel(BytesIO(response.content), sheet_name="Dados")
     df.columns = df.columns.str.strip()
     df.rename(columns={'Kgs': 'Qtd'}, inplace=True)  # Rename if needed
-    return df
+    return marcar_versao(df)
 
 # Cache clear button
 if st.sidebar.button("🔄 Limpar Cache"):
@@ -65,7 +68,10 @@ df_filtrado = df[
 
 # Show filtered data
 st.subheader("📊 Tabela de Dados Filtrados")
-st.dataframe(df_filtrado, use_container_width=True)
+tabela_paginada(df_filtrado, "semestre_filtrados", chave=(versao_dados(df), chave_filtros(
+    anos=ano_selecionado, meses=mes_selecionado, artigos=artigo_selecionado,
+    comerciais=comercial_selecionado, clientes=cliente_selecionado,
+)))
 
 # Summary
 st.subheader("📌 Resumo")
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from estilos import estilizar, fixar_gradientes
+from formatacao import formatar_estilo
+
+# ====================== TABELAS PAGINADAS ======================
+# O DataFrame fica no servidor: pesquisa e ordenação são feitas sobre o frame
+# em cache (só as posições das linhas ficam memorizadas) e ao browser chega
+# apenas a página visível. Formatos e estilos são calculados só para essa
+# fatia (os gradientes com os extremos do frame inteiro, memorizados por
+# chave). Os controlos correm num st.fragment: mudar de página não reexecuta
+# a app inteira (e funciona dentro de blocos `if st.button(...)`).
+
+TAMANHOS_PAGINA = (25, 50, 100, 250)
+SEM_ORDEM = "—"
+
+
+def chave_tabela(df: pd.DataFrame) -> tuple:
+    """Impressão digital do conteúdo (vetorizada), usada quando não é dada uma chave."""
+    return (len(df), tuple(map(str, df.columns)), int(pd.util.hash_pandas_object(df, index=True).sum()))
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def posicoes_visiveis(_df: pd.DataFrame, chave: tuple, pesquisa: str, ordenar: str, ascendente: bool) -> np.ndarray:
+    """Posições (iloc) das linhas que contêm `pesquisa`, pela ordem de `ordenar`."""
+    posicoes = np.arange(len(_df))
+    if pesquisa:
+        termo = pesquisa.casefold()
+        mascara = np.zeros(len(_df), dtype=bool)
+        for col in _df.columns:
+            texto = _df[col].astype(str).str.casefold()
+            mascara |= texto.str.contains(termo, regex=False, na=False).to_numpy()
+        posicoes = posicoes[mascara]
+    if ordenar and ordenar in _df.columns:
+        valores = _df[ordenar].iloc[posicoes].reset_index(drop=True)
+        try:
+            ordem = valores.sort_values(ascending=ascendente, kind="stable", na_position="last").index
+        except TypeError:  # coluna object com tipos misturados
+            ordem = valores.astype(str).sort_values(ascending=ascendente, kind="stable").index
+        posicoes = posicoes[ordem.to_numpy()]
+    return posicoes
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def regras_fixadas(_df: pd.DataFrame, chave: tuple, regras: list) -> list:
+    """`regras` com os extremos dos gradientes do frame inteiro, calculados uma vez por `chave`."""
+    return fixar_gradientes(regras, _df)
+
+
+def tabela_paginada(df: pd.DataFrame, key: str, formatos: dict = None, regras: list = None,
+                    tamanho: int = 50, chave: tuple = None, fragmento: bool = True, **kwargs_dataframe):
+    """st.dataframe que só envia a página visível, com pesquisa e ordenação no servidor.
+
+    `formatos` ({coluna: nome}, ver formatacao.FORMATOS) e `regras` (estilos.regra_*)
+    são aplicados só à página. `chave` identifica o conteúdo de `df` (por ex.
+    (versão, filtros)); sem ela é calculada, em cada rerun, uma impressão
+    digital do frame inteiro.
+    """
+    if chave is None:
+        chave = chave_tabela(df)
+
+    def corpo():
+        if len(df) <= min(TAMANHOS_PAGINA):
+            # tabelas pequenas: sem controlos, mas com o mesmo estilo
+            _desenhar(df, formatos, regras, kwargs_dataframe)
+            return
+
+        col_pesquisa, col_ordem, col_sentido, col_tamanho = st.columns([3, 2, 1, 1])
+        pesquisa = col_pesquisa.text_input("🔍 Pesquisar", key=f"{key}_pesquisa").strip()
+        ordenar = col_ordem.selectbox("Ordenar por", [SEM_ORDEM, *map(str, df.columns)], key=f"{key}_ordenar")
+        ascendente = col_sentido.toggle("Ascendente", value=True, key=f"{key}_asc")
+        por_pagina = col_tamanho.selectbox(
+            "Linhas", TAMANHOS_PAGINA, index=TAMANHOS_PAGINA.index(tamanho) if tamanho in TAMANHOS_PAGINA else 1,
+            key=f"{key}_tamanho"
+        )
+
+        coluna = next((c for c in df.columns if str(c) == ordenar), None)
+        posicoes = posicoes_visiveis(df, (key, chave), pesquisa, coluna, ascendente)
+        total = len(posicoes)
+        paginas = max(1, -(-total // por_pagina))
+        pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1,
+                                 step=1, key=f"{key}_pagina_{paginas}")
+        inicio = (pagina - 1) * por_pagina
+        fim = min(inicio + por_pagina, total)
+
+        regras_pagina = regras_fixadas(df, (key, chave), regras) if regras else regras
+        _desenhar(df.iloc[posicoes[inicio:fim]], formatos, regras_pagina, kwargs_dataframe)
+        st.caption(f"Linhas {inicio + 1 if total else 0}–{fim} de {total:,}" + (f" (de {len(df):,})" if pesquisa else ""))
+
+    if fragmento and hasattr(st, "fragment"):
+        st.fragment(corpo)()
+    else:
+        corpo()
+
+
+def _desenhar(fatia: pd.DataFrame, formatos: dict, regras: list, kwargs_dataframe: dict):
+    dados = fatia
+    if formatos:
+        dados = formatar_estilo(dados, formatos)
+    if regras:
+        dados = estilizar(dados, regras)
+    if "use_container_width" not in kwargs_dataframe:
+        kwargs_dataframe.setdefault("width", "stretch")
+    st.dataframe(dados, **kwargs_dataframe)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# ====================== ÍNDICE DE DATAS DE VENCIMENTO ======================
+# As linhas são ordenadas uma vez pela data de vencimento e a data fica como
+# chave inteira (dias desde 1970). Qualquer janela [início, fim] é então um
+# par de searchsorted e um slice, sem comparar datas Python linha a linha;
+# com a soma acumulada dos valores, os totais de uma janela custam O(1) e uma
+# projeção de N semanas sai de uma só passagem (searchsorted nas fronteiras).
+
+
+def dia_inteiro(data) -> int:
+    """Data (date, Timestamp ou string) como nº de dias desde 1970-01-01."""
+    return int(np.datetime64(pd.Timestamp(data).date(), "D").astype(np.int64))
+
+
+class IndiceVencimentos:
+    def __init__(self, df: pd.DataFrame, coluna_data: str, coluna_valor: str):
+        self.coluna_data = coluna_data
+        self.coluna_valor = coluna_valor
+        datas = pd.to_datetime(df[coluna_data], errors="coerce").to_numpy(dtype="datetime64[D]")
+        validas = np.flatnonzero(~np.isnat(datas))
+        dias = datas[validas].astype(np.int64)
+        ordem = np.argsort(dias, kind="stable")
+        # documentos sem data de vencimento ficam fora do índice
+        self.df = df.iloc[validas[ordem]]
+        self.dias = dias[ordem]
+        valores = pd.to_numeric(self.df[coluna_valor], errors="coerce").to_numpy(dtype=float)
+        self._acumulado = np.r_[0.0, np.cumsum(np.nan_to_num(valores))]
+
+    def limites(self, inicio, fim) -> tuple:
+        """Posições [i, j) das linhas com inicio <= vencimento <= fim (datas inclusivas)."""
+        i, j = np.searchsorted(self.dias, [dia_inteiro(inicio), dia_inteiro(fim) + 1])
+        return int(i), int(j)
+
+    def janela(self, inicio, fim) -> pd.DataFrame:
+        i, j = self.limites(inicio, fim)
+        return self.df.iloc[i:j]
+
+    def total(self, inicio, fim) -> float:
+        i, j = self.limites(inicio, fim)
+        return float(self._acumulado[j] - self._acumulado[i])
+
+    def projecao_semanal(self, inicio, semanas: int, por: str = None) -> pd.DataFrame:
+        """Documentos e valor a vencer em cada uma das `semanas` semanas a partir de `inicio`.
+
+        Sem `por`: uma linha por semana. Com `por` (por ex. "Comercial"): uma
+        linha por semana e valor de `por`, calculadas no mesmo slice.
+        """
+        d0 = dia_inteiro(inicio)
+        fronteiras = np.searchsorted(self.dias, d0 + 7 * np.arange(semanas + 1))
+        inicios = pd.to_datetime(d0 + 7 * np.arange(semanas), unit="D")
+        semanas_df = pd.DataFrame({
+            "Semana": np.arange(1, semanas + 1),
+            "Início": inicios,
+            "Fim": inicios + pd.Timedelta(days=6),
+        })
+        if por is None:
+            semanas_df["Documentos"] = np.diff(fronteiras)
+            semanas_df[self.coluna_valor] = np.diff(self._acumulado[fronteiras])
+            return semanas_df
+
+        i, j = fronteiras[0], fronteiras[-1]
+        fatia = self.df.iloc[i:j]
+        semana = (self.dias[i:j] - d0) // 7 + 1
+        agrupado = (
+            fatia.groupby([semana, fatia[por].to_numpy()], sort=True)[self.coluna_valor]
+            .agg(Documentos="size", Valor="sum")
+            .rename(columns={"Valor": self.coluna_valor})
+            .rename_axis(["Semana", por])
+            .reset_index()
+        )
+        return semanas_df.merge(agrupado, on="Semana")